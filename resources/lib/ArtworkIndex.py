@@ -0,0 +1,222 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import re
+import threading
+import unicodedata
+
+import Globals
+import xbmc
+
+ITEM_PROPERTIES = ["title", "year", "art"]
+# A rescan or clean can change anything, the index is loaded again
+RELOAD_EVENTS = (
+    "VideoLibrary.OnScanFinished",
+    "VideoLibrary.OnCleanFinished",
+)
+
+
+# Case, accents and punctuation don't tell titles apart
+def normalizeTitle(title):
+    title = unicodedata.normalize("NFKD", title or "")
+    title = "".join(char for char in title if not unicodedata.combining(char))
+    return re.sub(r"[\W_]+", " ", title.lower()).strip()
+
+
+# The first of the artwork kinds the item has
+def pickArt(art, kinds):
+    for kind in kinds:
+        if art.get(kind):
+            return art[kind]
+
+    return ""
+
+
+# The artwork of every show and movie in the library.  It is loaded with one
+# request the first time it is needed, and after that kept current from the
+# library notifications, so a lookup by title never goes to Kodi.
+class ArtworkIndex:
+    def __init__(self, client):
+        self.client = client
+        self.items = {"tvshow": {}, "movie": {}}
+        self.titles = {"tvshow": {}, "movie": {}}
+        self.isLoaded = False
+        self.indexLock = threading.RLock()
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("ArtworkIndex: " + msg, level)
+
+    def load(self):
+        responses = self.client.batch(
+            [
+                {
+                    "jsonrpc": "2.0",
+                    "method": "VideoLibrary.GetTVShows",
+                    "params": {"properties": ITEM_PROPERTIES},
+                    "id": "tvshows",
+                },
+                {
+                    "jsonrpc": "2.0",
+                    "method": "VideoLibrary.GetMovies",
+                    "params": {"properties": ITEM_PROPERTIES},
+                    "id": "movies",
+                },
+            ]
+        )
+
+        self.items = {"tvshow": {}, "movie": {}}
+        self.titles = {"tvshow": {}, "movie": {}}
+
+        for kind, key, response in zip(
+            ("tvshow", "movie"), ("tvshows", "movies"), responses
+        ):
+            for item in response.get("result", {}).get(key, []):
+                self.addItem(kind, item)
+
+        # Try again on the next lookup if Kodi didn't answer
+        self.isLoaded = all("result" in response for response in responses)
+        self.log(
+            "Indexed "
+            + str(len(self.items["tvshow"]))
+            + " shows and "
+            + str(len(self.items["movie"]))
+            + " movies"
+        )
+
+    def ensureLoaded(self):
+        with self.indexLock:
+            if self.isLoaded == False:
+                self.load()
+
+    def addItem(self, kind, item):
+        itemid = item.get(kind + "id")
+        self.removeItem(kind, itemid)
+        entry = {
+            "id": itemid,
+            "title": item.get("title", ""),
+            "year": item.get("year", 0),
+            "art": item.get("art", {}),
+        }
+        self.items[kind][itemid] = entry
+        self.titles[kind].setdefault(normalizeTitle(entry["title"]), []).append(entry)
+
+    def removeItem(self, kind, itemid):
+        entry = self.items[kind].pop(itemid, None)
+
+        if entry is None:
+            return
+
+        title = normalizeTitle(entry["title"])
+        entries = [other for other in self.titles[kind][title] if other is not entry]
+
+        if len(entries) > 0:
+            self.titles[kind][title] = entries
+        else:
+            del self.titles[kind][title]
+
+    # The entries with the title.  With contains, titles that only contain
+    # it are searched when there is no exact match.
+    def findEntries(self, kind, title, contains=False):
+        self.ensureLoaded()
+        title = normalizeTitle(title)
+
+        with self.indexLock:
+            entries = self.titles[kind].get(title, [])
+
+            if len(entries) == 0 and contains and len(title) > 0:
+                for other in sorted(self.titles[kind]):
+                    if title in other:
+                        return self.titles[kind][other]
+
+            return entries
+
+    def getShowArt(self, title, contains=False):
+        entries = self.findEntries("tvshow", title, contains)
+
+        if len(entries) > 0:
+            return entries[0]["art"]
+
+        return {}
+
+    def getShowArtById(self, tvshowid):
+        self.ensureLoaded()
+
+        with self.indexLock:
+            entry = self.items["tvshow"].get(tvshowid)
+
+        if entry is not None:
+            return entry["art"]
+
+        return {}
+
+    def getMovieArt(self, title, year=None):
+        for entry in self.findEntries("movie", title):
+            if not year or str(entry["year"]) == str(year):
+                return entry["art"]
+
+        return {}
+
+    def onNotification(self, method, data):
+        if method in RELOAD_EVENTS:
+            with self.indexLock:
+                self.isLoaded = False
+
+            return
+
+        if method not in ("VideoLibrary.OnUpdate", "VideoLibrary.OnRemove"):
+            return
+
+        try:
+            data = json.loads(data)
+        except:
+            return
+
+        item = data.get("item", data)
+        kind = item.get("type")
+
+        # A watched state change doesn't touch the artwork
+        if kind not in ("tvshow", "movie") or "playcount" in data:
+            return
+
+        with self.indexLock:
+            if self.isLoaded == False:
+                return
+
+            if method == "VideoLibrary.OnRemove":
+                self.removeItem(kind, item.get("id"))
+                return
+
+        if kind == "tvshow":
+            detailsMethod = "VideoLibrary.GetTVShowDetails"
+        else:
+            detailsMethod = "VideoLibrary.GetMovieDetails"
+
+        response = self.client.request(
+            {
+                "jsonrpc": "2.0",
+                "method": detailsMethod,
+                "params": {kind + "id": item.get("id"), "properties": ITEM_PROPERTIES},
+                "id": 1,
+            }
+        )
+        details = response.get("result", {}).get(kind + "details")
+
+        if details is not None:
+            with self.indexLock:
+                self.addItem(kind, details)
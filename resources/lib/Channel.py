@@ -142,3 +142,18 @@ class Channel:
 
     def addShowPosition(self, addition):
         self.setShowPosition(self.playlistPosition + addition)
+
+    # Where the channel will be after running for elapsed more seconds from
+    # its saved position, as (position, offset)
+    def getPositionAfter(self, elapsed):
+        start = self.Playlist.getStartTime(self.playlistPosition)
+        return self.Playlist.getPositionAt(start + self.showTimeOffset + elapsed)
+
+    # The next airing of the title within `within` seconds, counting from
+    # elapsed seconds after the saved position, as (position, seconds until
+    # it starts)
+    def getNextAiring(self, title, elapsed, within):
+        start = self.Playlist.getStartTime(self.playlistPosition)
+        return self.Playlist.getNextAiring(
+            title, start + self.showTimeOffset + elapsed, within
+        )
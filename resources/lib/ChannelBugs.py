@@ -0,0 +1,198 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import io
+import os
+import threading
+import traceback
+
+import Globals
+import xbmc
+import xbmcvfs
+from FileAccess import FileAccess
+from Scheduler import ScheduledTimer
+
+try:
+    from PIL import Image, ImageEnhance
+
+    PIL_AVAILABLE = True
+except:
+    PIL_AVAILABLE = False
+
+# How a logo is turned into a bug.  They are part of the cache key, so
+# changing them renders every bug again.
+BUG_SIZE = (220, 155)
+BUG_OPACITY = 0.4
+RENDER_PARAMS = "%dx%d-%.2f" % (BUG_SIZE[0], BUG_SIZE[1], BUG_OPACITY)
+MAX_WORKERS = 4
+
+
+def renderBug(data, filename):
+    original = Image.open(io.BytesIO(data))
+
+    if original.mode != "RGBA":
+        original = original.convert("RGBA")
+
+    # Resize to fit
+    original.thumbnail(BUG_SIZE, Image.LANCZOS)
+
+    # Make semi-transparent
+    alpha = original.split()[-1]
+    alpha = ImageEnhance.Brightness(alpha).enhance(BUG_OPACITY)
+    original.putalpha(alpha)
+
+    # Channels sharing a logo may render it at the same time
+    tmpfile = "%s.%d.tmp" % (filename, threading.current_thread().ident)
+    original.save(tmpfile, "PNG")
+    FileAccess.replace(tmpfile, filename)
+
+
+# The semi-transparent channel bugs made from the channel logos.  They are
+# rendered on a few worker threads when the overlay starts, and again when
+# a logo changes, so tuning a channel only looks up a finished file.  A bug
+# is named after the logo's content and the render parameters, so a new
+# logo, even under the same name, gets a new bug and channels sharing a
+# logo share the bug.
+class ChannelBugs:
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        # By logo path, the logo's size and time it was modified, and its bug
+        self.bugs = {}
+        self.rendering = set()
+        self.bugLock = threading.Lock()
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("ChannelBugs: " + msg, level)
+
+    # The bug of the logo, None while it isn't rendered.  Whether the logo
+    # changed is checked in the background.
+    def getBug(self, logoPath):
+        with self.bugLock:
+            entry = self.bugs.get(logoPath)
+
+        timer = ScheduledTimer(self.scheduler, 0, self.update, [logoPath])
+        timer.name = "ChannelBug" + logoPath
+        timer.start()
+
+        if entry is not None:
+            return entry["bug"]
+
+        return None
+
+    def renderAll(self, logoPaths):
+        timer = ScheduledTimer(self.scheduler, 0, self.renderLogos, [list(logoPaths)])
+        timer.name = "ChannelBugsRenderAll"
+        timer.start()
+
+    def renderLogos(self, logoPaths):
+        remaining = list(logoPaths)
+        remainingLock = threading.Lock()
+
+        def worker():
+            while True:
+                with remainingLock:
+                    if len(remaining) == 0:
+                        return
+
+                    logoPath = remaining.pop()
+
+                self.update(logoPath)
+
+        threads = [
+            threading.Thread(target=worker, name="ChannelBugs" + str(i))
+            for i in range(min(MAX_WORKERS, len(remaining)))
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        with self.bugLock:
+            current = set(
+                os.path.basename(entry["bug"])
+                for entry in self.bugs.values()
+                if entry["bug"] is not None
+            )
+
+        self.log(str(len(current)) + " channel bugs ready")
+
+        # Without PIL the bugs rendered before are all there is
+        if PIL_AVAILABLE:
+            self.prune(current)
+
+    # Render the bug of the logo if the logo is new or changed
+    def update(self, logoPath):
+        with self.bugLock:
+            if logoPath in self.rendering:
+                return
+
+            self.rendering.add(logoPath)
+            entry = self.bugs.get(logoPath)
+
+        try:
+            if FileAccess.exists(logoPath) == False:
+                with self.bugLock:
+                    self.bugs.pop(logoPath, None)
+
+                return
+
+            stat = xbmcvfs.Stat(logoPath)
+            stamp = [stat.st_size(), stat.st_mtime()]
+
+            if (
+                entry is not None
+                and entry["stamp"] == stamp
+                and (entry["bug"] is None or FileAccess.exists(entry["bug"]))
+            ):
+                return
+
+            bug = None
+
+            if PIL_AVAILABLE:
+                fle = xbmcvfs.File(logoPath)
+                data = bytes(fle.readBytes())
+                fle.close()
+                key = hashlib.sha1(data + RENDER_PARAMS.encode("utf-8")).hexdigest()
+                bug = Globals.CHANNELBUG_LOC + key[:20] + ".png"
+
+                if FileAccess.exists(bug) == False:
+                    self.log("Rendering the bug of " + logoPath)
+                    renderBug(data, bug)
+
+            with self.bugLock:
+                self.bugs[logoPath] = {"stamp": stamp, "bug": bug}
+        except:
+            self.log("Unable to render the bug of " + logoPath, xbmc.LOGERROR)
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
+        finally:
+            with self.bugLock:
+                self.rendering.discard(logoPath)
+
+    # Delete the bugs of logos that are gone or changed
+    def prune(self, current):
+        try:
+            dirs, files = xbmcvfs.listdir(Globals.CHANNELBUG_LOC)
+        except:
+            return
+
+        for filename in files:
+            if filename.endswith(".png") and filename not in current:
+                FileAccess.delete(Globals.CHANNELBUG_LOC + filename)
@@ -18,6 +18,7 @@
 
 import base64
 import datetime
+import hashlib
 import os
 import random
 import re
@@ -40,6 +41,7 @@ from FileAccess import FileAccess, FileLock
 from GlobalRulesHandler import GlobalRulesHandler
 from Globals import *
 from Playlist import Playlist
+from ResetPlanner import ResetPlanner
 from VideoParser import VideoParser
 
 
@@ -56,6 +58,18 @@ class ChannelList:
         self.runningActionId = 0
         self.enteredChannelCount = 0
         self.background = True
+        self.buildOrder = []
+        self.blockedInterleaves = set()
+        self.builtSources = set()
+        self.dependenciesChanged = False
+        self.resetPlanner = ResetPlanner(self)
+        self.deterministicBuilds = False
+        # Random source for building a playlist, seeded in deterministic mode
+        self.buildRandom = random
+        # The seed and library a playlist has to be rebuilt from, if any
+        self.expectedBuild = None
+        self.pendingBuild = ""
+        ADDON_SETTINGS.subscribe(self.onSettingsChanged)
         random.seed()
 
     def readConfig(self):
@@ -69,7 +83,9 @@ class ChannelList:
         self.backgroundUpdating = int(ADDON.getSetting("ThreadMode"))
         self.mediaLimit = MEDIA_LIMIT[int(ADDON.getSetting("MediaLimit"))]
         self.showSeasonEpisode = ADDON.getSetting("ShowSeEp") == "true"
+        self.deterministicBuilds = ADDON.getSetting("DeterministicBuilds") == "true"
         self.findMaxChannels()
+        self.resetRequested = self.forceReset
 
         if self.forceReset:
             ADDON.setSetting("ForceChannelReset", "False")
@@ -97,14 +113,24 @@ class ChannelList:
         if self.backgroundUpdating > 0 and self.myOverlay.isMaster == True:
             makenewlists = True
 
-        # Go through all channels, create their arrays, and setup the new playlist
         for i in range(self.maxChannels):
-            self.updateDialogProgress = i * 100 // self.enteredChannelCount
+            self.channels.append(Channel())
+
+        # Interleave sources are built before the channels that use them
+        self.resolveChannelDependencies(self.maxChannels)
+
+        # Only rebuild the channels whose definition changed since their
+        # playlist was made
+        if self.myOverlay.isMaster:
+            self.resetPlanner.plan(self.resetRequested)
+
+        # Go through all channels and setup the new playlist
+        for count, i in enumerate(self.buildOrder):
+            self.updateDialogProgress = count * 100 // self.enteredChannelCount
             self.updateDialog.update(
                 self.updateDialogProgress,
                 "Loading channel " + str(i + 1) + "\n" + "waiting for file lock",
             )
-            self.channels.append(Channel())
 
             # If the user pressed cancel, stop everything and exit
             if self.updateDialog.iscanceled():
@@ -121,7 +147,9 @@ class ChannelList:
             ADDON.setSetting("ForceChannelReset", "false")
 
         if foundvalid == False and makenewlists == False:
-            for i in range(self.maxChannels):
+            self.builtSources.clear()
+
+            for i in self.buildOrder:
                 self.updateDialogProgress = i * 100 // self.enteredChannelCount
                 self.updateDialog.update(
                     self.updateDialogProgress,
@@ -141,41 +169,169 @@ class ChannelList:
     def log(self, msg, level=xbmc.LOGDEBUG):
         log("ChannelList: " + msg, level)
 
-    # Determine the maximum number of channels by opening consecutive
-    # playlists until we don't find one
+    # Determine the maximum number of channels from the defined channels
     def findMaxChannels(self):
         self.log("findMaxChannels")
         self.maxChannels = 0
         self.enteredChannelCount = 0
 
-        for i in range(999):
-            chtype = 9999
-            chsetting1 = ""
-            chsetting2 = ""
-
-            try:
-                chtype = int(
-                    ADDON_SETTINGS.getSetting("Channel_" + str(i + 1) + "_type")
-                )
-                chsetting1 = ADDON_SETTINGS.getSetting("Channel_" + str(i + 1) + "_1")
-                chsetting2 = ADDON_SETTINGS.getSetting("Channel_" + str(i + 1) + "_2")
-            except:
-                pass
+        for channel in CHANNEL_REGISTRY.getChannels():
+            chtype = CHANNEL_REGISTRY.getType(channel)
+            chsetting1 = ADDON_SETTINGS.getSetting("Channel_" + str(channel) + "_1")
 
             if chtype == 0:
                 if FileAccess.exists(xbmcvfs.translatePath(chsetting1)):
-                    self.maxChannels = i + 1
+                    self.maxChannels = channel
                     self.enteredChannelCount += 1
             elif chtype < 8 or chtype == 12:  # Added check for type 12
                 if len(chsetting1) > 0:
-                    self.maxChannels = i + 1
+                    self.maxChannels = channel
                     self.enteredChannelCount += 1
 
-            if self.forceReset and (chtype != 9999):
-                ADDON_SETTINGS.setSetting("Channel_" + str(i + 1) + "_changed", "True")
-
         self.log("findMaxChannels return " + str(self.maxChannels))
 
+    def onSettingsChanged(self, changed):
+        for name in changed:
+            if "_rule" in name or name.endswith("_type") or name.startswith("Global"):
+                self.dependenciesChanged = True
+                return
+
+    def getInterleaveSources(self, channel, globalHandler):
+        sources = []
+
+        try:
+            rulecount = int(
+                ADDON_SETTINGS.getSetting("Channel_" + str(channel) + "_rulecount")
+            )
+        except:
+            rulecount = 0
+
+        for i in range(rulecount):
+            prefix = "Channel_" + str(channel) + "_rule_" + str(i + 1)
+
+            try:
+                if int(ADDON_SETTINGS.getSetting(prefix + "_id")) == 6:
+                    sources.append(int(ADDON_SETTINGS.getSetting(prefix + "_opt_1")))
+            except:
+                pass
+
+        # The global interleave rule is added to every channel it applies to
+        try:
+            chtype = int(ADDON_SETTINGS.getSetting("Channel_" + str(channel) + "_type"))
+
+            if (
+                6 in globalHandler.getEnabledGlobalRules(chtype)
+                and globalHandler.isChannelExcluded(channel) == False
+            ):
+                sources.append(int(ADDON_SETTINGS.getSetting("GlobalRule_6_opt_1")))
+        except:
+            pass
+
+        return [src for src in sources if src >= 1 and src != channel]
+
+    # Order channels so that every interleave source is set up before the
+    # channels that use it.  Edges that would close a cycle are blocked.
+    def resolveChannelDependencies(self, maxchannels):
+        self.log("resolveChannelDependencies")
+        self.buildOrder = []
+        self.blockedInterleaves = set()
+        self.builtSources = set()
+        self.dependenciesChanged = False
+        dependencies = {}
+        globalHandler = GlobalRulesHandler()
+
+        for channel in range(1, maxchannels + 1):
+            dependencies[channel] = [
+                src
+                for src in self.getInterleaveSources(channel, globalHandler)
+                if src <= maxchannels
+            ]
+
+        # 0 - unvisited, 1 - on the current path, 2 - done
+        state = dict.fromkeys(dependencies, 0)
+
+        for root in dependencies:
+            if state[root] != 0:
+                continue
+
+            state[root] = 1
+            stack = [(root, iter(dependencies[root]))]
+
+            while stack:
+                channel, sources = stack[-1]
+                source = next(sources, None)
+
+                if source is None:
+                    stack.pop()
+                    state[channel] = 2
+                    self.buildOrder.append(channel - 1)
+                elif state[source] == 1:
+                    self.log(
+                        "Interleave cycle between channel "
+                        + str(channel)
+                        + " and channel "
+                        + str(source)
+                        + ", ignoring that rule",
+                        xbmc.LOGERROR,
+                    )
+                    self.blockedInterleaves.add((channel, source))
+                elif state[source] == 0:
+                    state[source] = 1
+                    stack.append((source, iter(dependencies[source])))
+
+        self.log("resolveChannelDependencies order " + str(self.buildOrder))
+
+    # Return a set up channel to interleave from.  Each source is built at
+    # most once per pass, and an already loaded channel is shared as-is.
+    def getInterleaveSource(self, channel, source):
+        if (channel, source) in self.blockedInterleaves:
+            self.log("Interleave of channel " + str(source) + " is blocked")
+            return None
+
+        if len(self.channels) >= source and self.channels[source - 1].isSetup:
+            return self.channels[source - 1]
+
+        try:
+            if (
+                len(self.myOverlay.channels) >= source
+                and self.myOverlay.channels[source - 1].isValid
+            ):
+                return self.myOverlay.channels[source - 1]
+        except:
+            pass
+
+        if source in self.builtSources:
+            return self.channels[source - 1]
+
+        self.builtSources.add(source)
+        self.log("Setting up interleave source " + str(source) + " out of order")
+        # setupChannel replaces the running state, including the random
+        # source and seed of the build in progress, so restore it afterwards
+        saved = (
+            self.background,
+            self.settingChannel,
+            self.runningActionChannel,
+            self.runningActionId,
+            self.buildRandom,
+            self.pendingBuild,
+            self.expectedBuild,
+        )
+
+        try:
+            self.setupChannel(source, True, self.myOverlay.isMaster, False)
+        finally:
+            (
+                self.background,
+                self.settingChannel,
+                self.runningActionChannel,
+                self.runningActionId,
+                self.buildRandom,
+                self.pendingBuild,
+                self.expectedBuild,
+            ) = saved
+
+        return self.channels[source - 1]
+
     def sendJSON(self, command):
         data = xbmc.executeJSONRPC(command)
         # Python 2/3 compatibility
@@ -196,6 +352,7 @@ class ChannelList:
         needsreset = False
         self.background = background
         self.settingChannel = channel
+        self.builtSources.add(channel)
 
         try:
             chtype = int(ADDON_SETTINGS.getSetting("Channel_" + str(channel) + "_type"))
@@ -212,31 +369,7 @@ class ChannelList:
             return False
 
         self.channels[channel - 1].isSetup = True
-
-        # Load channel-specific rules
-        self.channels[channel - 1].loadRules(channel)
-
-        # NEW: Apply global rules if enabled
-        try:
-            from GlobalRulesHandler import GlobalRulesHandler
-
-            globalHandler = GlobalRulesHandler()
-
-            # Apply global rules based on channel type
-            if globalHandler.isChannelTypeEnabled(chtype):
-                self.log(
-                    "Applying global rules to channel "
-                    + str(channel)
-                    + " (type "
-                    + str(chtype)
-                    + ")"
-                )
-                globalHandler.applyGlobalRules(self.channels[channel - 1], chtype)
-        except Exception as e:
-            self.log("Error applying global rules: " + str(e))
-
-        # Run start actions after all rules are loaded
-        self.runActions(RULES_ACTION_START, channel, self.channels[channel - 1])
+        self.loadChannelRules(channel, chtype)
 
         try:
             needsreset = (
@@ -369,6 +502,7 @@ class ChannelList:
                         ADDON_SETTINGS.setSetting(
                             "Channel_" + str(channel) + "_time", "0"
                         )
+                        self.resetPlanner.recordBuild(channel)
 
                         if needsreset:
                             ADDON_SETTINGS.setSetting(
@@ -432,6 +566,108 @@ class ChannelList:
 
         return returnval
 
+    def loadChannelRules(self, channel, chtype):
+        # Load channel-specific rules
+        self.channels[channel - 1].loadRules(channel)
+
+        # NEW: Apply global rules if enabled
+        try:
+            from GlobalRulesHandler import GlobalRulesHandler
+
+            globalHandler = GlobalRulesHandler()
+
+            # Apply global rules based on channel type
+            if globalHandler.isChannelTypeEnabled(chtype):
+                self.log(
+                    "Applying global rules to channel "
+                    + str(channel)
+                    + " (type "
+                    + str(chtype)
+                    + ")"
+                )
+                globalHandler.applyGlobalRules(self.channels[channel - 1], chtype)
+        except Exception as e:
+            self.log("Error applying global rules: " + str(e))
+
+        # Run start actions after all rules are loaded
+        self.runActions(RULES_ACTION_START, channel, self.channels[channel - 1])
+
+    # Rebuild a playlist from the seed the master built it with, instead of
+    # copying it.  Only works if this box sees the same library, so this
+    # returns False as soon as the library turns out to be different.
+    def regenerateChannel(self, channel, seed, library):
+        self.log("regenerateChannel " + str(channel))
+
+        try:
+            chtype = int(ADDON_SETTINGS.getSetting("Channel_" + str(channel) + "_type"))
+            chsetting1 = ADDON_SETTINGS.getSetting("Channel_" + str(channel) + "_1")
+            chsetting2 = ADDON_SETTINGS.getSetting("Channel_" + str(channel) + "_2")
+        except:
+            return False
+
+        while len(self.channels) < channel:
+            self.channels.append(Channel())
+
+        self.loadChannelRules(channel, chtype)
+        # Interleave sources may have been rebuilt since they were loaded
+        self.builtSources.clear()
+        self.expectedBuild = (seed, library)
+
+        try:
+            if self.makeChannelList(channel, chtype, chsetting1, chsetting2) == False:
+                return False
+        finally:
+            self.expectedBuild = None
+
+        return self.channels[channel - 1].setPlaylist(
+            CHANNELS_LOC + "channel_" + str(channel) + ".m3u"
+        )
+
+    def isDeterministicBuild(self):
+        return self.deterministicBuilds or self.expectedBuild is not None
+
+    # In deterministic mode the playlist only depends on the library, the
+    # channel definition and a seed.  Kodi returns random playlists in random
+    # order, so those are sorted first, and the media limit is applied here
+    # instead of in the smart playlist.  Returns None if the library doesn't
+    # match the one the playlist has to be rebuilt from.
+    def startDeterministicBuild(self, channel, fileList, unordered, chtype):
+        if unordered:
+            fileList = sorted(fileList)
+
+        library = hashlib.md5("\n".join(fileList).encode("utf-8")).hexdigest()
+
+        if self.expectedBuild is not None:
+            seed, expected = self.expectedBuild
+
+            if library != expected:
+                self.log(
+                    "Library differs from the master for channel " + str(channel)
+                )
+                return None
+        else:
+            seed = random.randint(1, 2147483647)
+
+        self.buildRandom = random.Random(str(seed) + ":" + library)
+        self.pendingBuild = str(seed) + "," + library
+
+        if unordered:
+            fileList = self.applyMediaLimit(fileList, chtype, self.buildRandom)
+
+        return fileList
+
+    # The genre smart playlists have no limit in deterministic mode, so the
+    # random subset is picked here
+    def applyMediaLimit(self, fileList, chtype, rand):
+        if (
+            chtype in (3, 4, 12)
+            and self.mediaLimit > 0
+            and len(fileList) > self.mediaLimit
+        ):
+            return rand.sample(fileList, self.mediaLimit)
+
+        return fileList
+
     def clearPlaylistHistory(self, channel):
         self.log("clearPlaylistHistory")
 
@@ -487,6 +723,8 @@ class ChannelList:
 
             fle.write(flewrite)
             fle.close()
+            # The trimmed playlist can't be rebuilt from its seed anymore
+            ADDON_SETTINGS.setSetting("Channel_" + str(channel) + "_seed", "")
 
             if timeremoved > 0:
                 if (
@@ -563,9 +801,9 @@ class ChannelList:
         """
         total = sum(weights)
         if total == 0:
-            return random.choice(options)
+            return self.buildRandom.choice(options)
 
-        r = random.uniform(0, total)
+        r = self.buildRandom.uniform(0, total)
         upto = 0
         for i, w in enumerate(weights):
             if upto + w >= r:
@@ -649,7 +887,7 @@ class ChannelList:
 
         # Randomize episodes within each show
         for show in episodes_by_show:
-            random.shuffle(episodes_by_show[show])
+            self.buildRandom.shuffle(episodes_by_show[show])
 
         # First pass: Give every show at least 1 episode
         distributed_list = []
@@ -873,36 +1111,49 @@ class ChannelList:
 
         xml.close()
 
+        try:
+            order = dom.getElementsByTagName("order")
+
+            if order[0].childNodes[0].nodeValue.lower() == "random":
+                israndom = True
+        except:
+            pass
+
         if self.getSmartPlaylistType(dom) == "mixed":
             fileList = self.buildMixedFileList(dom, channel)
         else:
             fileList = self.buildFileList(fle, channel)
 
-            # Apply smart distribution for TV Genre channels only
-            if chtype == 3:  # TV Genre channel
-                use_smart_dist = True
-                try:
-                    use_smart_dist = (
-                        ADDON_SETTINGS.getSetting(
-                            "Channel_" + str(channel) + "_smartdist"
-                        )
-                        != "false"
-                    )
-                except:
-                    use_smart_dist = True
+        self.buildRandom = random
+        self.pendingBuild = ""
 
-                if use_smart_dist and len(fileList) > 0:
-                    limit = min(len(fileList), 16384)
-                    fileList = self.applySmartDistribution(fileList, limit, channel)
-                    self.log("Applied smart distribution to channel %d" % channel)
+        if self.isDeterministicBuild() and append == False:
+            fileList = self.startDeterministicBuild(
+                channel, fileList, israndom or chtype == 3, chtype
+            )
 
-        try:
-            order = dom.getElementsByTagName("order")
+            if fileList is None:
+                return False
+        elif self.isDeterministicBuild() and (israndom or chtype == 3):
+            # Appends aren't seeded, but read a smart playlist without a
+            # limit all the same
+            fileList = self.applyMediaLimit(fileList, chtype, random)
 
-            if order[0].childNodes[0].nodeValue.lower() == "random":
-                israndom = True
-        except:
-            pass
+        # Apply smart distribution for TV Genre channels only
+        if chtype == 3 and self.getSmartPlaylistType(dom) != "mixed":
+            use_smart_dist = True
+            try:
+                use_smart_dist = (
+                    ADDON_SETTINGS.getSetting("Channel_" + str(channel) + "_smartdist")
+                    != "false"
+                )
+            except:
+                use_smart_dist = True
+
+            if use_smart_dist and len(fileList) > 0:
+                limit = min(len(fileList), 16384)
+                fileList = self.applySmartDistribution(fileList, limit, channel)
+                self.log("Applied smart distribution to channel %d" % channel)
 
         try:
             if append == True:
@@ -931,7 +1182,7 @@ class ChannelList:
 
         # Only randomize if not using smart distribution
         if israndom and chtype != 3:
-            random.shuffle(fileList)
+            self.buildRandom.shuffle(fileList)
 
         if len(fileList) > 16384:
             fileList = fileList[:16384]
@@ -953,6 +1204,14 @@ class ChannelList:
             channelplaylist.write(uni("#EXTINF:") + uni(string) + uni("\n"))
 
         channelplaylist.close()
+
+        # Slaves rebuild from this instead of copying the playlist
+        if self.expectedBuild is None:
+            ADDON_SETTINGS.setSetting(
+                "Channel_" + str(channel) + "_seed", self.pendingBuild
+            )
+
+        self.buildRandom = random
         self.log("makeChannelList return")
         return True
 
@@ -999,7 +1258,8 @@ class ChannelList:
         fle.write("    <match>one</match>\n")
 
     def writeXSPFooter(self, fle, limit, order):
-        if self.mediaLimit > 0:
+        # Deterministic builds pick the random subset themselves
+        if self.mediaLimit > 0 and not (self.isDeterministicBuild() and order == "random"):
             fle.write("    <limit>" + str(self.mediaLimit) + "</limit>\n")
 
         fle.write('    <order direction="ascending">' + order + "</order>\n")
@@ -1482,9 +1742,9 @@ class ChannelList:
 
     def clearAllPlaylists(self):
         self.log("clearAllPlaylists")
-        for i in range(999):
+        for channel in CHANNEL_REGISTRY.getChannels():
             try:
-                FileAccess.delete(CHANNELS_LOC + "channel_" + str(i + 1) + ".m3u")
+                FileAccess.delete(CHANNELS_LOC + "channel_" + str(channel) + ".m3u")
             except:
                 pass
 
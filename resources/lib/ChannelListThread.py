@@ -75,6 +75,8 @@ class ChannelListThread(threading.Thread):
             if self.myOverlay.channels[i].isValid:
                 validchannels += 1
 
+        self.chanlist.resolveChannelDependencies(self.myOverlay.maxChannels)
+
         # Don't load invalid channels if minimum threading mode is on
         if self.fullUpdating and self.myOverlay.isMaster:
             if validchannels < self.chanlist.enteredChannelCount:
@@ -83,7 +85,7 @@ class ChannelListThread(threading.Thread):
                     % (ADDON_NAME, LANGUAGE(30024), 4000, ICON)
                 )
 
-            for i in range(self.myOverlay.maxChannels):
+            for i in self.chanlist.buildOrder:
                 if self.myOverlay.channels[i].isValid == False:
                     while True:
                         if self.myOverlay.isExiting:
@@ -133,15 +135,29 @@ class ChannelListThread(threading.Thread):
         self.chanlist.sleepTime = 0.3
 
         while True:
-            for i in range(self.myOverlay.maxChannels):
-                modified = True
+            if self.chanlist.dependenciesChanged:
+                self.chanlist.resolveChannelDependencies(self.myOverlay.maxChannels)
 
-                while (
-                    modified == True
-                    and self.myOverlay.channels[i].getTotalDuration()
-                    < PREP_CHANNEL_TIME
-                    and self.myOverlay.channels[i].Playlist.size() < 16288
+            # Each interleave source is built at most once per pass
+            self.chanlist.builtSources.clear()
+            changedChannels = set(self.myOverlay.sharedChannelChanges)
+            self.myOverlay.sharedChannelChanges.clear()
+
+            for i in self.getPassOrder():
+                modified = True
+                # A slave reloads every channel the master republished
+                reload = (i + 1) in changedChannels
+
+                while modified == True and (
+                    reload
+                    or (
+                        self.myOverlay.channels[i].getTotalDuration()
+                        < PREP_CHANNEL_TIME
+                        and self.myOverlay.channels[i].Playlist.size() < 16288
+                    )
                 ):
+                    reload = False
+
                     # If minimum updating is on, don't attempt to load invalid channels
                     if (
                         self.fullUpdating == False
@@ -222,6 +238,8 @@ class ChannelListThread(threading.Thread):
                                 self.log(traceback.format_exc(), xbmc.LOGERROR)
                                 return
                     else:
+                        self.waitForItemBoundary(i)
+
                         try:
                             # We're not master, so no modifications...just try and load the channel
                             self.chanlist.setupChannel(i + 1, True, False, False)
@@ -257,6 +275,11 @@ class ChannelListThread(threading.Thread):
 
                 timeslept = 0
 
+            # Let the slaves pick up what this pass built
+            if self.myOverlay.isMaster and CHANNEL_SHARING:
+                ADDON_SETTINGS.flush()
+                self.myOverlay.channelSnapshots.publish(CHANNEL_REGISTRY.getChannels())
+
             if self.fullUpdating == False and self.myOverlay.isMaster:
                 return
 
@@ -271,8 +294,62 @@ class ChannelListThread(threading.Thread):
                 time.sleep(2)
                 timeslept += 2
 
+                # Pick up the master's changes as soon as settings2.xml changes
+                if self.myOverlay.isMaster == False and timeslept % 10 == 0:
+                    ADDON_SETTINGS.refresh()
+
+                    if CHANNEL_SHARING:
+                        changed = self.fetchSharedChannels()
+
+                        if changed:
+                            self.myOverlay.sharedChannelChanges.update(changed)
+
+                    if len(self.myOverlay.sharedChannelChanges) > 0:
+                        self.log("Shared settings changed, reloading channels")
+                        break
+
         self.log("All channels up to date.  Exiting thread.")
 
+    # With deterministic builds on, channels the master built from a seed are
+    # rebuilt here instead of copied
+    def fetchSharedChannels(self):
+        if self.chanlist.deterministicBuilds == False:
+            return self.myOverlay.channelSnapshots.fetch()
+
+        return self.myOverlay.channelSnapshots.fetch(
+            self.chanlist.regenerateChannel,
+            [i + 1 for i in self.chanlist.buildOrder],
+        )
+
+    # A slave reloads the channel that is on screen last, since it has to
+    # wait for the current item to finish
+    def getPassOrder(self):
+        order = list(self.chanlist.buildOrder)
+        current = self.myOverlay.currentChannel - 1
+
+        if self.myOverlay.isMaster == False and current in order:
+            order.remove(current)
+            order.append(current)
+
+        return order
+
+    # Don't swap the playlist of the channel being watched in the middle of
+    # an item, wait until the next one starts
+    def waitForItemBoundary(self, index):
+        position = self.myOverlay.lastPlaylistPosition
+
+        while (
+            self.myOverlay.currentChannel - 1 == index
+            and self.myOverlay.lastPlaylistPosition == position
+            and self.myOverlay.Player.isPlaying()
+        ):
+            if self.myOverlay.isExiting:
+                return False
+
+            time.sleep(1)
+
+        return True
+
     def pause(self):
         self.paused = True
         self.chanlist.threadPaused = True
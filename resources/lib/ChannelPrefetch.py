@@ -0,0 +1,148 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+import traceback
+
+import Globals
+import xbmc
+from FileAccess import FileAccess
+from Scheduler import ScheduledTimer
+
+# Give the channel just tuned to the disk and network first
+PREFETCH_DELAY = 5.0
+# Prepared positions only hold while the item they point at plays, so they
+# are worked out again this often
+PREFETCH_INTERVAL = 300.0
+
+
+# Gets the channels likely to be tuned to next ready while a channel plays,
+# usually the ones above and below it and the previous one.  For each it
+# works out where the channel is now, writes its playlist window, finds its
+# logo and renders its bug, and touches the media file it would start with
+# so the NAS is awake.  Tuning to a prepared channel then only has to check
+# that what was prepared still holds.
+class ChannelPrefetcher:
+    def __init__(self, scheduler, playlistWindow, channelBugs):
+        self.scheduler = scheduler
+        self.playlistWindow = playlistWindow
+        self.channelBugs = channelBugs
+        # By channel number
+        self.prepared = {}
+        self.logos = {}
+        self.prefetchLock = threading.Lock()
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("ChannelPrefetcher: " + msg, level)
+
+    # Prepare the channels, [(number, channel, logoPath)], after a short
+    # delay and again every PREFETCH_INTERVAL.  Replaces what was scheduled
+    # before.
+    def schedule(self, targets, renderBugs, delay=PREFETCH_DELAY):
+        timer = ScheduledTimer(
+            self.scheduler, delay, self.prefetch, [list(targets), renderBugs]
+        )
+        timer.name = "ChannelPrefetch"
+        timer.start()
+
+    def prefetch(self, targets, renderBugs):
+        now = time.time()
+        prepared = {}
+        windows = []
+
+        for number, channel, logoPath in targets:
+            try:
+                if channel.isPaused:
+                    position, offset = channel.playlistPosition, channel.showTimeOffset
+                else:
+                    position, offset = channel.getPositionAfter(
+                        now - channel.lastAccessTime
+                    )
+
+                prepared[number] = {
+                    "channel": channel,
+                    "accessTime": channel.lastAccessTime,
+                    "isPaused": channel.isPaused,
+                    "time": now,
+                    "position": position,
+                    "offset": offset,
+                }
+                windows.append((channel, position))
+
+                if FileAccess.exists(logoPath):
+                    if renderBugs:
+                        self.channelBugs.getBug(logoPath)
+                else:
+                    logoPath = Globals.IMAGES_LOC + "Default.png"
+
+                with self.prefetchLock:
+                    self.logos[number] = logoPath
+
+                self.checkReachable(number, channel.getItemFilename(position))
+            except:
+                self.log("Unable to prepare channel " + str(number), xbmc.LOGERROR)
+                self.log(traceback.format_exc(), xbmc.LOGERROR)
+
+        self.playlistWindow.prepare(windows)
+
+        with self.prefetchLock:
+            self.prepared = prepared
+
+        self.log("Prepared channels " + ", ".join(str(number) for number in prepared))
+        self.schedule(targets, renderBugs, PREFETCH_INTERVAL)
+
+    # Only plain files are looked at, plugins and streams are left alone
+    def checkReachable(self, number, filename):
+        if "://" in filename and filename.split("://")[0] not in ("smb", "nfs"):
+            return
+
+        if FileAccess.exists(filename) == False:
+            self.log(
+                "Channel " + str(number) + " starts with " + filename + ", which isn't reachable",
+                xbmc.LOGWARNING,
+            )
+
+    # The position and offset to tune the channel to, None unless it was
+    # prepared and is still playing the item it was prepared for
+    def getTarget(self, number, channel, curtime):
+        with self.prefetchLock:
+            entry = self.prepared.get(number)
+
+        if (
+            entry is None
+            or entry["channel"] is not channel
+            or entry["accessTime"] != channel.lastAccessTime
+            or entry["isPaused"] != channel.isPaused
+        ):
+            return None
+
+        if channel.isPaused:
+            return entry["position"], entry["offset"]
+
+        offset = entry["offset"] + (curtime - entry["time"])
+
+        if offset < 0 or offset >= channel.getItemDuration(entry["position"]):
+            return None
+
+        return entry["position"], offset
+
+    # The logo found for the channel, None if it hasn't been looked for
+    def getLogo(self, number):
+        with self.prefetchLock:
+            return self.logos.get(number)
@@ -0,0 +1,216 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import os
+import re
+import threading
+import traceback
+
+import Globals
+import xbmc
+import xbmcvfs
+from FileAccess import FileAccess
+
+CHANNEL_KEY = re.compile(r"Channel_(\d+)_(.*)")
+# Per-channel state that doesn't change what the channel is
+CHANNEL_STATE_KEYS = ("time", "changed", "buildhash", "seed")
+REGISTRY_SAVE_DELAY = 2.0
+
+
+# Index of the channels defined in settings2.xml, so nothing has to probe
+# all 999 channel slots.  Every entry holds the channel type and a hash of
+# the channel's settings.
+class ChannelRegistry:
+    def __init__(self, settings):
+        self.settings = settings
+        self.filename = xbmcvfs.translatePath(
+            os.path.join(Globals.SETTINGS_LOC, "channels.json")
+        )
+        self.channels = {}
+        self.staleChannels = set()
+        self.rebuildNeeded = True
+        self.saveTimer = None
+        self.registrySemaphore = threading.BoundedSemaphore()
+        self.settings.subscribe(self.onSettingsChanged)
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("ChannelRegistry: " + msg, level)
+
+    def load(self):
+        self.log("load")
+
+        try:
+            fle = FileAccess.open(self.filename, "r")
+            data = json.loads("\n".join(fle.readlines()))
+            fle.close()
+        except:
+            self.log("No usable registry, rebuilding")
+            self.rebuildNeeded = True
+            self.scheduleSave()
+            return False
+
+        # Only trust the index if it was saved for these channel definitions
+        if data.get("signature") != self.getDefinitionSignature():
+            self.log("Registry is out of date, rebuilding")
+            self.rebuildNeeded = True
+            self.scheduleSave()
+            return False
+
+        self.registrySemaphore.acquire()
+        self.channels = {}
+
+        for channel, entry in data.get("channels", {}).items():
+            self.channels[int(channel)] = entry
+
+        self.staleChannels.clear()
+        self.rebuildNeeded = False
+        self.registrySemaphore.release()
+        return True
+
+    def onSettingsChanged(self, changed):
+        for name in changed:
+            match = CHANNEL_KEY.match(name)
+
+            if match and match.group(2) not in CHANNEL_STATE_KEYS:
+                self.staleChannels.add(int(match.group(1)))
+
+        if len(self.staleChannels) > 0:
+            self.scheduleSave()
+
+    # A hash of the channel definitions, the settings the registry is built
+    # from.  The per-channel state that is written all the time is left out.
+    def getDefinitionSignature(self):
+        digest = hashlib.md5()
+
+        for name, value in sorted(list(self.settings.currentSettings.items())):
+            match = CHANNEL_KEY.match(name)
+
+            if match and match.group(2) not in CHANNEL_STATE_KEYS:
+                digest.update((name + "=" + value + "\n").encode("utf-8"))
+
+        return digest.hexdigest()
+
+    def rebuild(self):
+        self.log("rebuild")
+        self.staleChannels.clear()
+        self.rebuildNeeded = False
+        self.channels = self.buildEntries(None)
+
+    # Build registry entries from the settings, for every channel or just
+    # the ones given.  Each pass is a single walk over the settings.
+    def buildEntries(self, channels):
+        values = {}
+
+        for name, value in list(self.settings.currentSettings.items()):
+            match = CHANNEL_KEY.match(name)
+
+            if match is None or match.group(2) in CHANNEL_STATE_KEYS:
+                continue
+
+            channel = int(match.group(1))
+
+            if channels is None or channel in channels:
+                values.setdefault(channel, []).append((match.group(2), value))
+
+        entries = {}
+
+        for channel, items in values.items():
+            items.sort()
+            chtype = dict(items).get("type", "9999")
+
+            try:
+                chtype = int(chtype)
+            except:
+                chtype = 9999
+
+            if chtype == 9999:
+                continue
+
+            entries[channel] = {
+                "type": chtype,
+                "hash": hashlib.md5(json.dumps(items).encode("utf-8")).hexdigest(),
+            }
+
+        return entries
+
+    def update(self):
+        self.registrySemaphore.acquire()
+
+        if self.rebuildNeeded:
+            self.rebuild()
+        elif len(self.staleChannels) > 0:
+            stale = set(self.staleChannels)
+            self.staleChannels.clear()
+            entries = self.buildEntries(stale)
+
+            for channel in stale:
+                if channel in entries:
+                    self.channels[channel] = entries[channel]
+                else:
+                    self.channels.pop(channel, None)
+
+        self.registrySemaphore.release()
+
+    def getChannels(self):
+        self.update()
+        return sorted(self.channels.keys())
+
+    def getMaxChannel(self):
+        channels = self.getChannels()
+
+        if len(channels) == 0:
+            return 0
+
+        return channels[-1]
+
+    def getType(self, channel):
+        self.update()
+        return self.channels.get(channel, {}).get("type", 9999)
+
+    def getHash(self, channel):
+        self.update()
+        return self.channels.get(channel, {}).get("hash", "")
+
+    def scheduleSave(self):
+        self.registrySemaphore.acquire()
+
+        if self.saveTimer is None:
+            self.saveTimer = threading.Timer(REGISTRY_SAVE_DELAY, self.save)
+            self.saveTimer.name = "ChannelRegistrySave"
+            self.saveTimer.start()
+
+        self.registrySemaphore.release()
+
+    def save(self):
+        self.saveTimer = None
+        # If the definitions never reach settings2.xml, the next load sees a
+        # different signature and just rebuilds
+        self.update()
+        data = {"signature": self.getDefinitionSignature(), "channels": self.channels}
+        tmpfile = self.filename + ".tmp"
+
+        try:
+            fle = FileAccess.open(tmpfile, "w")
+            fle.write(json.dumps(data, sort_keys=True))
+            fle.close()
+            FileAccess.replace(tmpfile, self.filename)
+        except:
+            self.log("Unable to save the channel registry", xbmc.LOGERROR)
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
@@ -0,0 +1,345 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import os
+import traceback
+
+import xbmc
+import xbmcvfs
+from FileAccess import FileAccess
+from Globals import *
+
+# Older generations are kept around for slaves that are still copying them
+SNAPSHOT_KEEP = 3
+
+
+# Channel playlists shared with the slaves.  The master publishes every set of
+# channels as a new generation directory that is never modified afterwards,
+# with a manifest listing the channels in it, and then publishes it with a
+# new "current.<generation>" pointer file.  Pointers are never overwritten,
+# the newest one is current and the older ones are removed after it exists,
+# so a slave never finds the pointer missing even on shares without an
+# atomic replace.  Slaves follow the pointer, so they never see a half
+# written channel and don't need any lock.  A channel that didn't change since the
+# last generation stays where it is and the manifest just refers to it.
+# Channels built deterministically also list the seed and library they were
+# built from, so slaves that see the same library can rebuild them instead
+# of copying them.
+class ChannelSnapshots:
+    def __init__(self):
+        self.sharedLoc = (
+            xbmcvfs.translatePath(
+                os.path.join(ADDON.getSetting("SettingsFolder"), "cache", "snapshots")
+            )
+            + "/"
+        )
+        self.pointerPrefix = "current."
+        self.localManifestName = CHANNELS_LOC + "snapshot.json"
+        self.generation = 0
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        log("ChannelSnapshots: " + msg, level)
+
+    def getGenerationLoc(self, generation):
+        return self.sharedLoc + str(generation) + "/"
+
+    def readJSON(self, filename):
+        try:
+            fle = FileAccess.open(filename, "r")
+            data = json.loads("\n".join(fle.readlines()))
+            fle.close()
+            return data
+        except:
+            return None
+
+    def writeJSON(self, filename, data):
+        tmpfile = filename + ".tmp"
+        fle = FileAccess.open(tmpfile, "w")
+        fle.write(json.dumps(data, sort_keys=True))
+        fle.close()
+        FileAccess.replace(tmpfile, filename)
+
+    def getFileHash(self, filename):
+        try:
+            fle = FileAccess.open(filename, "r")
+            data = "\n".join(fle.readlines())
+            fle.close()
+        except:
+            return ""
+
+        return hashlib.md5(data.encode("utf-8", "ignore")).hexdigest()
+
+    # The generation of every pointer, None if the folder can't be read
+    def getPointers(self):
+        try:
+            dirs, files = xbmcvfs.listdir(self.sharedLoc)
+        except:
+            return None
+
+        pointers = []
+
+        for name in files:
+            if name.startswith(self.pointerPrefix):
+                try:
+                    pointers.append(int(name[len(self.pointerPrefix) :]))
+                except:
+                    pass
+
+        return pointers
+
+    # The generation slaves should read, 0 if nothing was published yet and
+    # None if the shared folder can't be read
+    def getCurrentGeneration(self):
+        pointers = self.getPointers()
+
+        if pointers is None:
+            return None
+
+        return max(pointers + [0])
+
+    def writePointer(self, generation):
+        fle = FileAccess.open(self.sharedLoc + self.pointerPrefix + str(generation), "w")
+        fle.write(str(generation))
+        fle.close()
+
+    def getManifest(self, generation):
+        if generation < 1:
+            return None
+
+        return self.readJSON(self.getGenerationLoc(generation) + "manifest.json")
+
+    def publish(self, channels):
+        self.log("publish")
+        current = self.getCurrentGeneration()
+
+        if current is None:
+            self.log("Unable to read the shared folder", xbmc.LOGERROR)
+            return False
+
+        previous = self.getManifest(current) or {"channels": {}}
+        generation = current + 1
+        generationLoc = self.getGenerationLoc(generation)
+        entries = {}
+        copies = []
+
+        for channel in channels:
+            filename = CHANNELS_LOC + "channel_" + str(channel) + ".m3u"
+
+            if FileAccess.exists(filename) == False:
+                continue
+
+            entry = {"hash": self.getFileHash(filename), "generation": generation}
+            build = ADDON_SETTINGS.getSetting("Channel_" + str(channel) + "_seed")
+
+            if len(build) > 0:
+                entry["build"] = build
+
+            old = previous["channels"].get(str(channel))
+
+            if old != None and old["hash"] == entry["hash"]:
+                entry["generation"] = old["generation"]
+            else:
+                copies.append(channel)
+
+            entries[str(channel)] = entry
+
+        if len(copies) == 0 and entries == previous["channels"]:
+            self.log("Nothing changed since generation " + str(current))
+            self.generation = current
+            return True
+
+        try:
+            FileAccess.makedirs(generationLoc)
+
+            for channel in copies:
+                FileAccess.copy(
+                    CHANNELS_LOC + "channel_" + str(channel) + ".m3u",
+                    generationLoc + "channel_" + str(channel) + ".m3u",
+                )
+
+            # The manifest completes the generation, the pointer publishes it
+            manifest = {"generation": generation, "channels": entries}
+            self.writeJSON(generationLoc + "manifest.json", manifest)
+            self.writePointer(generation)
+            self.writeJSON(self.localManifestName, manifest)
+        except:
+            self.log("Unable to publish the channels", xbmc.LOGERROR)
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
+            return False
+
+        self.generation = generation
+        self.log(
+            "Published generation "
+            + str(generation)
+            + ", copied "
+            + str(len(copies))
+            + " of "
+            + str(len(entries))
+            + " channels",
+            xbmc.LOGINFO,
+        )
+        self.prune(generation)
+        return True
+
+    # Remove the generations that no kept manifest refers to anymore
+    def prune(self, generation):
+        keep = set()
+
+        for gen in range(max(1, generation - SNAPSHOT_KEEP + 1), generation + 1):
+            manifest = self.getManifest(gen)
+            keep.add(gen)
+
+            if manifest != None:
+                for entry in manifest["channels"].values():
+                    keep.add(entry["generation"])
+
+        try:
+            dirs, files = xbmcvfs.listdir(self.sharedLoc)
+        except:
+            return
+
+        # The new pointer exists, the older ones can go
+        for name in files:
+            if name == "current" or (
+                name.startswith(self.pointerPrefix)
+                and name != self.pointerPrefix + str(generation)
+            ):
+                FileAccess.delete(self.sharedLoc + name)
+
+        for name in dirs:
+            try:
+                gen = int(name)
+            except:
+                continue
+
+            if gen in keep:
+                continue
+
+            self.log("Removing generation " + name)
+            genLoc = self.getGenerationLoc(gen)
+
+            try:
+                subdirs, genfiles = xbmcvfs.listdir(genLoc)
+
+                for fle in genfiles:
+                    FileAccess.delete(genLoc + fle)
+
+                xbmcvfs.rmdir(genLoc)
+            except:
+                self.log("Unable to remove generation " + name)
+
+    # Copy the current generation to the local cache.  Only the channels
+    # that differ from the last fetch are copied, or rebuilt with rebuild
+    # (channel, seed, library) if they have a seed and the result matches.
+    # order lists the channels in the order they have to be rebuilt in.
+    # Returns the channels that changed, or None if the master hasn't
+    # published anything.  While the pointer can't be read the generation
+    # fetched last is kept.
+    def fetch(self, rebuild=None, order=None):
+        self.log("fetch")
+        generation = self.getCurrentGeneration()
+
+        if generation is None:
+            self.log("Unable to read the shared folder, keeping generation " + str(self.generation))
+            return set() if self.generation > 0 else None
+
+        if generation > 0 and generation == self.generation:
+            return set()
+
+        manifest = self.getManifest(generation)
+
+        if manifest == None:
+            return None
+
+        local = self.readJSON(self.localManifestName) or {"channels": {}}
+
+        if local.get("generation") == generation:
+            self.generation = generation
+            return set()
+
+        changed = set()
+        rebuilt = 0
+        channels = sorted(manifest["channels"].keys(), key=int)
+
+        if order is not None:
+            channels.sort(
+                key=lambda channel: order.index(int(channel))
+                if int(channel) in order
+                else len(order)
+            )
+
+        try:
+            for channel in channels:
+                entry = manifest["channels"][channel]
+
+                if local["channels"].get(channel) == entry:
+                    continue
+
+                if rebuild is not None and self.rebuildChannel(rebuild, channel, entry):
+                    changed.add(int(channel))
+                    rebuilt += 1
+                    continue
+
+                FileAccess.copy(
+                    self.getGenerationLoc(entry["generation"])
+                    + "channel_"
+                    + channel
+                    + ".m3u",
+                    CHANNELS_LOC + "channel_" + channel + ".m3u",
+                )
+                changed.add(int(channel))
+
+            self.writeJSON(self.localManifestName, manifest)
+        except:
+            self.log("Unable to fetch generation " + str(generation), xbmc.LOGERROR)
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
+            return None
+
+        self.generation = generation
+        self.log(
+            "Fetched generation "
+            + str(generation)
+            + ", "
+            + str(len(changed))
+            + " channels changed, "
+            + str(rebuilt)
+            + " rebuilt locally"
+        )
+        return changed
+
+    def rebuildChannel(self, rebuild, channel, entry):
+        if "build" not in entry:
+            return False
+
+        try:
+            seed, library = entry["build"].split(",", 1)
+
+            if rebuild(int(channel), seed, library) == False:
+                return False
+        except:
+            self.log("Unable to rebuild channel " + channel, xbmc.LOGERROR)
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
+            return False
+
+        if self.getFileHash(CHANNELS_LOC + "channel_" + channel + ".m3u") != entry["hash"]:
+            self.log("Rebuilt channel " + channel + " differs from the master")
+            return False
+
+        return True
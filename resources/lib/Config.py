@@ -611,11 +611,16 @@ class ConfigWindow(xbmcgui.WindowXMLDialog):
 
         self.listcontrol = self.getControl(102)
 
+        # Every slot stays selectable so new channels can be added anywhere,
+        # but the list is filled in a single call
+        items = []
+
         for i in range(999):
             theitem = xbmcgui.ListItem()
             theitem.setLabel(str(i + 1))
-            self.listcontrol.addItem(theitem)
+            items.append(theitem)
 
+        self.listcontrol.addItems(items)
         self.updateListing()
         xbmc.executebuiltin("Dialog.Close(busydialog)")
         self.getControl(105).setVisible(True)
@@ -625,14 +630,15 @@ class ConfigWindow(xbmcgui.WindowXMLDialog):
 
     def updateListing(self, channel=-1):
         self.log("updateListing")
-        start = 0
-        end = 999
 
+        # Empty slots start out blank, so only the defined channels need labels
         if channel > -1:
-            start = channel - 1
-            end = channel
+            channels = [channel]
+        else:
+            channels = CHANNEL_REGISTRY.getChannels()
 
-        for i in range(start, end):
+        for chan in channels:
+            i = chan - 1
             theitem = self.listcontrol.getListItem(i)
             chantype = 9999
             chansetting1 = ""
@@ -0,0 +1,227 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import json
+import os
+import threading
+import time
+import traceback
+
+import Globals
+import xbmc
+import xbmcvfs
+from FileAccess import FileAccess
+from Scheduler import ScheduledTimer
+
+# Values older than this aren't served after a restart, they are refetched
+MAX_AGE = 86400
+SAVE_DELAY = 10.0
+
+
+# Dates in the fetched data are stored as tagged strings
+def encodeValue(value):
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    if isinstance(value, datetime.date):
+        return {"__date__": value.strftime("%Y-%m-%d")}
+
+    raise TypeError(repr(value) + " can't be stored")
+
+
+def decodeValue(data):
+    if "__datetime__" in data:
+        return datetime.datetime(
+            *time.strptime(data["__datetime__"], "%Y-%m-%dT%H:%M:%S")[:6]
+        )
+
+    if "__date__" in data:
+        return datetime.date(*time.strptime(data["__date__"], "%Y-%m-%d")[:3])
+
+    return data
+
+
+class DataProvider:
+    def __init__(self, name, fetch, ttl, isValid, onUpdate, maxAge):
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        self.isValid = isValid
+        self.onUpdate = onUpdate
+        self.maxAge = maxAge
+        self.value = None
+        self.encoded = None
+        self.fetched = 0
+        self.refreshing = False
+
+
+# The data behind the Channel 99 pages.  Every source declares how long its
+# data stays fresh.  Reading a source always returns the last good value
+# right away, and if that value is older than the source's TTL it is
+# refetched in the background on the overlay's scheduler.  A source is only
+# ever fetched once at a time, and sources are fetched side by side.  When a
+# refetch brings new data the source's onUpdate callback redraws the page.
+# The last good values are saved, so the pages have data as soon as the
+# overlay starts.
+class DataProviders:
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.filename = xbmcvfs.translatePath(
+            os.path.join(Globals.SETTINGS_LOC, "providers.json")
+        )
+        self.providers = {}
+        self.saved = {}
+        self.saveTimer = None
+        self.providerLock = threading.Lock()
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("DataProviders: " + msg, level)
+
+    def load(self):
+        self.log("load")
+
+        try:
+            fle = FileAccess.open(self.filename, "r")
+            self.saved = json.loads(
+                "\n".join(fle.readlines()), object_hook=decodeValue
+            )
+            fle.close()
+        except:
+            self.saved = {}
+
+    def save(self):
+        data = {}
+
+        with self.providerLock:
+            for provider in self.providers.values():
+                if provider.encoded is not None:
+                    data[provider.name] = {
+                        "fetched": provider.fetched,
+                        "value": provider.value,
+                    }
+
+        try:
+            tmpfile = self.filename + ".tmp"
+            fle = FileAccess.open(tmpfile, "w")
+            fle.write(json.dumps(data, default=encodeValue))
+            fle.close()
+            FileAccess.replace(tmpfile, self.filename)
+        except:
+            self.log("Unable to save the provider data", xbmc.LOGERROR)
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
+
+    def scheduleSave(self):
+        self.saveTimer = ScheduledTimer(self.scheduler, SAVE_DELAY, self.save)
+        self.saveTimer.name = "DataProvidersSave"
+        self.saveTimer.start()
+
+    # isValid decides whether a fetched value may replace the last good one,
+    # by default anything but None does
+    def register(
+        self, name, fetch, ttl, isValid=None, onUpdate=None, maxAge=MAX_AGE
+    ):
+        if isValid is None:
+            isValid = lambda value: value is not None
+
+        provider = DataProvider(name, fetch, ttl, isValid, onUpdate, maxAge)
+        saved = self.saved.get(name)
+
+        if saved is not None and time.time() - saved.get("fetched", 0) < maxAge:
+            try:
+                provider.encoded = json.dumps(
+                    saved["value"], sort_keys=True, default=encodeValue
+                )
+                provider.value = saved["value"]
+                provider.fetched = saved["fetched"]
+            except:
+                self.log("Dropping the saved data of " + name)
+
+        with self.providerLock:
+            self.providers[name] = provider
+
+    # The last good value, None if there is none yet
+    def get(self, name):
+        provider = self.providers[name]
+
+        with self.providerLock:
+            value = provider.value
+            stale = (
+                provider.encoded is None
+                or time.time() - provider.fetched >= provider.ttl
+            )
+
+        if stale:
+            self.refresh(name)
+
+        return value
+
+    def refresh(self, name):
+        provider = self.providers[name]
+
+        with self.providerLock:
+            if provider.refreshing:
+                return
+
+            provider.refreshing = True
+
+        timer = ScheduledTimer(self.scheduler, 0, self.fetchProvider, [provider])
+        timer.name = "DataProvider" + name
+        timer.start()
+
+    def fetchProvider(self, provider):
+        self.log("Fetching " + provider.name)
+        start = time.time()
+        value = None
+
+        try:
+            value = provider.fetch()
+        except:
+            self.log("Unable to fetch " + provider.name, xbmc.LOGERROR)
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
+
+        changed = False
+
+        with self.providerLock:
+            provider.refreshing = False
+
+            if provider.isValid(value):
+                encoded = json.dumps(value, sort_keys=True, default=encodeValue)
+                changed = encoded != provider.encoded
+                provider.value = value
+                provider.encoded = encoded
+                provider.fetched = time.time()
+
+        self.log(
+            "Fetched "
+            + provider.name
+            + " in "
+            + str(round(time.time() - start, 2))
+            + "s"
+            + (", changed" if changed else "")
+        )
+
+        if changed:
+            self.scheduleSave()
+
+            if provider.onUpdate is not None:
+                try:
+                    provider.onUpdate()
+                except:
+                    self.log("Unable to update " + provider.name, xbmc.LOGERROR)
+                    self.log(traceback.format_exc(), xbmc.LOGERROR)
@@ -1128,9 +1128,14 @@ class EPGWindow(xbmcgui.WindowXMLDialog):
                 if not showArtwork:
                     try:
                         # Try to get artwork from the playlist item metadata
-                        item = xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getitem(
+                        kodiIndex = self.MyOverlayWindow.playlistWindow.toKodiIndex(
                             playlistPosition
                         )
+                        item = None
+
+                        if kodiIndex is not None:
+                            item = xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getitem(kodiIndex)
+
                         if item:
                             # Try different artwork types
                             for artType in ["landscape", "fanart", "thumb", "poster"]:
@@ -1274,7 +1279,7 @@ class EPGWindow(xbmcgui.WindowXMLDialog):
             showoffset = 0
 
         if self.MyOverlayWindow.currentChannel == newchan:
-            if plpos == xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getposition():
+            if plpos == self.MyOverlayWindow.playlistWindow.getPosition():
                 self.log("selectShow return current show")
                 return
 
@@ -1301,7 +1306,7 @@ class EPGWindow(xbmcgui.WindowXMLDialog):
             # The only way this isn't true is if the current channel is curchannel since
             # it could have been fast forwarded or rewinded (rewound)?
             if channel == self.MyOverlayWindow.currentChannel:
-                playlistpos = xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getposition()
+                playlistpos = self.MyOverlayWindow.playlistWindow.getPosition()
                 videotime = xbmc.Player().getTime()
                 reftime = time.time()
             else:
@@ -21,6 +21,8 @@ import os
 import xbmc
 import xbmcaddon
 import xbmcgui
+from ArtworkIndex import pickArt
+from Globals import ARTWORK_INDEX, JSON_RPC
 
 # Constants
 ADDON = xbmcaddon.Addon("script.paragontv")
@@ -35,6 +37,29 @@ ACTION_MOVE_DOWN = 4
 ACTION_SELECT_ITEM = 7
 
 
+def getEpisodesQuery(showId, seasonNum):
+    """The episodes of one season of a show"""
+    return {
+        "jsonrpc": "2.0",
+        "method": "VideoLibrary.GetEpisodes",
+        "params": {
+            "tvshowid": showId,
+            "season": seasonNum,
+            "properties": [
+                "title",
+                "episode",
+                "plot",
+                "thumbnail",
+                "file",
+                "runtime",
+                "firstaired",
+            ],
+            "sort": {"order": "ascending", "method": "episode"},
+        },
+        "id": 1,
+    }
+
+
 class SeasonBrowserWindow(xbmcgui.WindowXMLDialog):
     """First window - displays seasons only"""
 
@@ -87,13 +112,21 @@ class SeasonBrowserWindow(xbmcgui.WindowXMLDialog):
                     "id": 1,
                 }
 
-                result = xbmc.executeJSONRPC(json.dumps(json_query))
-                result = json.loads(result)
+                result = JSON_RPC.request(json_query)
 
                 if "result" in result and "seasons" in result["result"]:
                     self.seasons = result["result"]["seasons"]
                     self.log("Loaded %d seasons" % len(self.seasons))
 
+                    # Fetch the episodes of every season in one batch, so
+                    # opening a season is answered from the cache
+                    JSON_RPC.batch(
+                        [
+                            getEpisodesQuery(showId, season.get("season", 0))
+                            for season in self.seasons
+                        ]
+                    )
+
         except Exception as e:
             self.log("Error loading seasons: " + str(e))
 
@@ -142,32 +175,11 @@ class SeasonBrowserWindow(xbmcgui.WindowXMLDialog):
                 if os.path.exists(landscapePath):
                     return landscapePath
 
-            # Try JSON-RPC to get show artwork
-            json_query = {
-                "jsonrpc": "2.0",
-                "method": "VideoLibrary.GetTVShows",
-                "params": {
-                    "filter": {"field": "title", "operator": "is", "value": showTitle},
-                    "properties": ["art"],
-                },
-                "id": 1,
-            }
-
-            result = xbmc.executeJSONRPC(json.dumps(json_query))
-            result = json.loads(result)
-
-            if (
-                "result" in result
-                and "tvshows" in result["result"]
-                and result["result"]["tvshows"]
-            ):
-                show = result["result"]["tvshows"][0]
-                if "art" in show:
-                    # Priority: landscape > fanart
-                    if "landscape" in show["art"]:
-                        return show["art"]["landscape"]
-                    elif "fanart" in show["art"]:
-                        return show["art"]["fanart"]
+            # Try the library artwork, priority: landscape > fanart
+            art = pickArt(ARTWORK_INDEX.getShowArt(showTitle), ("landscape", "fanart"))
+
+            if art:
+                return art
 
         except Exception as e:
             self.log("Error getting show landscape: " + str(e))
@@ -279,28 +291,8 @@ class EpisodeListWindow(xbmcgui.WindowXMLDialog):
                 showId = int(showPath.split("/")[-2])
 
                 # Get episodes using JSON-RPC
-                json_query = {
-                    "jsonrpc": "2.0",
-                    "method": "VideoLibrary.GetEpisodes",
-                    "params": {
-                        "tvshowid": showId,
-                        "season": self.seasonNum,
-                        "properties": [
-                            "title",
-                            "episode",
-                            "plot",
-                            "thumbnail",
-                            "file",
-                            "runtime",
-                            "firstaired",
-                        ],
-                        "sort": {"order": "ascending", "method": "episode"},
-                    },
-                    "id": 1,
-                }
-
-                result = xbmc.executeJSONRPC(json.dumps(json_query))
-                result = json.loads(result)
+                json_query = getEpisodesQuery(showId, self.seasonNum)
+                result = JSON_RPC.request(json_query)
 
                 if "result" in result and "episodes" in result["result"]:
                     self.episodes = result["result"]["episodes"]
@@ -368,33 +360,12 @@ class EpisodeListWindow(xbmcgui.WindowXMLDialog):
         """Get show logo/banner artwork"""
         try:
             showTitle = self.showInfo.get("title", "")
+            art = pickArt(
+                ARTWORK_INDEX.getShowArt(showTitle), ("clearlogo", "banner", "landscape")
+            )
 
-            json_query = {
-                "jsonrpc": "2.0",
-                "method": "VideoLibrary.GetTVShows",
-                "params": {
-                    "filter": {"field": "title", "operator": "is", "value": showTitle},
-                    "properties": ["art"],
-                },
-                "id": 1,
-            }
-
-            result = xbmc.executeJSONRPC(json.dumps(json_query))
-            result = json.loads(result)
-
-            if (
-                "result" in result
-                and "tvshows" in result["result"]
-                and result["result"]["tvshows"]
-            ):
-                show = result["result"]["tvshows"][0]
-                if "art" in show:
-                    if "clearlogo" in show["art"]:
-                        return show["art"]["clearlogo"]
-                    elif "banner" in show["art"]:
-                        return show["art"]["banner"]
-                    elif "landscape" in show["art"]:
-                        return show["art"]["landscape"]
+            if art:
+                return art
 
         except Exception as e:
             self.log("Error getting show artwork: " + str(e))
@@ -20,6 +20,7 @@ import codecs
 import os
 import random
 import shutil
+import socket
 import subprocess
 import threading
 import time
@@ -34,12 +35,22 @@ if sys.version_info[0] >= 3:
     unicode = str
     basestring = str
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 
 VFS_AVAILABLE = True
 
 
 FILE_LOCK_MAX_FILE_TIMEOUT = 13
 FILE_LOCK_NAME = "FileLock.dat"
+# A lease that hasn't been renewed for this long belongs to a dead instance
+FILE_LOCK_LEASE_TIMEOUT = 45
+# How far apart the clocks of two instances sharing a lease may be
+FILE_LOCK_CLOCK_SKEW = 60
+FILE_LOCK_LEASE_REFRESH = 10.0
 
 
 class FileAccess:
@@ -132,6 +143,30 @@ class FileAccess:
         FileAccess.log("OSError")
         raise OSError()
 
+    @staticmethod
+    def delete(filename):
+        FileAccess.log("delete " + filename)
+        return xbmcvfs.delete(filename)
+
+    # Move path over newpath, replacing newpath if it exists
+    @staticmethod
+    def replace(path, newpath):
+        FileAccess.log("replace " + newpath + " with " + path)
+
+        try:
+            os.replace(path, newpath)
+            return True
+        except:
+            pass
+
+        try:
+            if xbmcvfs.exists(newpath):
+                xbmcvfs.delete(newpath)
+        except:
+            pass
+
+        return FileAccess.rename(path, newpath)
+
     @staticmethod
     def makedirs(directory):
         try:
@@ -206,37 +241,79 @@ class VFSFile:
         return loc
 
 
+# Pick the lock backend for this instance.  Locks on a local profile are
+# OS advisory locks, a shared settings folder uses leases.
+def createFileLock():
+    if Globals.CHANNEL_SHARING == False and fcntl != None:
+        return FcntlFileLock()
+
+    return LeaseFileLock()
+
+
+# The original lock: a shared lock file that is taken by renaming it, with
+# every entry rewritten every few seconds so stale ones can be detected.
 class FileLock:
+    REFRESH_INTERVAL = 4.0
+
     def __init__(self):
         random.seed()
         FileAccess.makedirs(Globals.LOCK_LOC)
         self.lockFileName = Globals.LOCK_LOC + FILE_LOCK_NAME
         self.lockedList = []
-        self.refreshLocksTimer = threading.Timer(4.0, self.refreshLocks)
-        self.refreshLocksTimer.name = "RefreshLocks"
-        self.refreshLocksTimer.start()
+        self.refreshLocksTimer = None
         self.isExiting = False
         self.grabSemaphore = threading.BoundedSemaphore()
         self.listSemaphore = threading.BoundedSemaphore()
+        self.startRefreshTimer()
         self.log("FileLock instance")
 
+    def startRefreshTimer(self):
+        if self.REFRESH_INTERVAL == None or self.isExiting:
+            return False
+
+        self.refreshLocksTimer = threading.Timer(
+            self.REFRESH_INTERVAL, self.refreshLocks
+        )
+        self.refreshLocksTimer.name = "RefreshLocks"
+        self.refreshLocksTimer.start()
+        return True
+
     def close(self):
         self.log("close")
         self.isExiting = True
 
-        if self.refreshLocksTimer.is_alive():
+        if self.refreshLocksTimer != None and self.refreshLocksTimer.is_alive():
             try:
                 self.refreshLocksTimer.cancel()
                 self.refreshLocksTimer.join()
             except:
                 pass
 
-        for item in self.lockedList:
+        for item in list(self.lockedList):
             self.unlockFile(item)
 
     def log(self, msg, level=xbmc.LOGDEBUG):
         Globals.log("FileLock: " + msg, level)
 
+    def removeLockedItem(self, filename):
+        found = False
+        self.listSemaphore.acquire()
+
+        if filename in self.lockedList:
+            self.lockedList.remove(filename)
+            found = True
+
+        self.listSemaphore.release()
+        return found
+
+    def addLockedItem(self, filename):
+        self.listSemaphore.acquire()
+
+        if filename not in self.lockedList:
+            self.lockedList.append(filename)
+
+        self.listSemaphore.release()
+
     def refreshLocks(self):
         self.log("refreshLocks")
 
@@ -247,14 +324,7 @@ class FileLock:
 
             self.lockFile(item, True)
 
-        self.refreshLocksTimer = threading.Timer(4.0, self.refreshLocks)
-
-        if self.isExiting == False:
-            self.refreshLocksTimer.name = "RefreshLocks"
-            self.refreshLocksTimer.start()
-            return True
-
-        return False
+        return self.startRefreshTimer()
 
     def lockFile(self, filename, block=False):
         self.log("lockFile " + filename)
@@ -513,3 +583,348 @@ class FileLock:
         self.releaseLockFile()
         self.grabSemaphore.release()
         return retval
+
+
+# OS advisory locks for a local profile.  The kernel drops the lock when
+# the process goes away, so nothing has to be refreshed.
+class FcntlFileLock(FileLock):
+    REFRESH_INTERVAL = None
+
+    def __init__(self):
+        self.handles = {}
+        FileLock.__init__(self)
+
+    def getLockName(self, filename):
+        return Globals.LOCK_LOC + filename + ".flock"
+
+    def tryLock(self, handle):
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except (IOError, OSError):
+            return False
+
+    # Wait for the lock with a blocking flock, so the kernel hands it over
+    # as soon as it is released.  flock can't time out, so it waits in a
+    # helper thread.  When we give up, the helper drops the lock once it
+    # gets it and closes the handle.
+    def waitLock(self, handle):
+        state = {"locked": False, "failed": False, "abandoned": False}
+        stateLock = threading.Lock()
+
+        def wait():
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            except (IOError, OSError):
+                with stateLock:
+                    if state["abandoned"]:
+                        os.close(handle)
+                    else:
+                        state["failed"] = True
+
+                return
+
+            with stateLock:
+                if state["abandoned"]:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+                    os.close(handle)
+                else:
+                    state["locked"] = True
+
+        thread = threading.Thread(target=wait, name="FcntlFileLockWait")
+        thread.daemon = True
+        thread.start()
+        thread.join(FILE_LOCK_MAX_FILE_TIMEOUT)
+
+        with stateLock:
+            if state["locked"]:
+                return True
+
+            if state["failed"]:
+                os.close(handle)
+            else:
+                state["abandoned"] = True
+
+        return False
+
+    def lockFile(self, filename, block=False):
+        self.log("lockFile " + filename)
+        filename = filename.lower()
+
+        if filename in self.handles:
+            return True
+
+        try:
+            handle = os.open(self.getLockName(filename), os.O_CREAT | os.O_RDWR, 0o644)
+        except OSError:
+            self.log("Unable to open the lock file")
+            return False
+
+        if self.tryLock(handle) == False:
+            if block == False:
+                os.close(handle)
+                self.log("File is locked")
+                return False
+
+            # waitLock closes the handle when it gives up
+            if self.waitLock(handle) == False:
+                self.log("File is locked")
+                return False
+
+        self.grabSemaphore.acquire()
+        self.handles[filename] = handle
+        self.grabSemaphore.release()
+        self.addLockedItem(filename)
+        return True
+
+    def unlockFile(self, filename):
+        self.log("unlockFile " + filename)
+        filename = filename.lower()
+
+        if self.removeLockedItem(filename) == False:
+            self.log("Lock not found")
+            return False
+
+        self.grabSemaphore.acquire()
+        handle = self.handles.pop(filename, None)
+        self.grabSemaphore.release()
+
+        if handle != None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+            finally:
+                os.close(handle)
+
+        return True
+
+    def isFileLocked(self, filename, block=False):
+        self.log("isFileLocked " + filename)
+        filename = filename.lower()
+
+        if filename in self.handles:
+            return True
+
+        try:
+            handle = os.open(self.getLockName(filename), os.O_CREAT | os.O_RDWR, 0o644)
+        except OSError:
+            return True
+
+        try:
+            if self.tryLock(handle) == False:
+                return True
+
+            fcntl.flock(handle, fcntl.LOCK_UN)
+        finally:
+            os.close(handle)
+
+        return False
+
+
+# Leases for a shared settings folder.  A lock is a single file that is
+# created atomically and holds its owner and a heartbeat.  The owner
+# rewrites it every FILE_LOCK_LEASE_REFRESH seconds, and anyone may take
+# over a lease that hasn't changed for FILE_LOCK_LEASE_TIMEOUT seconds.
+class LeaseFileLock(FileLock):
+    REFRESH_INTERVAL = FILE_LOCK_LEASE_REFRESH
+
+    def __init__(self):
+        self.owner = (
+            socket.gethostname()
+            + "-"
+            + str(os.getpid())
+            + "-"
+            + str(random.randint(1, 60000))
+        )
+        self.heartbeat = 0
+        self.observed = {}
+        FileLock.__init__(self)
+
+    def getLockName(self, filename):
+        return Globals.LOCK_LOC + filename + ".lease"
+
+    def makeLease(self):
+        self.heartbeat += 1
+        return self.owner + "," + str(self.heartbeat) + "," + str(int(time.time()))
+
+    def readLease(self, leasename):
+        try:
+            fle = FileAccess.open(leasename, "r")
+            data = fle.read(1024)
+            fle.close()
+        except:
+            return None
+
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", "ignore")
+
+        if len(data.strip()) == 0:
+            return None
+
+        # A partial lease is being written right now, and is never stale
+        # until it stops changing
+        return tuple(data.strip().split(","))
+
+    def createLease(self, leasename):
+        data = self.makeLease()
+
+        if "://" not in leasename:
+            try:
+                handle = os.open(leasename, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except OSError:
+                return False
+
+            try:
+                os.write(handle, data.encode("utf-8"))
+            finally:
+                os.close(handle)
+
+            return True
+
+        # VFS paths have no exclusive create.  The lease is written under a
+        # name of its own and renamed into place, and the rename fails once
+        # the lease exists.  FileAccess.rename isn't used, its fallbacks may
+        # replace the file.
+        tmpname = leasename + "." + self.owner + ".tmp"
+
+        try:
+            fle = FileAccess.open(tmpname, "w")
+            fle.write(data)
+            fle.close()
+        except:
+            return False
+
+        try:
+            created = FileAccess.exists(leasename) == False and xbmcvfs.rename(
+                tmpname, leasename
+            )
+        except:
+            created = False
+
+        if created == False:
+            FileAccess.delete(tmpname)
+
+        return created
+
+    def renewLease(self, leasename):
+        try:
+            fle = FileAccess.open(leasename, "w")
+            fle.write(self.makeLease())
+            fle.close()
+        except:
+            self.log("Unable to renew the lease")
+            return False
+
+        return True
+
+    # A lease is stale once it isn't renewed while we watch it, or when the
+    # time written in it is old enough that no clock skew explains it.  The
+    # latter lets a new instance take over from one that died long ago.
+    def isStale(self, leasename, lease):
+        now = time.time()
+
+        try:
+            if now - int(lease[2]) > FILE_LOCK_LEASE_TIMEOUT + FILE_LOCK_CLOCK_SKEW:
+                return True
+        except:
+            pass
+
+        seen = self.observed.get(leasename)
+
+        if seen == None or seen[0] != lease:
+            self.observed[leasename] = (lease, now)
+            return False
+
+        return now - seen[1] > FILE_LOCK_LEASE_TIMEOUT
+
+    def claimLease(self, leasename):
+        if self.createLease(leasename):
+            return True
+
+        lease = self.readLease(leasename)
+
+        if lease == None:
+            return self.createLease(leasename)
+
+        if lease[0] == self.owner:
+            return self.renewLease(leasename)
+
+        if self.isStale(leasename, lease) == False:
+            return False
+
+        self.log("Taking over a stale lease from " + lease[0])
+        stalename = leasename + "." + str(random.randint(1, 60000)) + ".stale"
+
+        try:
+            FileAccess.rename(leasename, stalename)
+        except:
+            return False
+
+        # Someone else may have replaced the lease in the meantime
+        if self.readLease(stalename) != lease:
+            try:
+                FileAccess.rename(stalename, leasename)
+            except:
+                pass
+
+            return False
+
+        FileAccess.delete(stalename)
+        self.observed.pop(leasename, None)
+        return self.createLease(leasename)
+
+    def lockFile(self, filename, block=False):
+        self.log("lockFile " + filename)
+        filename = filename.lower()
+        leasename = self.getLockName(filename)
+        timeout = time.time() + FILE_LOCK_MAX_FILE_TIMEOUT
+
+        while True:
+            self.grabSemaphore.acquire()
+
+            try:
+                locked = self.claimLease(leasename)
+            finally:
+                self.grabSemaphore.release()
+
+            if locked:
+                self.addLockedItem(filename)
+                return True
+
+            if block == False or time.time() > timeout:
+                self.log("File is locked")
+                return False
+
+            time.sleep(0.25)
+
+    def unlockFile(self, filename):
+        self.log("unlockFile " + filename)
+        filename = filename.lower()
+
+        if self.removeLockedItem(filename) == False:
+            self.log("Lock not found")
+            return False
+
+        leasename = self.getLockName(filename)
+        self.grabSemaphore.acquire()
+
+        try:
+            lease = self.readLease(leasename)
+
+            if lease != None and lease[0] == self.owner:
+                FileAccess.delete(leasename)
+        finally:
+            self.grabSemaphore.release()
+
+        return True
+
+    def isFileLocked(self, filename, block=False):
+        self.log("isFileLocked " + filename)
+        lease = self.readLease(self.getLockName(filename.lower()))
+
+        if lease == None:
+            return False
+
+        if lease[0] == self.owner:
+            return True
+
+        return self.isStale(self.getLockName(filename.lower()), lease) == False
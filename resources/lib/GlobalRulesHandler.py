@@ -22,6 +22,23 @@ import xbmcgui
 from Globals import *
 from Rules import *
 
+# Parsed global rule settings, shared by every handler until they change
+globalRuleCache = {}
+
+
+def clearGlobalRuleCache():
+    globalRuleCache.clear()
+
+
+def onSettingsChanged(changed):
+    for name in changed:
+        if name.startswith("GlobalRule"):
+            clearGlobalRuleCache()
+            return
+
+
+ADDON_SETTINGS.subscribe(onSettingsChanged)
+
 
 class GlobalRulesHandler:
     def __init__(self):
@@ -77,9 +94,18 @@ class GlobalRulesHandler:
 
     def getEnabledGlobalRules(self, channelType):
         """Get list of enabled global rules for a specific channel type"""
+        key = "enabled_" + str(channelType)
+
+        enabledRules = globalRuleCache.get(key)
+
+        if enabledRules is not None:
+            return enabledRules
+
+        # Other threads may read the cache, so only publish the full list
         enabledRules = []
 
         if not self.isChannelTypeEnabled(channelType):
+            globalRuleCache[key] = enabledRules
             return enabledRules
 
         for ruleId, compatibleTypes in self.ruleCompatibility.items():
@@ -92,24 +118,55 @@ class GlobalRulesHandler:
                 ):
                     enabledRules.append(ruleId)
 
+        globalRuleCache[key] = enabledRules
         return enabledRules
 
     def isChannelExcluded(self, channelNumber):
         """Check if a specific channel number is excluded from global rules"""
-        excludedChannels = ADDON_SETTINGS.getSetting("GlobalRules_ExcludeChannels")
+        excluded = globalRuleCache.get("excluded")
 
-        if not excludedChannels:
-            return False
+        if excluded is None:
+            excludedChannels = ADDON_SETTINGS.getSetting("GlobalRules_ExcludeChannels")
+            excluded = set()
 
-        try:
-            # Parse comma-separated channel numbers
-            excludedList = [
-                int(ch.strip()) for ch in excludedChannels.split(",") if ch.strip()
-            ]
-            return channelNumber in excludedList
-        except:
-            self.log("Error parsing excluded channels list")
-            return False
+            try:
+                # Parse comma-separated channel numbers
+                excluded = set(
+                    int(ch.strip()) for ch in excludedChannels.split(",") if ch.strip()
+                )
+            except:
+                self.log("Error parsing excluded channels list")
+
+            globalRuleCache["excluded"] = excluded
+
+        return channelNumber in excluded
+
+    def getGlobalRulesSignature(self, channelNumber, channelType):
+        """Describe the global rules a channel gets, for change detection"""
+        if not self.isChannelTypeEnabled(channelType):
+            return ""
+
+        if self.isChannelExcluded(channelNumber):
+            return ""
+
+        signature = []
+        listrules = RulesList()
+
+        for ruleId in sorted(self.getEnabledGlobalRules(channelType)):
+            signature.append(str(ruleId))
+
+            for rule in listrules.ruleList:
+                if rule.getId() == ruleId:
+                    for i in range(rule.getOptionCount()):
+                        signature.append(
+                            ADDON_SETTINGS.getSetting(
+                                "GlobalRule_" + str(ruleId) + "_opt_" + str(i + 1)
+                            )
+                        )
+
+                    break
+
+        return "|".join(signature)
 
     def applyGlobalRules(self, channel, channelType):
         """Apply all enabled global rules to a channel"""
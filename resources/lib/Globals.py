@@ -19,12 +19,15 @@
 import os
 import sys
 
+import ArtworkIndex
+import ChannelRegistry
+import JSONRPCClient
 import Settings
 import xbmc
 import xbmcaddon
 import xbmcgui
 import xbmcvfs
-from FileAccess import FileLock
+from FileAccess import FileLock, createFileLock
 
 # Python 2/3 compatibility
 if sys.version_info[0] >= 3:
@@ -112,8 +115,11 @@ NUM_COLOUR = [
     "0xFFFFFFFF",
 ]
 
-GlobalFileLock = FileLock()
+GlobalFileLock = createFileLock()
 ADDON_SETTINGS = Settings.Settings()
+CHANNEL_REGISTRY = ChannelRegistry.ChannelRegistry(ADDON_SETTINGS)
+JSON_RPC = JSONRPCClient.JSONRPCClient()
+ARTWORK_INDEX = ArtworkIndex.ArtworkIndex(JSON_RPC)
 
 TIME_BAR = "ptvTimeBar.png"
 BUTTON_NO_FOCUS = "ptvButtonNoFocus.png"
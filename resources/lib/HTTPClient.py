@@ -0,0 +1,296 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+
+try:
+    import httplib  # Python 2
+    from urlparse import urlsplit
+except ImportError:
+    import http.client as httplib  # Python 3
+    from urllib.parse import urlsplit
+import Globals
+import xbmc
+import xbmcvfs
+from FileAccess import FileAccess
+
+# Requests to one host that may run at the same time
+MAX_CONNECTIONS = 4
+# Idle connections older than this are likely closed by the server already
+IDLE_TIMEOUT = 30
+DEFAULT_TIMEOUT = 10
+# Cached metadata is used without asking the server for this long
+REVALIDATE_AFTER = 86400
+
+HTTPResponse = collections.namedtuple("HTTPResponse", "status headers body")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, url):
+        Exception.__init__(self, "HTTP " + str(status) + " from " + url)
+        self.status = status
+        self.url = url
+
+
+# Keeps connections open between requests and shares them between threads.
+# Every host gets at most MAX_CONNECTIONS requests at once, the others wait.
+class HTTPClient:
+    def __init__(self):
+        self.idle = {}
+        self.limits = {}
+        self.clientLock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("HTTPClient: " + msg, level)
+
+    def getLimit(self, key):
+        with self.clientLock:
+            if key not in self.limits:
+                self.limits[key] = threading.BoundedSemaphore(MAX_CONNECTIONS)
+
+            return self.limits[key]
+
+    # An idle connection to the host if there is one, otherwise a new one.
+    # The second value tells whether the connection was used before.
+    def getConnection(self, key, timeout):
+        now = time.time()
+
+        with self.clientLock:
+            idle = self.idle.get(key, [])
+
+            while len(idle) > 0:
+                conn, lastUsed = idle.pop()
+
+                if now - lastUsed < IDLE_TIMEOUT:
+                    if conn.sock is not None:
+                        conn.sock.settimeout(timeout)
+
+                    return conn, True
+
+                conn.close()
+
+            self.connections += 1
+
+        scheme, host, port = key
+
+        if scheme == "https":
+            return httplib.HTTPSConnection(host, port, timeout=timeout), False
+
+        return httplib.HTTPConnection(host, port, timeout=timeout), False
+
+    def putConnection(self, key, conn):
+        with self.clientLock:
+            self.idle.setdefault(key, []).append((conn, time.time()))
+
+    def request(self, url, headers=None, timeout=DEFAULT_TIMEOUT, method="GET"):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or "/"
+
+        if parts.query:
+            path += "?" + parts.query
+
+        limit = self.getLimit(key)
+        limit.acquire()
+
+        try:
+            with self.clientLock:
+                self.requests += 1
+
+            for attempt in range(2):
+                conn, reused = self.getConnection(key, timeout)
+
+                try:
+                    conn.request(method, path, headers=headers or {})
+                    response = conn.getresponse()
+                    body = response.read()
+                except (httplib.HTTPException, socket.error):
+                    conn.close()
+
+                    # The server may have dropped the idle connection
+                    if reused and attempt == 0:
+                        continue
+
+                    raise
+
+                if response.will_close:
+                    conn.close()
+                else:
+                    self.putConnection(key, conn)
+
+                return HTTPResponse(
+                    response.status,
+                    dict((name.lower(), value) for name, value in response.getheaders()),
+                    body,
+                )
+        finally:
+            limit.release()
+
+    def getJSON(self, url, headers=None, timeout=DEFAULT_TIMEOUT):
+        response = self.request(url, headers, timeout)
+
+        if response.status != 200:
+            raise HTTPError(response.status, url)
+
+        return json.loads(response.body.decode("utf-8"))
+
+    def close(self):
+        with self.clientLock:
+            for idle in self.idle.values():
+                for conn, lastUsed in idle:
+                    conn.close()
+
+            self.idle = {}
+
+
+# JSON documents that hardly ever change, like the series details of
+# Sonarr.  They are kept on disk along with their ETag and Last-Modified
+# headers.  An entry is used as is for a day, after that it is revalidated
+# with a conditional request.
+class MetadataCache:
+    def __init__(self, client, name="metadata.json", revalidateAfter=REVALIDATE_AFTER):
+        self.client = client
+        self.filename = xbmcvfs.translatePath(os.path.join(Globals.SETTINGS_LOC, name))
+        self.revalidateAfter = revalidateAfter
+        self.entries = {}
+        self.isDirty = False
+        self.cacheLock = threading.Lock()
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("MetadataCache: " + msg, level)
+
+    def load(self):
+        try:
+            fle = FileAccess.open(self.filename, "r")
+            self.entries = json.loads("\n".join(fle.readlines()))
+            fle.close()
+        except:
+            self.entries = {}
+
+    def save(self):
+        with self.cacheLock:
+            if self.isDirty == False:
+                return
+
+            data = json.dumps(self.entries)
+            self.isDirty = False
+
+        try:
+            tmpfile = self.filename + ".tmp"
+            fle = FileAccess.open(tmpfile, "w")
+            fle.write(data)
+            fle.close()
+            FileAccess.replace(tmpfile, self.filename)
+        except:
+            self.log("Unable to save the metadata cache", xbmc.LOGERROR)
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
+
+    def get(self, url, headers=None):
+        with self.cacheLock:
+            entry = self.entries.get(url)
+
+        if entry is not None and time.time() - entry["checked"] < self.revalidateAfter:
+            return entry["data"]
+
+        requestHeaders = dict(headers or {})
+
+        if entry is not None:
+            if entry.get("etag"):
+                requestHeaders["If-None-Match"] = entry["etag"]
+
+            if entry.get("modified"):
+                requestHeaders["If-Modified-Since"] = entry["modified"]
+
+        response = self.client.request(url, requestHeaders)
+
+        if response.status == 304 and entry is not None:
+            entry = dict(entry, checked=time.time())
+        elif response.status == 200:
+            entry = {
+                "checked": time.time(),
+                "etag": response.headers.get("etag", ""),
+                "modified": response.headers.get("last-modified", ""),
+                "data": json.loads(response.body.decode("utf-8")),
+            }
+        else:
+            raise HTTPError(response.status, url)
+
+        with self.cacheLock:
+            self.entries[url] = entry
+            self.isDirty = True
+
+        return entry["data"]
+
+    # Fetch several documents at once.  Returns the ones that could be had,
+    # by url.
+    def getMany(self, urls, headers=None):
+        results = {}
+        missing = []
+
+        for url in urls:
+            with self.cacheLock:
+                entry = self.entries.get(url)
+
+            if entry is not None and time.time() - entry["checked"] < self.revalidateAfter:
+                results[url] = entry["data"]
+            else:
+                missing.append(url)
+
+        def worker():
+            while True:
+                with self.cacheLock:
+                    if len(missing) == 0:
+                        return
+
+                    url = missing.pop()
+
+                try:
+                    results[url] = self.get(url, headers)
+                except Exception as e:
+                    self.log("Unable to fetch " + url + ": " + str(e))
+
+        if len(missing) > 0:
+            self.log(
+                "Fetching "
+                + str(len(missing))
+                + " of "
+                + str(len(urls))
+                + " documents, the rest are cached"
+            )
+            threads = [
+                threading.Thread(target=worker, name="MetadataCache" + str(i))
+                for i in range(min(MAX_CONNECTIONS, len(missing)))
+            ]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+            self.save()
+
+        return results
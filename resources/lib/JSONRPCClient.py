@@ -0,0 +1,191 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import json
+import threading
+
+import Globals
+import xbmc
+
+# Library reads answer the same until the library changes
+CACHED_METHODS = ("VideoLibrary.Get", "AudioLibrary.Get")
+# Notifications after which cached library reads are out of date
+LIBRARY_EVENTS = (
+    "VideoLibrary.OnUpdate",
+    "VideoLibrary.OnRemove",
+    "VideoLibrary.OnScanFinished",
+    "VideoLibrary.OnCleanFinished",
+    "AudioLibrary.OnUpdate",
+    "AudioLibrary.OnRemove",
+    "AudioLibrary.OnScanFinished",
+    "AudioLibrary.OnCleanFinished",
+)
+MAX_CACHED = 512
+
+
+class PendingRequest:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+
+# Sends JSON-RPC requests to Kodi.  Requests are given as the usual query
+# dicts and answered with the parsed response, so callers keep checking for
+# "result" as before.  Several requests can go to Kodi as one batch, a
+# read that is already on its way to Kodi for another thread is waited for
+# instead of being sent again, and library reads are remembered until the
+# library changes.
+class JSONRPCClient:
+    def __init__(self):
+        self.cache = collections.OrderedDict()
+        self.pending = {}
+        self.generation = 0
+        self.clientLock = threading.Lock()
+        self.calls = 0
+        self.requests = 0
+        self.cacheHits = 0
+        self.coalesced = 0
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("JSONRPCClient: " + msg, level)
+
+    def getKey(self, query):
+        return json.dumps([query["method"], query.get("params", {})], sort_keys=True)
+
+    # Only reads may be answered with the response to another request
+    def isReadOnly(self, query):
+        return ".Get" in query["method"]
+
+    def isCacheable(self, query):
+        return query["method"].startswith(CACHED_METHODS)
+
+    def libraryChanged(self):
+        with self.clientLock:
+            self.generation += 1
+            self.cache.clear()
+
+    def onNotification(self, method):
+        if method in LIBRARY_EVENTS:
+            self.log("Library changed (" + method + "), dropping cached reads")
+            self.libraryChanged()
+
+    def request(self, query):
+        return self.batch([query])[0]
+
+    # Answer every query, sending the ones that can't be answered from the
+    # cache or by another thread to Kodi in one go.  The responses come
+    # back in the order of the queries.
+    def batch(self, queries):
+        responses = [None] * len(queries)
+        sending = []
+        waiting = []
+
+        with self.clientLock:
+            generation = self.generation
+            self.requests += len(queries)
+
+            for index, query in enumerate(queries):
+                key = self.getKey(query)
+
+                if self.isReadOnly(query) == False:
+                    sending.append((index, None, PendingRequest()))
+                elif key in self.cache:
+                    self.cache.move_to_end(key)
+                    responses[index] = self.cache[key]
+                    self.cacheHits += 1
+                elif key in self.pending:
+                    waiting.append((index, self.pending[key]))
+                    self.coalesced += 1
+                else:
+                    request = PendingRequest()
+                    self.pending[key] = request
+                    sending.append((index, key, request))
+
+        if len(sending) > 0:
+            self.send(queries, sending, generation)
+
+        for index, key, request in sending:
+            responses[index] = request.response
+
+        for index, request in waiting:
+            request.done.wait()
+            responses[index] = request.response
+
+        # Hand back the ids the callers used
+        return [
+            dict(response, id=query.get("id"))
+            for query, response in zip(queries, responses)
+        ]
+
+    def send(self, queries, sending, generation):
+        payload = [
+            dict(queries[index], id=number)
+            for number, (index, key, request) in enumerate(sending)
+        ]
+        byId = {}
+
+        try:
+            # A lone request goes as it is, Kodi answers it the same
+            if len(payload) == 1:
+                data = json.loads(xbmc.executeJSONRPC(json.dumps(payload[0])))
+            else:
+                data = json.loads(xbmc.executeJSONRPC(json.dumps(payload)))
+
+            if isinstance(data, list):
+                for response in data:
+                    if isinstance(response, dict):
+                        byId[response.get("id")] = response
+            elif len(payload) == 1:
+                byId[0] = data
+        except:
+            self.log("Unable to send " + str(len(payload)) + " requests", xbmc.LOGERROR)
+
+        with self.clientLock:
+            self.calls += 1
+
+            for number, (index, key, request) in enumerate(sending):
+                response = byId.get(number)
+
+                if response is None:
+                    response = {"error": {"code": -32603, "message": "No response"}}
+                elif (
+                    key is not None
+                    and "result" in response
+                    and generation == self.generation
+                    and self.isCacheable(queries[index])
+                ):
+                    self.cache[key] = response
+
+                    if len(self.cache) > MAX_CACHED:
+                        self.cache.popitem(last=False)
+
+                request.response = response
+
+                if key is not None:
+                    del self.pending[key]
+                    request.done.set()
+
+    def getStats(self):
+        with self.clientLock:
+            return {
+                "requests": self.requests,
+                "calls": self.calls,
+                "cacheHits": self.cacheHits,
+                "coalesced": self.coalesced,
+            }
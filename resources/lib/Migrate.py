@@ -49,8 +49,9 @@ class Migrate:
         self.log("version is " + curver)
 
         if curver == "0.0.0":
-            if self.initializeChannels():
-                return True
+            with Globals.ADDON_SETTINGS.transaction():
+                if self.initializeChannels():
+                    return True
 
         return True
 
@@ -44,26 +44,41 @@ try:
 except ImportError:
     import HTMLParser  # Python 2
     html = HTMLParser.HTMLParser()
+from ArtworkIndex import pickArt
 from Channel import Channel
+from ChannelBugs import ChannelBugs
+from ChannelPrefetch import ChannelPrefetcher
 from ChannelList import ChannelList
 from ChannelListThread import ChannelListThread
+from ChannelSnapshots import ChannelSnapshots
+from DataProviders import DataProviders
 from EPGWindow import EPGWindow
 from EpisodeBrowserWindow import EpisodeBrowserWindow
 from FileAccess import FileAccess, FileLock
+from GlobalRulesHandler import clearGlobalRuleCache
 from Globals import *
+from HTTPClient import HTTPClient, MetadataCache
 from Migrate import Migrate
 from Playlist import Playlist
+from PlaylistWindow import PlaylistWindow
 from SidebarWindow import SidebarWindow
 from SpeedDialWindow import SpeedDialWindow
+from Scheduler import Scheduler, ScheduledTimer
+from StatsCollector import StatsCollector, SERVER_PROBE, parseServerProbe
+from WindowProperties import PropertyStore
+from ZapMetrics import ZapMetrics
+import ssh_transport
 
-try:
-    from PIL import Image, ImageEnhance
+ICON = ADDON.getAddonInfo("icon")
 
-    PIL_AVAILABLE = True
-except:
-    PIL_AVAILABLE = False
+# Channel changes wait for the player in steps of this many milliseconds, up
+# to the limits below
+ZAP_POLL_INTERVAL = 20
+ZAP_STOP_TIMEOUT = 1000
+ZAP_START_TIMEOUT = 3000
 
-ICON = ADDON.getAddonInfo("icon")
+# How far ahead the favorite shows are looked for, in seconds
+FAVORITE_SCAN_AHEAD = 1800
 
 # Wikipedia Article Lists - Complete 9,800+ Article Library
 WIKIPEDIA_ARTICLES = {
@@ -916,6 +931,15 @@ class LibraryMonitor(xbmc.Monitor):
     def log(self, msg):
         log("LibraryMonitor: " + msg)
 
+    def onSettingsChanged(self):
+        """The global rules live in the addon settings, so drop their cache"""
+        clearGlobalRuleCache()
+
+    def onNotification(self, sender, method, data):
+        """Library reads and artwork are cached until the library changes"""
+        JSON_RPC.onNotification(method)
+        ARTWORK_INDEX.onNotification(method, data)
+
     def onPlayBackStarted(self):
         """Detect when an episode starts playing from the library"""
         if self.overlay.monitoringLibrarySelection and xbmc.Player().isPlayingVideo():
@@ -949,10 +973,23 @@ class MyPlayer(xbmc.Player):
         self.lastPlayingFile = None
         self.channelChangeTimer = None
         self.ignoreNextAVStarted = False  # ADD THIS LINE
+        self.avStarted = False
         
     def onAVStarted(self):
         """Called when audio or video playback starts"""
         self.log("onAVStarted - Playback started")
+        # A channel change waits for this before seeking
+        self.avStarted = True
+
+        # A new show started, the coming up notification is timed from it
+        # and the playlist window may need more items
+        if (
+            self.overlay
+            and hasattr(self.overlay, "notificationTimer")
+            and not self.overlay.isExiting
+        ):
+            self.overlay.playlistWindow.onPlaybackStarted()
+            self.overlay.startNotificationTimer(1.0)
         
         # Check if we should ignore this callback
         if self.ignoreNextAVStarted:
@@ -1006,7 +1043,7 @@ class MyPlayer(xbmc.Player):
             ):
                 try:
                     if self.overlay.sleepTimeValue == 0:
-                        self.overlay.sleepTimer = threading.Timer(
+                        self.overlay.sleepTimer = self.overlay.createTimer(
                             1, self.overlay.sleepAction
                         )
                     self.overlay.background.setVisible(True)
@@ -1044,8 +1081,9 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.currentChannel = 1
         self.maxChannels = 0
         self.inputChannel = -1
-        self.channelDelay = 500
+        self.zapMetrics = ZapMetrics()
         self.previousChannel = 0  # For Last Channel feature
+        self.lastPlaylistPosition = -1
 
         # Timers
         self.lastActionTime = 0
@@ -1056,6 +1094,9 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.actionSemaphore = threading.BoundedSemaphore()
         self.channelThread = ChannelListThread()
         self.channelThread.myOverlay = self
+        # Channels whose settings were changed by another box
+        self.sharedChannelChanges = set()
+        ADDON_SETTINGS.subscribe(self.onSettingsChanged, local=False)
 
         # Display settings
         self.showingInfo = False
@@ -1146,6 +1187,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.favoriteShowsLastNotification = (
             {}
         )  # Track when we last notified for each show
+        self.favoriteShowsSchedule = None  # What the schedule file was written for
         self.epgScanTimer = None
         self.favoriteShowsScanInterval = 60  # Scan every 60 seconds for testing
         self.pendingFavoriteShowChannel = 0  # For jumping to channel from notification
@@ -1170,12 +1212,14 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.isMaster = True
         self.forceReset = False
         self.backgroundUpdating = 0
+        self.channelSnapshots = ChannelSnapshots()
         self.invalidatedChannelCount = 0
 
         # Notification system
         self.notificationLastChannel = 0
         self.notificationLastShow = 0
         self.notificationShowedNotif = False
+        self.comingUp = None  # (channel, position, content) of the next show
 
         # Sleep system
         self.sleepTimeValue = 0
@@ -1194,12 +1238,33 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         # Color settings
         self.numberColor = NUM_COLOUR[int(ADDON.getSetting("NumberColour"))]
 
-        # Initialize timers
-        self.channelLabelTimer = threading.Timer(10.0, self.hideChannelLabel)
-        self.playerTimer = threading.Timer(2.0, self.playerTimerAction)
+        # Initialize timers, they all run on one scheduler thread
+        self.scheduler = Scheduler()
+        self.properties = PropertyStore(self.scheduler)
+        self.channelBugs = ChannelBugs(self.scheduler)
+        self.playlistWindow = PlaylistWindow(self.scheduler)
+        self.channelPrefetcher = ChannelPrefetcher(
+            self.scheduler, self.playlistWindow, self.channelBugs
+        )
+        self.httpClient = HTTPClient()
+        self.seriesMetadata = MetadataCache(self.httpClient)
+        self.seriesMetadata.load()
+        self.dataProviders = DataProviders(self.scheduler)
+        self.registerDataProviders()
+        self.statsCollector = StatsCollector(self.scheduler)
+        self.statsCollector.addSource(
+            "Server",
+            self.collectServerStats,
+            lambda: self.showingServerStats and self.updateServerStatsData(),
+        )
+        self.statsCollector.addSource(
+            "KodiBox", self.collectKodiBoxStats, self.onKodiBoxSample
+        )
+        self.channelLabelTimer = self.createTimer(10.0, self.hideChannelLabel)
+        self.playerTimer = self.createTimer(2.0, self.playerTimerAction)
         self.playerTimer.name = "PlayerTimer"
-        self.infoTimer = threading.Timer(5.0, self.hideInfo)
-        self.notificationTimer = threading.Timer(
+        self.infoTimer = self.createTimer(5.0, self.hideInfo)
+        self.notificationTimer = self.createTimer(
             NOTIFICATION_CHECK_TIME, self.notificationAction
         )
         # Initialize favorite show timer to None
@@ -1230,6 +1295,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         # Initialize system
         self.backupFiles()
         ADDON_SETTINGS.loadSettings()
+        CHANNEL_REGISTRY.load()
 
         # Load favorites and speed dial (with new persistence system)
         self.loadFavorites()
@@ -1239,7 +1305,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
 
         # Start EPG scanner for favorites
         if self.favoriteShows:
-            self.epgScanTimer = threading.Timer(
+            self.epgScanTimer = self.createTimer(
                 10.0, self.epgScanAction
             )  # First scan after 10 seconds
             self.epgScanTimer.start()
@@ -1286,6 +1352,14 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         if not self.validateChannels():
             return
 
+        # Render the channel bugs before they are needed
+        if self.showChannelBug:
+            self.channelBugs.renderAll(
+                self.getChannelLogoPath(channel)
+                for channel in self.channels
+                if channel.isValid
+            )
+
         # Initialize current channel
         try:
             if self.forceReset == False:
@@ -1308,7 +1382,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.playerTimer.start()
 
         # Start weather refresh timer for periodic updates
-        self.weatherRefreshTimer = threading.Timer(1800.0, self.weatherRefreshAction)
+        self.weatherRefreshTimer = self.createTimer(1800.0, self.weatherRefreshAction)
         self.weatherRefreshTimer.name = "WeatherRefreshTimer"
         self.weatherRefreshTimer.start()
 
@@ -1626,7 +1700,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.saveFavorites()
 
     def scanEPGForFavorites(self):
-        """Scan EPG for upcoming airings of favorite shows using EPG's timeline logic"""
+        """Find the next airing of each favorite show in the next 30 minutes"""
         self.log("scanEPGForFavorites - Starting scan")
 
         if not self.favoriteShows:
@@ -1635,101 +1709,53 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         currentTime = time.time()
         foundShows = {}
 
-        # Scan all channels using the same logic as EPG
+        # Each favorite is a lookup in the title index of each channel
         for channelNum in range(1, self.maxChannels + 1):
             if not self.channels[channelNum - 1].isValid:
                 continue
 
             channel = self.channels[channelNum - 1]
+            elapsed = currentTime - channel.lastAccessTime
 
-            # Get the channel's current timeline position (same as EPG)
-            playlistPosition = channel.playlistPosition
-            showTimeOffset = channel.showTimeOffset
-            lastAccessTime = channel.lastAccessTime
+            for favShow in self.favoriteShows:
+                airing = channel.getNextAiring(favShow, elapsed, FAVORITE_SCAN_AHEAD)
 
-            # Calculate current position in timeline
-            timedif = currentTime - lastAccessTime
-
-            # Find current show position
-            while timedif > 0:
-                # Get show duration at current position
-                showLength = channel.getItemDuration(playlistPosition)
-
-                if (showTimeOffset + timedif) < showLength:
-
-                    break
-                else:
-                    # Move to next show
-                    timedif -= showLength - showTimeOffset
-                    showTimeOffset = 0
-                    playlistPosition = channel.fixPlaylistIndex(playlistPosition + 1)
+                if airing is None:
+                    continue
 
-            # ADD THE DEBUG LOGGING HERE:
-            self.log(
-                "Channel %d: Current show at position %d, offset %d seconds into show"
-                % (channelNum, playlistPosition, showTimeOffset + timedif)
-            )
+                position, startsIn = airing
+                showStartTime = currentTime + startsIn
 
-            # Now scan forward from current position for 30 minutes
-            scanTime = 0
-            scanPosition = playlistPosition
-            currentShowTime = showTimeOffset + timedif
-
-            while scanTime < 1800:  # 30 minutes
-                # Get show info at this position
-                showTitle = channel.getItemTitle(scanPosition).lower()
-                showDuration = channel.getItemDuration(scanPosition)
-
-                # Calculate when this show starts
-                if scanPosition == playlistPosition:
-                    # Current show - calculate remaining time
-                    timeUntilEnd = showDuration - currentShowTime
-                    showStartTime = currentTime - currentShowTime
-                else:
-                    # Future show
-                    showStartTime = currentTime + scanTime
-                    timeUntilEnd = showDuration
-
-                # Check if this show is in favorites
-                for favShow in self.favoriteShows:
-                    # Use exact matching instead of substring matching
-                    if favShow.lower() == showTitle.lower():
-                        # Found a favorite show
-                        if (
-                            favShow not in foundShows
-                            or foundShows[favShow][1] > showStartTime
-                        ):
-                            foundShows[favShow] = (
-                                channelNum,
-                                showStartTime,
-                                showStartTime + showDuration,
-                                showTitle,  # Use the actual title from EPG
-                            )
-                            self.log(
-                                "Found %s on channel %d starting at %s"
-                                % (
-                                    favShow,
-                                    channelNum,
-                                    time.strftime(
-                                        "%H:%M", time.localtime(showStartTime)
-                                    ),
-                                )
-                            )
-
-                # Move to next show
-                if scanPosition == playlistPosition:
-                    scanTime += timeUntilEnd
-                else:
-                    scanTime += showDuration
-                scanPosition = channel.fixPlaylistIndex(scanPosition + 1)
+                if favShow not in foundShows or foundShows[favShow][1] > showStartTime:
+                    foundShows[favShow] = (
+                        channelNum,
+                        showStartTime,
+                        showStartTime + channel.getItemDuration(position),
+                        channel.getItemTitle(position).lower(),
+                    )
+                    self.log(
+                        "Found %s on channel %d starting at %s"
+                        % (
+                            favShow,
+                            channelNum,
+                            time.strftime("%H:%M", time.localtime(showStartTime)),
+                        )
+                    )
 
         self.favoriteShowsNextAiring = foundShows
 
         # Check if any shows need notifications
         self.checkFavoriteShowNotifications()
 
-        # Save schedule to text file
-        self.saveFavoriteShowsSchedule()
+        # Save schedule to text file, when it changed
+        schedule = sorted(
+            (showName, airing[0], round(airing[1]), airing[3])
+            for showName, airing in foundShows.items()
+        )
+
+        if schedule != self.favoriteShowsSchedule:
+            self.favoriteShowsSchedule = schedule
+            self.saveFavoriteShowsSchedule()
 
     def saveFavoriteShowsSchedule(self):
         """Save a schedule of upcoming favorite shows to a text file"""
@@ -1860,7 +1886,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.scanEPGForFavorites()
 
         # Schedule next scan
-        self.epgScanTimer = threading.Timer(
+        self.epgScanTimer = self.createTimer(
             self.favoriteShowsScanInterval, self.epgScanAction
         )
         if not self.isExiting:
@@ -1878,36 +1904,11 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             # Try to get artwork from the show's folder
             channel = self.channels[channelNum - 1]
 
-            # Try JSON-RPC first
-            json_query = {
-                "jsonrpc": "2.0",
-                "method": "VideoLibrary.GetTVShows",
-                "params": {
-                    "filter": {
-                        "field": "title",
-                        "operator": "contains",
-                        "value": showName,
-                    },
-                    "properties": ["art"],
-                },
-                "id": 1,
-            }
-            result = xbmc.executeJSONRPC(json.dumps(json_query))
-            result = json.loads(result)
-
-            if (
-                "result" in result
-                and "tvshows" in result["result"]
-                and result["result"]["tvshows"]
-            ):
-                show = result["result"]["tvshows"][0]
-                if "art" in show:
-                    if "landscape" in show["art"]:
-                        showImage = show["art"]["landscape"]
-                    elif "fanart" in show["art"]:
-                        showImage = show["art"]["fanart"]
-                    elif "banner" in show["art"]:
-                        showImage = show["art"]["banner"]
+            # Try the library artwork first
+            showImage = pickArt(
+                ARTWORK_INDEX.getShowArt(showName, contains=True),
+                ("landscape", "fanart", "banner"),
+            )
 
         except Exception as e:
             self.log("Error getting favorite show artwork: " + str(e))
@@ -1930,11 +1931,11 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.log("showFavoriteShowNotification - Properties set:")
         self.log(
             "  PTV.FavoriteShow = %s"
-            % xbmcgui.Window(10000).getProperty("PTV.FavoriteShow")
+            % self.properties.get("PTV.FavoriteShow")
         )
         self.log(
             "  PTV.FavoriteShow.Title = %s"
-            % xbmcgui.Window(10000).getProperty("PTV.FavoriteShow.Title")
+            % self.properties.get("PTV.FavoriteShow.Title")
         )
 
         minutes = int(timeUntil / 60)
@@ -1955,7 +1956,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         ):
             self.favoriteShowTimer.cancel()
 
-        self.favoriteShowTimer = threading.Timer(
+        self.favoriteShowTimer = self.createTimer(
             15.0, self.hideFavoriteShowNotification
         )
         self.favoriteShowTimer.start()
@@ -2185,7 +2186,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         # Save detailed position info for multiple return options
         if self.Player.isPlaying():
             self.preemptedPosition = self.Player.getTime()
-            self.preemptedPlaylistPos = xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getposition()
+            self.preemptedPlaylistPos = self.playlistWindow.getPosition()
             self.preemptedTotalTime = self.Player.getTotalTime()
 
             # Also save channel state
@@ -2308,13 +2309,13 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
 
         # Set channel without seeking to current time
         self.currentChannel = self.preemptedChannel
-        xbmc.PlayList(xbmc.PLAYLIST_MUSIC).clear()
-        xbmc.PlayList(xbmc.PLAYLIST_MUSIC).load(
-            self.channels[self.preemptedChannel - 1].fileName
+        kodiPosition = self.playlistWindow.load(
+            self.channels[self.preemptedChannel - 1], self.preemptedPlaylistPos
         )
 
         # Play from saved position
-        self.Player.playselected(self.preemptedPlaylistPos)
+        if kodiPosition is not None:
+            self.Player.playselected(kodiPosition)
 
         # Wait for playback to start
         xbmc.sleep(500)
@@ -2366,13 +2367,13 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         # Set channel and seek to beginning of current show
         self.background.setVisible(True)
         self.currentChannel = self.preemptedChannel
-        xbmc.PlayList(xbmc.PLAYLIST_MUSIC).clear()
-        xbmc.PlayList(xbmc.PLAYLIST_MUSIC).load(
-            self.channels[self.preemptedChannel - 1].fileName
+        kodiPosition = self.playlistWindow.load(
+            self.channels[self.preemptedChannel - 1], showPos
         )
 
         # Play at current show position with 0 offset
-        self.Player.playselected(showPos)
+        if kodiPosition is not None:
+            self.Player.playselected(kodiPosition)
         self.channels[self.preemptedChannel - 1].setShowPosition(showPos)
         self.channels[self.preemptedChannel - 1].setShowTime(0)
         self.channels[self.preemptedChannel - 1].setAccessTime(curtime)
@@ -2410,12 +2411,12 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         # Set channel at next show
         self.background.setVisible(True)
         self.currentChannel = self.preemptedChannel
-        xbmc.PlayList(xbmc.PLAYLIST_MUSIC).clear()
-        xbmc.PlayList(xbmc.PLAYLIST_MUSIC).load(
-            self.channels[self.preemptedChannel - 1].fileName
+        kodiPosition = self.playlistWindow.load(
+            self.channels[self.preemptedChannel - 1], showPos
         )
 
-        self.Player.playselected(showPos)
+        if kodiPosition is not None:
+            self.Player.playselected(kodiPosition)
         self.channels[self.preemptedChannel - 1].setShowPosition(showPos)
         self.channels[self.preemptedChannel - 1].setShowTime(0)
         self.channels[self.preemptedChannel - 1].setAccessTime(curtime)
@@ -2509,8 +2510,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                 "id": 1,
             }
 
-            result = xbmc.executeJSONRPC(json.dumps(json_query))
-            result = json.loads(result)
+            result = JSON_RPC.request(json_query)
 
             if "result" in result and "tvshows" in result["result"]:
                 tvshows = result["result"]["tvshows"]
@@ -2687,10 +2687,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
     def setChannel(self, channel):
         """Set the channel and start playback"""
         self.log("setChannel " + str(channel))
-        # Add this debug line to see the call stack
-        import traceback
-
-        self.log("setChannel called from: " + "".join(traceback.format_stack()[-2:-1]))
+        zap = self.zapMetrics.start(channel)
         self.runActions(
             RULES_ACTION_OVERLAY_SET_CHANNEL, channel, self.channels[channel - 1]
         )
@@ -2714,7 +2711,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         # NEW: Handle channel 99 with page cycling (calendar <-> recently added)
         if channel == 99:
             # Set window property to activate channel 99 visualization mode
-            xbmcgui.Window(10000).setProperty("PTV.Channel99", "true")
+            self.setProperty("PTV.Channel99", "true")
             self.log("Channel 99 visualization mode activated")
             
             # Start page cycling when tuning to channel 99
@@ -2725,7 +2722,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                 startChannel99CyclingAfterPlayback = False
         else:
             # Clear window property to deactivate channel 99 visualization mode
-            xbmcgui.Window(10000).clearProperty("PTV.Channel99")
+            self.properties.clear("PTV.Channel99")
             self.log("Channel 99 visualization mode deactivated")
             
             startChannel99CyclingAfterPlayback = False
@@ -2739,11 +2736,25 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             self.previousChannel = self.currentChannel
 
         self.lastActionTime = 0
-        timedif = 0
         self.getControl(102).setVisible(False)
         self.getControl(103).setImage("")
         self.showingInfo = False
 
+        # Work out where the new channel is before touching the player
+        newChannel = self.channels[channel - 1]
+        curtime = time.time()
+
+        target = self.channelPrefetcher.getTarget(channel, newChannel, curtime)
+
+        if target is not None:
+            position, offset = target
+        elif newChannel.isPaused:
+            position, offset = newChannel.playlistPosition, newChannel.showTimeOffset
+        else:
+            position, offset = newChannel.getPositionAfter(
+                curtime - newChannel.lastAccessTime
+            )
+
         # Save current channel state
         if self.Player.isPlaying():
             if channel != self.currentChannel:
@@ -2758,7 +2769,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                     self.Player.getTime()
                 )
                 self.channels[self.currentChannel - 1].setShowPosition(
-                    xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getposition()
+                    self.playlistWindow.getPosition()
                 )
                 self.channels[self.currentChannel - 1].setAccessTime(time.time())
                 
@@ -2766,17 +2777,19 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                 self.log("Stopping playback before channel change")
                 self.Player.ignoreNextStop = True  # Prevent sleep timer
                 self.Player.stop()
-                # Wait for stop to complete
-                xbmc.sleep(200)
+                self.waitForPlayer(
+                    lambda: self.Player.isPlaying() == False, ZAP_STOP_TIMEOUT
+                )
 
+        zap.mark("stop")
         self.currentChannel = channel
+        newChannel.setShowPosition(position)
+        newChannel.setShowTime(offset)
         
-        # Load channel playlist
-        xbmc.PlayList(xbmc.PLAYLIST_MUSIC).clear()
-        if (
-            xbmc.PlayList(xbmc.PLAYLIST_MUSIC).load(self.channels[channel - 1].fileName)
-            == False
-        ):
+        # Load the part of the channel around the new position
+        kodiPosition = self.playlistWindow.load(newChannel, newChannel.playlistPosition)
+
+        if kodiPosition is None:
             self.log("Error loading playlist", xbmc.LOGERROR)
             self.InvalidateChannel(channel)
             return
@@ -2787,65 +2800,45 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             xbmc.PlayList(xbmc.PLAYLIST_MUSIC).unshuffle()
 
         xbmc.executebuiltin("PlayerControl(RepeatAll)")
+        zap.mark("load")
 
-        # Calculate time difference
-        curtime = time.time()
-        timedif = curtime - self.channels[self.currentChannel - 1].lastAccessTime
-
-        # Adjust show position if not paused
-        if self.channels[self.currentChannel - 1].isPaused == False:
-            while (
-                self.channels[self.currentChannel - 1].showTimeOffset + timedif
-                > self.channels[self.currentChannel - 1].getCurrentDuration()
-            ):
-                timedif -= (
-                    self.channels[self.currentChannel - 1].getCurrentDuration()
-                    - self.channels[self.currentChannel - 1].showTimeOffset
-                )
-                self.channels[self.currentChannel - 1].addShowPosition(1)
-                self.channels[self.currentChannel - 1].setShowTime(0)
-
-        xbmc.sleep(self.channelDelay)
+        # Start playback, a seek before the stream is open is dropped
+        self.Player.avStarted = False
+        self.Player.playselected(kodiPosition)
 
-        # Start playback
-        self.Player.playselected(
-            self.channels[self.currentChannel - 1].playlistPosition
-        )
+        if self.waitForPlayer(self.isPlaybackStarted, ZAP_START_TIMEOUT) == False:
+            self.log("Playback didn't start in time, seeking anyway")
 
-        self.channels[self.currentChannel - 1].setAccessTime(curtime)
+        zap.mark("play")
+        newChannel.setAccessTime(curtime)
 
         # Handle paused channels
-        if self.channels[self.currentChannel - 1].isPaused:
-            self.channels[self.currentChannel - 1].setPaused(False)
+        if newChannel.isPaused:
+            newChannel.setPaused(False)
             try:
-                self.Player.seekTime(
-                    self.channels[self.currentChannel - 1].showTimeOffset
-                )
-                if self.channels[self.currentChannel - 1].mode & MODE_ALWAYSPAUSE == 0:
+                self.Player.seekTime(newChannel.showTimeOffset)
+                if newChannel.mode & MODE_ALWAYSPAUSE == 0:
                     self.Player.pause()
                     if self.waitForVideoPaused() == False:
                         return
             except:
                 self.log("Exception during seek on paused channel", xbmc.LOGERROR)
         else:
-            # Seek to proper time
-            seektime = (
-                self.channels[self.currentChannel - 1].showTimeOffset
-                + timedif
-                + int((time.time() - curtime))
-            )
+            # Seek to proper time, counting the time the change took
+            seektime = newChannel.showTimeOffset + int(time.time() - curtime)
             try:
                 self.Player.seekTime(seektime)
             except:
                 self.log("Unable to set proper seek time, trying different value")
                 try:
-                    seektime = (
-                        self.channels[self.currentChannel - 1].showTimeOffset + timedif
-                    )
-                    self.Player.seekTime(seektime)
+                    self.Player.seekTime(newChannel.showTimeOffset)
                 except:
                     self.log("Exception during seek", xbmc.LOGERROR)
 
+        zap.mark("seek")
+        zap.finish()
+        self.prefetchChannels()
+
         self.showChannelLabel(self.currentChannel)
         self.lastActionTime = time.time()
         
@@ -2861,6 +2854,54 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         )
         self.log("setChannel return")
 
+    def prefetchChannels(self):
+        """Get the channels next to this one and the previous one ready to tune to"""
+        if self.maxChannels == 1:
+            return
+
+        numbers = [
+            self.fixChannel(self.currentChannel + 1),
+            self.fixChannel(self.currentChannel - 1, False),
+        ]
+
+        if (
+            self.previousChannel > 0
+            and self.previousChannel <= self.maxChannels
+            and self.channels[self.previousChannel - 1].isValid
+        ):
+            numbers.append(self.previousChannel)
+
+        targets = []
+
+        for number in sorted(set(numbers) - set([self.currentChannel])):
+            channel = self.channels[number - 1]
+            targets.append((number, channel, self.getChannelLogoPath(channel)))
+
+        self.channelPrefetcher.schedule(targets, self.showChannelBug)
+
+    def waitForPlayer(self, condition, timeout):
+        """Wait until the condition holds, the sleeps let Kodi deliver the player callbacks"""
+        waited = 0
+
+        while condition() == False:
+            if waited >= timeout:
+                return False
+
+            xbmc.sleep(ZAP_POLL_INTERVAL)
+            waited += ZAP_POLL_INTERVAL
+
+        return True
+
+    def isPlaybackStarted(self):
+        if self.Player.avStarted:
+            return True
+
+        # The callback may be held back while this thread is busy
+        try:
+            return self.Player.isPlaying() and self.Player.getTime() > 0
+        except:
+            return False
+
     def showChannelLabel(self, channel):
         """Display the channel number"""
         self.log("showChannelLabel " + str(channel))
@@ -2868,7 +2909,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         # Cancel existing timer
         if self.channelLabelTimer.is_alive():
             self.channelLabelTimer.cancel()
-            self.channelLabelTimer = threading.Timer(5.0, self.hideChannelLabel)
+            self.channelLabelTimer = self.createTimer(5.0, self.hideChannelLabel)
 
         # Format channel number
         if ADDON.getSetting("HideLeadingZero") == "false" and channel < 10:
@@ -2914,7 +2955,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
     def hideChannelLabel(self):
         """Hide the channel number display"""
         self.log("hideChannelLabel")
-        self.channelLabelTimer = threading.Timer(10.0, self.hideChannelLabel)
+        self.channelLabelTimer = self.createTimer(10.0, self.hideChannelLabel)
 
         self.channelNumberLabel.setVisible(False)
         self.channelNumberShadow.setVisible(False)
@@ -2925,6 +2966,9 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
 
         self.log("hideChannelLabel return")
 
+    def getChannelLogoPath(self, channel):
+        return self.channelLogos + ascii(channel.name) + ".png"
+
     def updateChannelBug(self):
         """Update the channel bug/watermark"""
         if not self.showChannelBug:
@@ -2932,37 +2976,14 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             return
 
         try:
-            channelName = self.channels[self.currentChannel - 1].name
-            logoPath = self.channelLogos + ascii(channelName) + ".png"
-
-            if FileAccess.exists(logoPath):
-                bugPath = CHANNELBUG_LOC + ascii(channelName) + ".png"
-
-                # Generate bug if it doesn't exist
-                if not FileAccess.exists(bugPath) and PIL_AVAILABLE:
-                    try:
-                        original = Image.open(logoPath)
-                        if original.mode != "RGBA":
-                            original = original.convert("RGBA")
-
-                        # Resize to fit
-                        original.thumbnail((220, 155), Image.ANTIALIAS)
-
-                        # Make semi-transparent
-                        alpha = original.split()[-1]
-                        alpha = ImageEnhance.Brightness(alpha).enhance(0.4)
-                        original.putalpha(alpha)
-
-                        original.save(bugPath)
-                    except Exception as e:
-                        self.log("Error creating channel bug: " + str(e))
-                        self.getControl(103).setImage("")
-                        return
-
-                if FileAccess.exists(bugPath):
-                    self.getControl(103).setImage(bugPath)
-                else:
-                    self.getControl(103).setImage(logoPath)
+            logoPath = self.getChannelLogoPath(self.channels[self.currentChannel - 1])
+            bugPath = self.channelBugs.getBug(logoPath)
+
+            if bugPath is not None:
+                self.getControl(103).setImage(bugPath)
+            elif FileAccess.exists(logoPath):
+                # The bug is still being rendered
+                self.getControl(103).setImage(logoPath)
             else:
                 self.getControl(103).setImage("")
         except Exception as e:
@@ -2972,7 +2993,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
     def showInfo(self, timer):
         """Show the info display"""
         if self.hideShortItems:
-            position = xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getposition()
+            position = self.playlistWindow.getPosition()
             if (
                 self.channels[self.currentChannel - 1].getItemDuration(position)
                 < self.shortItemLength
@@ -3000,7 +3021,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         if self.infoTimer.is_alive():
             self.infoTimer.cancel()
 
-        self.infoTimer = threading.Timer(timer, self.hideInfo)
+        self.infoTimer = self.createTimer(timer, self.hideInfo)
         self.infoTimer.name = "InfoTimer"
 
         if xbmc.getCondVisibility("Player.ShowInfo"):
@@ -3024,7 +3045,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         if self.infoTimer.is_alive():
             self.infoTimer.cancel()
 
-        self.infoTimer = threading.Timer(5.0, self.hideInfo)
+        self.infoTimer = self.createTimer(5.0, self.hideInfo)
 
     def setShowInfo(self):
         """Update the info display content"""
@@ -3033,7 +3054,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         try:
             # Determine position
             if self.hideShortItems and self.infoOffset != 0:
-                position = xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getposition()
+                position = self.playlistWindow.getPosition()
                 curoffset = 0
                 modifier = 1 if self.infoOffset > 0 else -1
 
@@ -3048,7 +3069,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                         curoffset += 1
             else:
                 position = (
-                    xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getposition() + self.infoOffset
+                    self.playlistWindow.getPosition() + self.infoOffset
                 )
 
             # Get info
@@ -3073,14 +3094,15 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             self.getControl(504).setLabel(episode)
             self.getControl(505).setText(description)
 
-            # Set channel icon
-            logoPath = (
-                self.channelLogos
-                + ascii(self.channels[self.currentChannel - 1].name)
-                + ".png"
-            )
-            if not FileAccess.exists(logoPath):
-                logoPath = IMAGES_LOC + "Default.png"
+            # Set channel icon, usually found when the channel was prefetched
+            logoPath = self.channelPrefetcher.getLogo(self.currentChannel)
+
+            if logoPath is None:
+                logoPath = self.getChannelLogoPath(
+                    self.channels[self.currentChannel - 1]
+                )
+                if not FileAccess.exists(logoPath):
+                    logoPath = IMAGES_LOC + "Default.png"
             self.getControl(506).setImage(logoPath)
 
         except Exception as e:
@@ -3125,7 +3147,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             ):
                 self.weatherTimer.cancel()
 
-            self.weatherTimer = threading.Timer(100.0, self.hideWeatherOverlay)
+            self.weatherTimer = self.createTimer(100.0, self.hideWeatherOverlay)
             self.weatherTimer.start()
         else:
             # Cancel any existing timer for persistent mode
@@ -3215,7 +3237,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                 weatherConditions == "Busy" or not weatherConditions
             ) and self.showingWeather:
                 self.log('Weather conditions showing "Busy" or empty, retrying...')
-                updateTimer = threading.Timer(1.0, self.updateWeatherInfo)
+                updateTimer = self.createTimer(1.0, self.updateWeatherInfo)
                 updateTimer.start()
 
         except Exception as e:
@@ -3243,12 +3265,15 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         """Periodically refresh weather data"""
         self.refreshWeatherData()
         # Restart timer
-        self.weatherRefreshTimer = threading.Timer(1800.0, self.weatherRefreshAction)
+        self.weatherRefreshTimer = self.createTimer(1800.0, self.weatherRefreshAction)
         if not self.isExiting:
             self.weatherRefreshTimer.start()
 
     def fetchSonarrCalendar(self):
-        """Fetch upcoming episodes from Sonarr API"""
+        """
+        Fetch upcoming episodes from Sonarr API.  Returns None when the fetch
+        fails, so the last good calendar is kept.
+        """
         self.log("fetchSonarrCalendar - STARTED")
         
         # Check if Sonarr is enabled
@@ -3265,7 +3290,6 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             return []
         
         try:
-            import urllib2
             # Import datetime with aliases to avoid conflicts
             from datetime import datetime as DT, date as DATE, timedelta as TIMEDELTA
             
@@ -3283,25 +3307,19 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             
             self.log("Fetching Sonarr calendar from: " + url)
             
-            # Create request with API key header
-            request = urllib2.Request(url)
-            request.add_header("X-Api-Key", sonarrApiKey)
-            
-            # Fetch data with timeout
+            # Fetch data with timeout, the API key goes in a header
             try:
-                response = urllib2.urlopen(request, timeout=10)
-                data = response.read()
+                response = self.httpClient.request(url, {"X-Api-Key": sonarrApiKey})
+
+                if response.status != 200:
+                    self.log("HTTP Error Code: %d fetching Sonarr" % response.status, xbmc.LOGERROR)
+                    return None
+
+                data = response.body.decode("utf-8", "ignore")
                 self.log("Sonarr API response received, length: %d bytes" % len(data))
-            except urllib2.URLError as e:
-                self.log("URLError fetching Sonarr: " + str(e), xbmc.LOGERROR)
-                if hasattr(e, 'code'):
-                    self.log("HTTP Error Code: %d" % e.code, xbmc.LOGERROR)
-                if hasattr(e, 'reason'):
-                    self.log("Reason: %s" % str(e.reason), xbmc.LOGERROR)
-                return []
             except Exception as e:
                 self.log("Error fetching Sonarr: " + str(e), xbmc.LOGERROR)
-                return []
+                return None
             
             # Parse JSON
             try:
@@ -3310,7 +3328,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             except Exception as e:
                 self.log("Error parsing Sonarr JSON: " + str(e), xbmc.LOGERROR)
                 self.log("Raw data preview: " + data[:200], xbmc.LOGERROR)
-                return []
+                return None
             
             # Build a cache of series info (seriesId -> series details)
             self.log("Building series cache from calendar data...")
@@ -3325,25 +3343,19 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             
             self.log("Found %d unique series in calendar" % len(uniqueSeriesIds))
             
-            # Fetch series details for each unique series ID
-            for seriesId in uniqueSeriesIds:
-                try:
-                    seriesUrl = "%s/api/v3/series/%d" % (baseUrl, seriesId)
-                    self.log("Fetching series details: " + seriesUrl)
-                    
-                    seriesRequest = urllib2.Request(seriesUrl)
-                    seriesRequest.add_header("X-Api-Key", sonarrApiKey)
-                    
-                    seriesResponse = urllib2.urlopen(seriesRequest, timeout=5)
-                    seriesData = seriesResponse.read()
-                    seriesInfo = json.loads(seriesData)
-                    
-                    seriesCache[seriesId] = seriesInfo
-                    self.log("Cached series: %s (ID: %d)" % (seriesInfo.get('title', 'Unknown'), seriesId))
-                    
-                except Exception as e:
-                    self.log("Error fetching series %d: %s" % (seriesId, str(e)))
-                    continue
+            # Series details rarely change, so only series that were never
+            # seen before are requested, all at once
+            seriesUrls = dict(
+                (seriesId, "%s/api/v3/series/%d" % (baseUrl, seriesId))
+                for seriesId in uniqueSeriesIds
+            )
+            seriesDetails = self.seriesMetadata.getMany(
+                list(seriesUrls.values()), {"X-Api-Key": sonarrApiKey}
+            )
+
+            for seriesId, seriesUrl in seriesUrls.items():
+                if seriesUrl in seriesDetails:
+                    seriesCache[seriesId] = seriesDetails[seriesUrl]
             
             self.log("Series cache built with %d entries" % len(seriesCache))
             
@@ -3508,11 +3520,14 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             self.log("Error in fetchSonarrCalendar: " + str(e), xbmc.LOGERROR)
             import traceback
             self.log("Traceback: " + traceback.format_exc(), xbmc.LOGERROR)
-            return []
+            return None
 
 
     def fetchRadarrCalendar(self):
-        """Fetch upcoming movies from Radarr API"""
+        """
+        Fetch upcoming movies from Radarr API.  Returns None when the fetch
+        fails, so the last good calendar is kept.
+        """
         self.log("fetchRadarrCalendar - STARTED")
         
         # Check if Radarr is enabled
@@ -3529,7 +3544,6 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             return []
         
         try:
-            import urllib2
             from datetime import datetime, date, timedelta
             
             # Get date range
@@ -3545,25 +3559,19 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             
             self.log("Fetching Radarr calendar from: " + url)
             
-            # Create request
-            request = urllib2.Request(url)
-            request.add_header("X-Api-Key", radarrApiKey)
-            
             # Fetch data
             try:
-                response = urllib2.urlopen(request, timeout=10)
-                data = response.read()
+                response = self.httpClient.request(url, {"X-Api-Key": radarrApiKey})
+
+                if response.status != 200:
+                    self.log("HTTP Error Code: %d fetching Radarr" % response.status, xbmc.LOGERROR)
+                    return None
+
+                data = response.body.decode("utf-8", "ignore")
                 self.log("Radarr API response received, length: %d bytes" % len(data))
-            except urllib2.URLError as e:
-                self.log("URLError fetching Radarr: " + str(e), xbmc.LOGERROR)
-                if hasattr(e, 'code'):
-                    self.log("HTTP Error Code: %d" % e.code, xbmc.LOGERROR)
-                if hasattr(e, 'reason'):
-                    self.log("Reason: %s" % str(e.reason), xbmc.LOGERROR)
-                return []
             except Exception as e:
                 self.log("Error fetching Radarr: " + str(e), xbmc.LOGERROR)
-                return []
+                return None
             
             # Parse JSON
             try:
@@ -3572,7 +3580,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             except Exception as e:
                 self.log("Error parsing Radarr JSON: " + str(e), xbmc.LOGERROR)
                 self.log("Raw data preview: " + data[:200], xbmc.LOGERROR)
-                return []
+                return None
             
             # Process movies
             movies = []
@@ -3664,51 +3672,22 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             self.log("Error in fetchRadarrCalendar: " + str(e), xbmc.LOGERROR)
             import traceback
             self.log("Traceback: " + traceback.format_exc(), xbmc.LOGERROR)
-            return []
+            return None
 
     def getLibraryPosterForShow(self, showTitle):
         """Get poster from Kodi library for a show"""
         self.log("getLibraryPosterForShow: Looking for " + showTitle)
         
         try:
-            # Search Kodi library for this show
-            json_query = {
-                "jsonrpc": "2.0",
-                "method": "VideoLibrary.GetTVShows",
-                "params": {
-                    "filter": {
-                        "field": "title",
-                        "operator": "is",
-                        "value": showTitle
-                    },
-                    "properties": ["art", "title"]
-                },
-                "id": 1
-            }
-            
-            result = xbmc.executeJSONRPC(json.dumps(json_query))
-            result = json.loads(result)
+            # Priority order: poster > fanart > landscape > banner
+            poster = pickArt(
+                ARTWORK_INDEX.getShowArt(showTitle),
+                ("poster", "fanart", "landscape", "banner"),
+            )
             
-            if "result" in result and "tvshows" in result["result"] and result["result"]["tvshows"]:
-                show = result["result"]["tvshows"][0]
-                self.log("Found show in library: " + show.get('title', ''))
-                
-                if "art" in show:
-                    art = show["art"]
-                    
-                    # Priority order: poster > fanart > landscape > banner
-                    if "poster" in art and art["poster"]:
-                        self.log("Using library poster")
-                        return art["poster"]
-                    elif "fanart" in art and art["fanart"]:
-                        self.log("Using library fanart")
-                        return art["fanart"]
-                    elif "landscape" in art and art["landscape"]:
-                        self.log("Using library landscape")
-                        return art["landscape"]
-                    elif "banner" in art and art["banner"]:
-                        self.log("Using library banner")
-                        return art["banner"]
+            if poster:
+                self.log("Using library artwork")
+                return poster
             
             self.log("Show not found in library")
             return ""
@@ -3722,50 +3701,15 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.log("getLibraryPosterForMovie: Looking for " + movieTitle + " (" + str(movieYear) + ")")
         
         try:
-            # Search Kodi library for this movie
-            json_query = {
-                "jsonrpc": "2.0",
-                "method": "VideoLibrary.GetMovies",
-                "params": {
-                    "filter": {
-                        "and": [
-                            {
-                                "field": "title",
-                                "operator": "is",
-                                "value": movieTitle
-                            },
-                            {
-                                "field": "year",
-                                "operator": "is",
-                                "value": str(movieYear)
-                            }
-                        ]
-                    },
-                    "properties": ["art", "title", "year"]
-                },
-                "id": 1
-            }
-            
-            result = xbmc.executeJSONRPC(json.dumps(json_query))
-            result = json.loads(result)
+            # Priority order: poster > fanart > landscape
+            poster = pickArt(
+                ARTWORK_INDEX.getMovieArt(movieTitle, movieYear),
+                ("poster", "fanart", "landscape"),
+            )
             
-            if "result" in result and "movies" in result["result"] and result["result"]["movies"]:
-                movie = result["result"]["movies"][0]
-                self.log("Found movie in library: " + movie.get('title', ''))
-                
-                if "art" in movie:
-                    art = movie["art"]
-                    
-                    # Priority order: poster > fanart > landscape
-                    if "poster" in art and art["poster"]:
-                        self.log("Using library poster")
-                        return art["poster"]
-                    elif "fanart" in art and art["fanart"]:
-                        self.log("Using library fanart")
-                        return art["fanart"]
-                    elif "landscape" in art and art["landscape"]:
-                        self.log("Using library landscape")
-                        return art["landscape"]
+            if poster:
+                self.log("Using library artwork")
+                return poster
             
             self.log("Movie not found in library")
             return ""
@@ -3774,19 +3718,57 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             self.log("Error getting library poster: " + str(e))
             return ""
 
+    def registerDataProviders(self):
+        """Declare where the Channel 99 pages get their data and how long it stays fresh"""
+        self.dataProviders.load()
+        # The page refresh timers read the data once per interval, so it
+        # is refetched about as often as before
+        self.dataProviders.register(
+            "SonarrCalendar",
+            self.fetchSonarrCalendar,
+            self.calendarRefreshInterval,
+            onUpdate=lambda: self.showingCalendar and self.updateCalendarData(),
+        )
+        self.dataProviders.register(
+            "RadarrCalendar",
+            self.fetchRadarrCalendar,
+            self.calendarRefreshInterval,
+            onUpdate=lambda: self.showingCalendar and self.updateCalendarData(),
+        )
+        self.dataProviders.register(
+            "RecentlyAdded",
+            self.fetchRecentlyAdded,
+            self.recentlyAddedRefreshInterval,
+            isValid=bool,
+            onUpdate=lambda: self.showingRecentlyAdded
+            and self.updateRecentlyAddedData(),
+        )
+        self.dataProviders.register(
+            "Recommendations",
+            self.fetchRandomRecommendations,
+            self.recommendationsRefreshInterval,
+            isValid=bool,
+            onUpdate=lambda: self.showingRecommendations
+            and self.updateRecommendationsData(),
+        )
+
     def updateCalendarData(self):
         """Update calendar data from Sonarr and Radarr"""
         self.log("updateCalendarData - STARTING")
         
         try:
             # Fetch from both APIs
-            self.log("updateCalendarData - Fetching Sonarr...")
-            sonarrData = self.fetchSonarrCalendar()
+            sonarrData = self.dataProviders.get("SonarrCalendar")
+            radarrData = self.dataProviders.get("RadarrCalendar")
+
+            if sonarrData is None and radarrData is None:
+                # Nothing fetched yet, this runs again once it is
+                self.log("updateCalendarData - Waiting for the first fetch")
+                return
+
             self.sonarrCalendar = sonarrData if sonarrData else []
             self.log("updateCalendarData - Sonarr returned %d items" % len(self.sonarrCalendar))
             
-            self.log("updateCalendarData - Fetching Radarr...")
-            radarrData = self.fetchRadarrCalendar()
             self.radarrCalendar = radarrData if radarrData else []
             self.log("updateCalendarData - Radarr returned %d items" % len(self.radarrCalendar))
             
@@ -3914,7 +3896,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         
         if not todayItems:
             # No items today, just reschedule
-            self.calendarRotationTimer = threading.Timer(5.0, self.rotateTodayItem)
+            self.calendarRotationTimer = self.createTimer(5.0, self.rotateTodayItem)
             if not self.isExiting:
                 self.calendarRotationTimer.start()
             return
@@ -3926,7 +3908,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.updateTodayDisplay(todayItems[self.sonarrTodayIndex])
         
         # Schedule next rotation
-        self.calendarRotationTimer = threading.Timer(5.0, self.rotateTodayItem)
+        self.calendarRotationTimer = self.createTimer(5.0, self.rotateTodayItem)
         if not self.isExiting:
             self.calendarRotationTimer.start()
 
@@ -3939,7 +3921,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.updateCalendarData()
         
         # Schedule next refresh
-        self.calendarRefreshTimer = threading.Timer(
+        self.calendarRefreshTimer = self.createTimer(
             self.calendarRefreshInterval, 
             self.calendarRefreshAction
         )
@@ -3999,14 +3981,14 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         if self.calendarRotationTimer and self.calendarRotationTimer.is_alive():
             self.calendarRotationTimer.cancel()
         
-        self.calendarRotationTimer = threading.Timer(10.0, self.rotateTodayItem)
+        self.calendarRotationTimer = self.createTimer(10.0, self.rotateTodayItem)
         self.calendarRotationTimer.start()
         
         # Start refresh timer (5 minutes)
         if self.calendarRefreshTimer and self.calendarRefreshTimer.is_alive():
             self.calendarRefreshTimer.cancel()
         
-        self.calendarRefreshTimer = threading.Timer(
+        self.calendarRefreshTimer = self.createTimer(
             self.calendarRefreshInterval,
             self.calendarRefreshAction
         )
@@ -4053,8 +4035,18 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                 "id": "recentMovies"
             }
             
-            movies_response = xbmc.executeJSONRPC(json.dumps(movies_query))
-            movies_data = json.loads(movies_response)
+            # Fetch recent episodes
+            episodes_query = {
+                "jsonrpc": "2.0",
+                "method": "VideoLibrary.GetRecentlyAddedEpisodes",
+                "params": {
+                    "properties": ["showtitle", "season", "episode", "title", "art", "dateadded", "file", "playcount", "tvshowid", "plot"],  # ADDED "plot"
+                    "limits": {"end": 10}
+                },
+                "id": "recentEpisodes"
+            }
+            
+            movies_data, episodes_data = JSON_RPC.batch([movies_query, episodes_query])
             
             if "result" in movies_data and "movies" in movies_data["result"]:
                 for movie in movies_data["result"]["movies"]:
@@ -4071,38 +4063,10 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                     })
                     self.log("Added movie: %s (%s)" % (movie.get("title"), movie.get("year")))
             
-            # Fetch recent episodes
-            episodes_query = {
-                "jsonrpc": "2.0",
-                "method": "VideoLibrary.GetRecentlyAddedEpisodes",
-                "params": {
-                    "properties": ["showtitle", "season", "episode", "title", "art", "dateadded", "file", "playcount", "tvshowid", "plot"],  # ADDED "plot"
-                    "limits": {"end": 10}
-                },
-                "id": "recentEpisodes"
-            }
-            
-            episodes_response = xbmc.executeJSONRPC(json.dumps(episodes_query))
-            episodes_data = json.loads(episodes_response)
-            
             if "result" in episodes_data and "episodes" in episodes_data["result"]:
                 for episode in episodes_data["result"]["episodes"]:
                     # Get the TV show poster
-                    show_query = {
-                        "jsonrpc": "2.0",
-                        "method": "VideoLibrary.GetTVShowDetails",
-                        "params": {
-                            "tvshowid": episode.get("tvshowid"),
-                            "properties": ["art"]
-                        },
-                        "id": "showArt"
-                    }
-                    show_response = xbmc.executeJSONRPC(json.dumps(show_query))
-                    show_data = json.loads(show_response)
-                    
-                    poster = ""
-                    if "result" in show_data and "tvshowdetails" in show_data["result"]:
-                        poster = show_data["result"]["tvshowdetails"].get("art", {}).get("poster", "")
+                    poster = ARTWORK_INDEX.getShowArtById(episode.get("tvshowid")).get("poster", "")
                     
                     episode_info = "S%02dE%02d" % (
                         episode.get("season", 0),
@@ -4141,8 +4105,12 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         """Update window properties with recently added data"""
         self.log("updateRecentlyAddedData - STARTING")
         
-        recent_items = self.fetchRecentlyAdded()
+        recent_items = self.dataProviders.get("RecentlyAdded")
         
+        if recent_items is None:
+            self.log("Waiting for the first fetch")
+            return
+
         if not recent_items:
             self.log("No recently added items found")
             self.setProperty("PTV.Recent.Featured.Title", "No Recent Additions")
@@ -4243,7 +4211,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         
         if not self.recentlyAddedItems or len(self.recentlyAddedItems) == 0:
             # Reschedule and return
-            self.recentlyAddedRotationTimer = threading.Timer(5.0, self.rotateRecentlyAddedFeaturedItem)  # CHANGED
+            self.recentlyAddedRotationTimer = self.createTimer(5.0, self.rotateRecentlyAddedFeaturedItem)  # CHANGED
             if not self.isExiting:
                 self.recentlyAddedRotationTimer.start()
             return
@@ -4255,7 +4223,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.updateRecentlyAddedFeaturedItem(next_index)
         
         # Schedule next rotation
-        self.recentlyAddedRotationTimer = threading.Timer(5.0, self.rotateRecentlyAddedFeaturedItem)  # CHANGED
+        self.recentlyAddedRotationTimer = self.createTimer(5.0, self.rotateRecentlyAddedFeaturedItem)  # CHANGED
         if not self.isExiting:
             self.recentlyAddedRotationTimer.start()
     
@@ -4268,7 +4236,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.updateRecentlyAddedData()
         
         # Schedule next refresh
-        self.recentlyAddedRefreshTimer = threading.Timer(
+        self.recentlyAddedRefreshTimer = self.createTimer(
             self.recentlyAddedRefreshInterval,
             self.recentlyAddedRefreshAction
         )
@@ -4305,14 +4273,14 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         if self.recentlyAddedRotationTimer and self.recentlyAddedRotationTimer.is_alive():
             self.recentlyAddedRotationTimer.cancel()
         
-        self.recentlyAddedRotationTimer = threading.Timer(10.0, self.rotateRecentlyAddedFeaturedItem)
+        self.recentlyAddedRotationTimer = self.createTimer(10.0, self.rotateRecentlyAddedFeaturedItem)
         self.recentlyAddedRotationTimer.start()
         
         # Start refresh timer (5 minutes)
         if self.recentlyAddedRefreshTimer and self.recentlyAddedRefreshTimer.is_alive():
             self.recentlyAddedRefreshTimer.cancel()
         
-        self.recentlyAddedRefreshTimer = threading.Timer(
+        self.recentlyAddedRefreshTimer = self.createTimer(
             self.recentlyAddedRefreshInterval,
             self.recentlyAddedRefreshAction
         )
@@ -4328,7 +4296,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             ):
                 self.recentlyAddedTimer.cancel()
             
-            self.recentlyAddedTimer = threading.Timer(100.0, self.hideRecentlyAddedOverlay)
+            self.recentlyAddedTimer = self.createTimer(100.0, self.hideRecentlyAddedOverlay)
             self.recentlyAddedTimer.start()
         else:
             # Cancel any existing timer for persistent mode
@@ -4792,8 +4760,12 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         """Update window properties with recommendations data"""
         self.log("updateRecommendationsData - STARTING")
         
-        recommendations = self.fetchRandomRecommendations()
+        recommendations = self.dataProviders.get("Recommendations")
         
+        if recommendations is None:
+            self.log("Waiting for the first fetch")
+            return
+
         if not recommendations:
             self.log("No recommendations found")
             self.setProperty("PTV.Recommendations.Featured.Title", "No Unwatched Content")
@@ -4972,7 +4944,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             return
         
         if not self.recommendationsItems or len(self.recommendationsItems) == 0:
-            self.recommendationsRotationTimer = threading.Timer(30.0, self.rotateRecommendationsFeaturedItem)
+            self.recommendationsRotationTimer = self.createTimer(30.0, self.rotateRecommendationsFeaturedItem)
             if not self.isExiting:
                 self.recommendationsRotationTimer.start()
             return
@@ -4984,7 +4956,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.updateRecommendationsFeaturedItem(next_index)
         
         # Schedule next rotation
-        self.recommendationsRotationTimer = threading.Timer(30.0, self.rotateRecommendationsFeaturedItem)
+        self.recommendationsRotationTimer = self.createTimer(30.0, self.rotateRecommendationsFeaturedItem)
         if not self.isExiting:
             self.recommendationsRotationTimer.start()
     
@@ -4997,7 +4969,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.updateRecommendationsData()
         
         # Schedule next refresh
-        self.recommendationsRefreshTimer = threading.Timer(
+        self.recommendationsRefreshTimer = self.createTimer(
             self.recommendationsRefreshInterval,
             self.recommendationsRefreshAction
         )
@@ -5029,14 +5001,14 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         if self.recommendationsRotationTimer and self.recommendationsRotationTimer.is_alive():
             self.recommendationsRotationTimer.cancel()
         
-        self.recommendationsRotationTimer = threading.Timer(30.0, self.rotateRecommendationsFeaturedItem)
+        self.recommendationsRotationTimer = self.createTimer(30.0, self.rotateRecommendationsFeaturedItem)
         self.recommendationsRotationTimer.start()
         
         # Start refresh timer
         if self.recommendationsRefreshTimer and self.recommendationsRefreshTimer.is_alive():
             self.recommendationsRefreshTimer.cancel()
         
-        self.recommendationsRefreshTimer = threading.Timer(
+        self.recommendationsRefreshTimer = self.createTimer(
             self.recommendationsRefreshInterval,
             self.recommendationsRefreshAction
         )
@@ -5050,7 +5022,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             ):
                 self.recommendationsTimer.cancel()
             
-            self.recommendationsTimer = threading.Timer(100.0, self.hideRecommendationsOverlay)
+            self.recommendationsTimer = self.createTimer(100.0, self.hideRecommendationsOverlay)
             self.recommendationsTimer.start()
         
         self.log("showRecommendationsOverlay - COMPLETED")
@@ -5078,204 +5050,39 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         
         self.log("hideRecommendationsOverlay return")
 
-    def fetchServerStats(self):
-        """Fetch stats from Unraid server via SSH"""
-        self.log("fetchServerStats - STARTED")
-        
-        try:
-            import subprocess
-            
-            stats = {}
-            
-            # Build SSH command prefix
-            import platform
-            if platform.system() == "Windows":
-                # On Windows, check for SSH in multiple locations
-                import os
-                possible_ssh_paths = [
-                    "C:\\Windows\\System32\\OpenSSH\\ssh.exe",
-                    "C:\\Program Files\\Git\\usr\\bin\\ssh.exe",
-                    "ssh.exe"  # Try PATH
-                ]
-                ssh_executable = None
-                for path in possible_ssh_paths:
-                    if os.path.exists(path) or path == "ssh.exe":
-                        ssh_executable = path
-                        break
-                
-                if not ssh_executable:
-                    self.log("SSH not found on Windows", xbmc.LOGERROR)
-                    return {}
-                
-                # Windows SSH key path
-                import os.path
-                ssh_key = os.path.expanduser("~/.ssh/id_rsa")
-            else:
-                ssh_executable = "ssh"
-                ssh_key = self.unraidSSHKey
-
-            ssh_cmd = [
-                ssh_executable,
-                "-i", ssh_key,
-                "-o", "StrictHostKeyChecking=no",
-                "-o", "UserKnownHostsFile=/dev/null",
-                "-o", "LogLevel=ERROR",
-                "%s@%s" % (self.unraidSSHUser, self.unraidSSHHost)
-            ]
-            
-            # Get disk usage (df -h)
-            self.log("Fetching disk usage...")
-            result = subprocess.check_output(ssh_cmd + ["df -h | grep '/mnt/disk\\|/mnt/cache\\|/mnt/user'"])
-            df_output = result
-            
-            # Get temperatures (sensors)
-            self.log("Fetching temperatures...")
-            result = subprocess.check_output(ssh_cmd + ["sensors"])
-            sensors_output = result
-            
-            # Get uptime
-            self.log("Fetching uptime...")
-            result = subprocess.check_output(ssh_cmd + ["uptime"])
-            uptime_output = result.strip()
-            
-            # Get CPU usage percentage (more reliable method)
-            self.log("Fetching CPU usage...")
-            result = subprocess.check_output(ssh_cmd + ["grep 'cpu ' /proc/stat | awk '{usage=($2+$4)*100/($2+$4+$5)} END {printf \"%.0f\", usage}'"])
-            cpu_usage = result.strip()
-
-            # Get RAM usage
-            self.log("Fetching RAM usage...")
-            result = subprocess.check_output(ssh_cmd + ["free | grep Mem | awk '{printf \"%.0f\", $3/$2 * 100.0}'"])
-            ram_usage = result.strip()
-            
-            # Parse disk usage
-            disks = []
-            cache = {}
-            array_total = {}
-
-            for line in df_output.split('\n'):
-                if not line.strip():
-                    continue
-                
-                self.log("Parsing df line: %s" % line)
-                
-                try:
-                    if '/mnt/disk' in line and 'tmpfs' not in line:  # ADD: and 'tmpfs' not in line
-                        parts = line.split()
-                        if len(parts) < 5:
-                            self.log("Skipping malformed disk line: %s" % line)
-                            continue
-                        
-                        # Try to extract disk number from device name
-                        device = parts[0]
-                        disk_num = "?"
-                        
-                        # Handle different formats: /dev/md1p1, /dev/sda1, etc.
-                        if 'md' in device and 'p' in device:
-                            disk_num = device.split('md')[1].split('p')[0]
-                        elif 'sd' in device:
-                            disk_num = device.split('sd')[1][0]  # Just the letter
-                        
-                        disks.append({
-                            'name': 'Disk %s' % disk_num,
-                            'total': parts[1],
-                            'used': parts[2],
-                            'avail': parts[3],
-                            'percent': parts[4].rstrip('%')
-                        })
-                        
-                    elif '/mnt/cache' in line:
-                        parts = line.split()
-                        if len(parts) >= 5:
-                            cache = {
-                                'total': parts[1],
-                                'used': parts[2],
-                                'avail': parts[3],
-                                'percent': parts[4].rstrip('%')
-                            }
-                            
-                    elif '/mnt/user' in line and 'user0' not in line:
-                        parts = line.split()
-                        if len(parts) >= 5:
-                            array_total = {
-                                'total': parts[1],
-                                'used': parts[2],
-                                'avail': parts[3],
-                                'percent': parts[4].rstrip('%')
-                            }
-                except Exception as e:
-                    self.log("Error parsing line '%s': %s" % (line, str(e)), xbmc.LOGERROR)
-                    continue
-            
-            # Parse temperatures
-            cpu_temp = ""
-            cache_temp = ""
+    def collectServerStats(self, previous):
+        """Sample the Unraid server, one probe over SSH returns every number"""
+        import platform
 
-            for line in sensors_output.split('\n'):
-                try:
-                    if 'CPU Temp:' in line or 'Tctl:' in line:
-                        # Extract temperature - handle both degree symbols
-                        if '+' in line:
-                            temp_str = line.split('+')[1]
-                            # Split on either degree symbol or 'C'
-                            temp = temp_str.split('C')[0].replace(u'°', '').strip()
-                            if temp:
-                                cpu_temp = "%d°F" % int(float(temp) * 9/5 + 32)
-                    elif 'Composite:' in line:
-                        if '+' in line:
-                            temp_str = line.split('+')[1]
-                            temp = temp_str.split('C')[0].replace(u'°', '').strip()
-                            if temp:
-                                cache_temp = "%d°F" % int(float(temp) * 9/5 + 32)
-                except Exception as e:
-                    self.log("Error parsing temperature line '%s': %s" % (line, str(e)), xbmc.LOGERROR)
-                    continue
-            
-            # Parse uptime
-            uptime_str = ""
-            if 'up' in uptime_output:
-                parts = uptime_output.split('up')[1].split(',')
-                uptime_str = parts[0].strip()
-                if len(parts) > 1:
-                    uptime_str += ", " + parts[1].strip()
-            
-            # Parse load average
-            load_avg = ""
-            if 'load average:' in uptime_output:
-                load_avg = uptime_output.split('load average:')[1].strip()
-            
-            # Build stats dictionary
-            stats = {
-                'disks': disks,
-                'cache': cache,
-                'cache_temp': cache_temp,
-                'array_total': array_total,
-                'cpu_temp': cpu_temp,
-                'cpu_usage': cpu_usage + "%",  # ADD THIS
-                'ram_usage': ram_usage + "%",  # ADD THIS
-                'uptime': uptime_str,
-                'load_avg': load_avg,
-                'server_name': 'DIVINITY'
-            }
-            
-            self.log("fetchServerStats - SUCCESS: %d disks, %s uptime" % (len(disks), uptime_str))
-            return stats
-            
-        except Exception as e:
-            self.log("Error fetching server stats: %s" % str(e), xbmc.LOGERROR)
-            import traceback
-            self.log("Traceback: %s" % traceback.format_exc(), xbmc.LOGERROR)
-            return {}
+        # Windows keeps the key in the user's home
+        if platform.system() == "Windows":
+            ssh_key = os.path.expanduser("~/.ssh/id_rsa")
+        else:
+            ssh_key = self.unraidSSHKey
+
+        transport = ssh_transport.get_transport(
+            self.unraidSSHHost, self.unraidSSHUser, ssh_key,
+            ssh_transport.UNTRUSTED_HOST_OPTIONS)
+        result = transport.run("sh -s", input_data=SERVER_PROBE)
+
+        if result.returncode != 0:
+            self.log("Unable to probe %s: %s" % (self.unraidSSHHost, result.error.strip()), xbmc.LOGERROR)
+            return None
+
+        stats = parseServerProbe(result.output, previous)
+        self.log("collectServerStats - %d disks, %s uptime" % (len(stats['disks']), stats['uptime']))
+        return stats
 
     def updateServerStatsData(self):
         """Update server stats data"""
         self.log("updateServerStatsData - STARTING")
         
         try:
-            stats = self.fetchServerStats()
+            self.statsCollector.watch("Server")
+            stats = self.statsCollector.latest("Server")
             
             if not stats:
-                self.log("No stats returned")
+                self.log("Waiting for the first server stats")
                 return
             
             self.serverStatsData = stats
@@ -5287,6 +5094,8 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             self.setProperty("PTV.ServerStats.LoadAvg", stats.get('load_avg', ''))
             self.setProperty("PTV.ServerStats.CPUUsage", stats.get('cpu_usage', ''))  # ADD THIS
             self.setProperty("PTV.ServerStats.RAMUsage", stats.get('ram_usage', ''))  # ADD THIS
+            self.setProperty("PTV.ServerStats.CPUUsage.Trend", self.statsCollector.trend("Server", 'cpu_percent'))
+            self.setProperty("PTV.ServerStats.RAMUsage.Trend", self.statsCollector.trend("Server", 'ram_percent'))
             
             # Array total
             array = stats.get('array_total', {})
@@ -5670,7 +5479,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         if self.serverStatsRefreshTimer and self.serverStatsRefreshTimer.is_alive():
             self.serverStatsRefreshTimer.cancel()
         
-        self.serverStatsRefreshTimer = threading.Timer(30.0, self.refreshServerStats)
+        self.serverStatsRefreshTimer = self.createTimer(30.0, self.refreshServerStats)
         self.serverStatsRefreshTimer.start()
         
         if not persistent:
@@ -5681,7 +5490,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             ):
                 self.serverStatsTimer.cancel()
             
-            self.serverStatsTimer = threading.Timer(120.0, self.hideServerStatsOverlay)
+            self.serverStatsTimer = self.createTimer(120.0, self.hideServerStatsOverlay)
             self.serverStatsTimer.start()
         
         self.log("showServerStatsOverlay - COMPLETED")
@@ -5727,7 +5536,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         
         # Schedule next refresh ONLY if still on channel 99 and showing stats
         if self.showingServerStats and self.currentChannel == 99 and not self.isExiting:
-            self.serverStatsRefreshTimer = threading.Timer(30.0, self.refreshServerStats)
+            self.serverStatsRefreshTimer = self.createTimer(30.0, self.refreshServerStats)
             self.serverStatsRefreshTimer.start()
             self.log("refreshServerStats - scheduled next refresh")
         else:
@@ -5756,59 +5565,11 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
     # MYSQL STATS PAGE
     # ============================================================================
     
-    def fetchMySQLStats(self):
-        """Fetch stats from MySQL container via SSH"""
-        self.log("fetchMySQLStats - STARTED")
-        
+    def parseMySQLStats(self, output):
+        """Parse the output of the MySQL health check script"""
         try:
-            import subprocess
-            import platform
-            import os
-            
             stats = {}
             
-            # MySQL is on Kodi box, not Unraid - use separate settings
-            MYSQL_SSH_HOST = "10.0.0.99"
-            MYSQL_SSH_USER = "root"
-            
-            # Build SSH command prefix
-            if platform.system() == "Windows":
-                # On Windows, check for SSH in multiple locations
-                possible_ssh_paths = [
-                    "C:\\Windows\\System32\\OpenSSH\\ssh.exe",
-                    "C:\\Program Files\\Git\\usr\\bin\\ssh.exe",
-                    "ssh.exe"  # Try PATH
-                ]
-                ssh_executable = None
-                for path in possible_ssh_paths:
-                    if os.path.exists(path) or path == "ssh.exe":
-                        ssh_executable = path
-                        break
-                
-                if not ssh_executable:
-                    self.log("SSH not found on Windows", xbmc.LOGERROR)
-                    return {}
-                
-                # Windows SSH key path
-                ssh_key = os.path.expanduser("~/.ssh/id_rsa")
-            else:
-                ssh_executable = "ssh"
-                ssh_key = os.path.expanduser("~/.ssh/id_rsa")
-
-            ssh_cmd = [
-                ssh_executable,
-                "-i", ssh_key,
-                "-o", "StrictHostKeyChecking=no",
-                "-o", "UserKnownHostsFile=/dev/null",
-                "-o", "LogLevel=ERROR",
-                "%s@%s" % (MYSQL_SSH_USER, MYSQL_SSH_HOST)
-            ]
-            
-            # Run the MySQL health check script
-            self.log("Fetching MySQL health stats...")
-            result = subprocess.check_output(ssh_cmd + ["/bin/sh", "/storage/kodi-mysql-health.sh"])
-            output = result
-            
             # Parse the output
             self.log("Parsing MySQL output...")
             
@@ -6007,11 +5768,11 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                 'kodi_clients': kodi_clients
             }
             
-            self.log("fetchMySQLStats - SUCCESS: %s, %d databases, %d Kodi clients" % (container_status, len(databases), len(kodi_clients)))
+            self.log("parseMySQLStats - %s, %d databases, %d Kodi clients" % (container_status, len(databases), len(kodi_clients)))
             return stats
             
         except Exception as e:
-            self.log("Error fetching MySQL stats: %s" % str(e), xbmc.LOGERROR)
+            self.log("Error parsing MySQL stats: %s" % str(e), xbmc.LOGERROR)
             import traceback
             self.log("Traceback: %s" % traceback.format_exc(), xbmc.LOGERROR)
             return {}
@@ -6021,10 +5782,12 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.log("updateMySQLStatsData - STARTING")
         
         try:
-            stats = self.fetchMySQLStats()
+            self.statsCollector.watch("KodiBox")
+            sample = self.statsCollector.latest("KodiBox")
+            stats = sample.get('mysql') if sample else None
             
             if not stats:
-                self.log("No MySQL stats returned")
+                self.log("Waiting for the first MySQL stats")
                 return
             
             self.mysqlStatsData = stats
@@ -6125,7 +5888,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             
             # Set up refresh timer (every 30 seconds)
             import threading
-            self.mysqlStatsRefreshTimer = threading.Timer(30.0, self.startMySQLStatsRefresh)
+            self.mysqlStatsRefreshTimer = self.createTimer(30.0, self.startMySQLStatsRefresh)
             self.mysqlStatsRefreshTimer.start()
             
             self.log("startMySQLStatsRefresh - Timer started")
@@ -6151,72 +5914,60 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
     # KODI BOX STATS METHODS (Page 7)
     # ============================================================
 
-    def fetchKodiBoxStats(self):
-        """Fetch system stats from Kodi box via SSH"""
-        self.log("fetchKodiBoxStats - STARTED")
-        
-        try:
-            import subprocess
-            import platform
-            import os
-            import json
-            
-            # Kodi box SSH settings (same box as MySQL)
-            KODI_BOX_SSH_HOST = "10.0.0.99"
-            KODI_BOX_SSH_USER = "root"
-            
-            # Build SSH command prefix (same as MySQL method)
-            if platform.system() == "Windows":
-                possible_ssh_paths = [
-                    "C:\\Windows\\System32\\OpenSSH\\ssh.exe",
-                    "C:\\Program Files\\Git\\usr\\bin\\ssh.exe",
-                    "ssh.exe"
-                ]
-                ssh_executable = None
-                for path in possible_ssh_paths:
-                    if os.path.exists(path) or path == "ssh.exe":
-                        ssh_executable = path
-                        break
-                
-                if not ssh_executable:
-                    self.log("SSH not found on Windows", xbmc.LOGERROR)
-                    return None
-                
-                ssh_key = os.path.expanduser("~/.ssh/id_rsa")
-            else:
-                ssh_executable = "ssh"
-                ssh_key = os.path.expanduser("~/.ssh/id_rsa")
-
-            ssh_cmd = [
-                ssh_executable,
-                "-i", ssh_key,
-                "-o", "StrictHostKeyChecking=no",
-                "-o", "UserKnownHostsFile=/dev/null",
-                "-o", "LogLevel=ERROR",
-                "%s@%s" % (KODI_BOX_SSH_USER, KODI_BOX_SSH_HOST)
-            ]
-            
-            # Execute monitoring script
-            self.log("Fetching Kodi box stats...")
-            result = subprocess.check_output(ssh_cmd + ["/storage/kodi-box-monitor.sh"])
-            output = result
-            
-            # Parse JSON output
-            stats = json.loads(output)
-            
-            self.log("fetchKodiBoxStats - SUCCESS")
-            return stats
-            
-        except Exception as e:
-            self.log("Error fetching Kodi box stats: %s" % str(e), xbmc.LOGERROR)
-            self.log("Traceback: %s" % traceback.format_exc(), xbmc.LOGERROR)
+    def collectKodiBoxStats(self, previous):
+        """Sample the Kodi box, the MySQL health check and the box monitor run in one round trip"""
+        # MySQL is on Kodi box, not Unraid - use separate settings
+        KODI_BOX_SSH_HOST = "10.0.0.99"
+        KODI_BOX_SSH_USER = "root"
+
+        transport = ssh_transport.get_transport(
+            KODI_BOX_SSH_HOST, KODI_BOX_SSH_USER, os.path.expanduser("~/.ssh/id_rsa"),
+            ssh_transport.UNTRUSTED_HOST_OPTIONS)
+        results = transport.run_batch([
+            "/bin/sh /storage/kodi-mysql-health.sh",
+            "/storage/kodi-box-monitor.sh",
+        ])
+
+        if results is None:
+            self.log("Unable to reach %s" % KODI_BOX_SSH_HOST, xbmc.LOGERROR)
+            return None
+
+        mysql, monitor = results
+        sample = {'mysql': {}, 'kodibox': None}
+
+        if mysql.returncode == 0:
+            sample['mysql'] = self.parseMySQLStats(mysql.output)
+        else:
+            # Stderr of the batch comes with the last command
+            self.log("MySQL health check failed: %s" % monitor.error.strip(), xbmc.LOGERROR)
+
+        if monitor.returncode == 0:
+            try:
+                sample['kodibox'] = json.loads(monitor.output)
+            except ValueError:
+                self.log("Kodi box monitor returned no JSON", xbmc.LOGERROR)
+        else:
+            self.log("Kodi box monitor failed: %s" % monitor.error.strip(), xbmc.LOGERROR)
+
+        if not sample['mysql'] and not sample['kodibox']:
             return None
 
+        return sample
+
+    def onKodiBoxSample(self):
+        if self.showingMySQLStats:
+            self.updateMySQLStatsData()
+
+        if self.showingKodiBoxStats:
+            self.updateKodiBoxStats()
+
     def updateKodiBoxStats(self):
         """Update Kodi box stats data"""
         self.log("updateKodiBoxStats - STARTED")
         
-        stats = self.fetchKodiBoxStats()
+        self.statsCollector.watch("KodiBox")
+        sample = self.statsCollector.latest("KodiBox")
+        stats = sample.get('kodibox') if sample else None
         
         if stats:
             self.kodiBoxStatsData = stats
@@ -6225,7 +5976,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             # Always update the display when we have new stats
             self.displayKodiBoxStats()
         else:
-            self.log("Failed to fetch Kodi box stats", xbmc.LOGERROR)
+            self.log("Waiting for the first Kodi box stats")
 
     def displayKodiBoxStats(self):
         """Display Kodi box stats on overlay"""
@@ -6314,7 +6065,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             if self.kodiBoxStatsRefreshTimer:
                 self.kodiBoxStatsRefreshTimer.cancel()
             
-            self.kodiBoxStatsRefreshTimer = threading.Timer(30.0, self.refreshKodiBoxStats)
+            self.kodiBoxStatsRefreshTimer = self.createTimer(30.0, self.refreshKodiBoxStats)
             self.kodiBoxStatsRefreshTimer.daemon = True
             self.kodiBoxStatsRefreshTimer.start()
             
@@ -6372,7 +6123,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             
             # Schedule next refresh
             if self.kodiBoxStatsRefreshTimer:
-                self.kodiBoxStatsRefreshTimer = threading.Timer(30.0, self.refreshKodiBoxStats)
+                self.kodiBoxStatsRefreshTimer = self.createTimer(30.0, self.refreshKodiBoxStats)
                 self.kodiBoxStatsRefreshTimer.daemon = True
                 self.kodiBoxStatsRefreshTimer.start()
 
@@ -6444,7 +6195,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         
         # Schedule next page switch with page-specific duration
         duration = self.getPageDuration(self.channel99CurrentPage)
-        self.channel99PageTimer = threading.Timer(duration, self.cycleChannel99Pages)
+        self.channel99PageTimer = self.createTimer(duration, self.cycleChannel99Pages)
         if not self.isExiting:
             self.channel99PageTimer.start()
             self.log("Next page switch scheduled in %d seconds" % duration)
@@ -6463,7 +6214,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         
         # Schedule first page switch with page-specific duration
         duration = self.getPageDuration(self.channel99CurrentPage)
-        self.channel99PageTimer = threading.Timer(duration, self.cycleChannel99Pages)
+        self.channel99PageTimer = self.createTimer(duration, self.cycleChannel99Pages)
         self.channel99PageTimer.start()
         self.log("Channel 99 page cycling started - first switch in %d seconds" % duration)
 
@@ -6532,19 +6283,18 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         
         self.log("Channel 99 page cycling stopped")
 
-    def showComingUpOverlay(self, nextshow):
-        """Show coming up overlay with landscape artwork"""
-        self.log("showComingUpOverlay")
+    def getComingUp(self, channel, nextshow):
+        """Look up the title, episode, description and landscape artwork of the next show"""
+        self.log("getComingUp")
 
         # Get next show information from channel
-        nextShowTitle = self.channels[self.currentChannel - 1].getItemTitle(nextshow)
-        nextShowEpisode = self.channels[self.currentChannel - 1].getItemEpisodeTitle(
-            nextshow
-        )
+        nextShowTitle = self.channels[channel - 1].getItemTitle(nextshow)
+        nextShowEpisode = self.channels[channel - 1].getItemEpisodeTitle(nextshow)
+        nextShowDescription = self.channels[channel - 1].getItemDescription(nextshow)
 
         # ADD DEBUG LOGGING
         self.log(
-            "showComingUpOverlay - Title: %s, Episode: %s"
+            "getComingUp - Title: %s, Episode: %s"
             % (nextShowTitle, nextShowEpisode)
         )
 
@@ -6552,8 +6302,8 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         nextShowImage = ""
         try:
             # Get the file path of the next show
-            mediaPath = self.channels[self.currentChannel - 1].getItemFilename(nextshow)
-            self.log("showComingUpOverlay: mediaPath = " + str(mediaPath))
+            mediaPath = self.channels[channel - 1].getItemFilename(nextshow)
+            self.log("getComingUp: mediaPath = " + str(mediaPath))
 
             # If it's a video file, navigate to the show's root folder
             if mediaPath and mediaPath.endswith(
@@ -6571,7 +6321,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                     # It's probably a movie - artwork should be in the same folder
                     rootPath = folderPath
 
-                self.log("showComingUpOverlay: Looking for artwork in " + rootPath)
+                self.log("getComingUp: Looking for artwork in " + rootPath)
 
                 # Look for artwork in the root folder
                 artworkFiles = [
@@ -6587,55 +6337,30 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                     artPath = os.path.join(rootPath, artFile)
                     if FileAccess.exists(artPath):
                         nextShowImage = artPath
-                        self.log("showComingUpOverlay: Found artwork at " + artPath)
+                        self.log("getComingUp: Found artwork at " + artPath)
                         break
 
         except Exception as e:
-            self.log("showComingUpOverlay: Error getting show artwork - " + str(e))
+            self.log("getComingUp: Error getting show artwork - " + str(e))
 
         # If still no image, try to extract from Kodi database/library
         if not nextShowImage and nextShowTitle:
             try:
-                # Use JSON-RPC to search for the show in the library
-                json_query = {
-                    "jsonrpc": "2.0",
-                    "method": "VideoLibrary.GetTVShows",
-                    "params": {
-                        "filter": {
-                            "field": "title",
-                            "operator": "contains",
-                            "value": nextShowTitle,
-                        },
-                        "properties": ["art"],
-                    },
-                    "id": 1,
-                }
-                result = xbmc.executeJSONRPC(json.dumps(json_query))
-                result = json.loads(result)
-
-                if (
-                    "result" in result
-                    and "tvshows" in result["result"]
-                    and result["result"]["tvshows"]
-                ):
-                    show = result["result"]["tvshows"][0]
-                    if "art" in show:
-                        if "landscape" in show["art"]:
-                            nextShowImage = show["art"]["landscape"]
-                        elif "fanart" in show["art"]:
-                            nextShowImage = show["art"]["fanart"]
-                        elif "banner" in show["art"]:
-                            nextShowImage = show["art"]["banner"]
+                # Search for the show in the library artwork
+                nextShowImage = pickArt(
+                    ARTWORK_INDEX.getShowArt(nextShowTitle, contains=True),
+                    ("landscape", "fanart", "banner"),
+                )
 
             except Exception as e:
-                self.log("showComingUpOverlay: Error searching library - " + str(e))
+                self.log("getComingUp: Error searching library - " + str(e))
 
         # Fallback to channel artwork if no show artwork
         if not nextShowImage:
             self.log(
-                "showComingUpOverlay: No show artwork found, using channel artwork"
+                "getComingUp: No show artwork found, using channel artwork"
             )
-            channelName = self.channels[self.currentChannel - 1].name
+            channelName = self.channels[channel - 1].name
             # Try channel landscape
             nextShowImage = self.channelLogos + ascii(channelName) + "_landscape.png"
             if not FileAccess.exists(nextShowImage):
@@ -6644,22 +6369,37 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                 if not FileAccess.exists(nextShowImage):
                     nextShowImage = ICON
 
-        self.log("showComingUpOverlay: Final image = " + str(nextShowImage))
+        self.log("getComingUp: Final image = " + str(nextShowImage))
+
+        return {
+            "title": nextShowTitle,
+            "episode": nextShowEpisode,
+            "description": nextShowDescription,
+            "image": nextShowImage,
+        }
+
+    def showComingUpOverlay(self, nextshow, comingUp=None):
+        """Show coming up overlay with landscape artwork"""
+        self.log("showComingUpOverlay")
+
+        if comingUp is None:
+            comingUp = self.getComingUp(self.currentChannel, nextshow)
 
         # Set properties for the overlay
         self.setProperty("PTV.ComingUp", "true")
-        self.setProperty("PTV.ComingUp.Title", nextShowTitle)
-        self.setProperty("PTV.ComingUp.Episode", nextShowEpisode)
-        self.setProperty("PTV.ComingUp.Image", nextShowImage)
+        self.setProperty("PTV.ComingUp.Title", comingUp["title"])
+        self.setProperty("PTV.ComingUp.Episode", comingUp["episode"])
+        self.setProperty("PTV.ComingUp.Description", comingUp["description"])
+        self.setProperty("PTV.ComingUp.Image", comingUp["image"])
 
         # ADD DEBUG TO VERIFY PROPERTIES ARE SET
         self.log("showComingUpOverlay - Properties set:")
         self.log(
-            "  PTV.ComingUp = %s" % xbmcgui.Window(10000).getProperty("PTV.ComingUp")
+            "  PTV.ComingUp = %s" % self.properties.get("PTV.ComingUp")
         )
         self.log(
             "  PTV.ComingUp.Title = %s"
-            % xbmcgui.Window(10000).getProperty("PTV.ComingUp.Title")
+            % self.properties.get("PTV.ComingUp.Title")
         )
 
         self.showingComingUp = True
@@ -6672,7 +6412,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         ):
             self.comingUpTimer.cancel()
 
-        self.comingUpTimer = threading.Timer(
+        self.comingUpTimer = self.createTimer(
             NOTIFICATION_DISPLAY_TIME, self.hideComingUpOverlay
         )
         self.comingUpTimer.start()
@@ -6699,11 +6439,11 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         self.log("Dialog window ID: %s" % xbmcgui.getCurrentWindowDialogId())
 
         # Check if property is actually set
-        value = xbmcgui.Window(10000).getProperty("PTV.ComingUp")
+        value = self.properties.get("PTV.ComingUp")
         self.log('Property check - PTV.ComingUp = "%s"' % value)
 
         # Try setting on different window IDs
-        xbmcgui.Window(10000).setProperty("PTV.ComingUp", "true")  # Home window
+        self.setProperty("PTV.ComingUp", "true")  # Home window
         xbmcgui.Window(xbmcgui.getCurrentWindowId()).setProperty(
             "PTV.ComingUp", "true"
         )  # Current window
@@ -6915,7 +6655,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             if self.sleepTimeValue > 0:
                 if self.sleepTimer.is_alive():
                     self.sleepTimer.cancel()
-                    self.sleepTimer = threading.Timer(
+                    self.sleepTimer = self.createTimer(
                         self.sleepTimeValue, self.sleepAction
                     )
 
@@ -6940,95 +6680,104 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         if self.notificationTimer.is_alive():
             self.notificationTimer.cancel()
 
-        self.notificationTimer = threading.Timer(timertime, self.notificationAction)
+        self.notificationTimer = self.createTimer(timertime, self.notificationAction)
 
         if self.Player.stopped == False:
             self.notificationTimer.name = "NotificationTimer"
             self.notificationTimer.start()
 
     def notificationAction(self):
-        """Show coming up next notification"""
+        """Show coming up next notification, the timer is set for when it is due"""
         self.log("notificationAction")
 
         if self.showNextItem == False:
             return
 
-        if self.Player.isPlaying():
-            # Check if we need to show notification
-            docheck = False
-
-            if self.notificationLastChannel != self.currentChannel:
-                docheck = True
-            elif (
-                self.notificationLastShow
-                != xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getposition()
+        if self.Player.isPlaying() == False:
+            self.startNotificationTimer()
+            return
+
+        position = self.playlistWindow.getPosition()
+        channel = self.channels[self.currentChannel - 1]
+
+        # A new show, get what comes after it ready
+        if (
+            self.notificationLastChannel != self.currentChannel
+            or self.notificationLastShow != position
+        ):
+            self.notificationLastChannel = self.currentChannel
+            self.notificationLastShow = position
+            self.notificationShowedNotif = False
+
+            # Don't show for short items
+            if (
+                self.hideShortItems
+                and channel.getItemDuration(position) < self.shortItemLength
             ):
-                docheck = True
-            elif self.notificationShowedNotif == False:
-                docheck = True
-
-            if docheck == True:
-                self.notificationLastChannel = self.currentChannel
-                self.notificationLastShow = xbmc.PlayList(
-                    xbmc.PLAYLIST_MUSIC
-                ).getposition()
-                self.notificationShowedNotif = False
-
-                # Don't show for short items
-                if self.hideShortItems:
-                    if (
-                        self.channels[self.currentChannel - 1].getItemDuration(
-                            self.notificationLastShow
-                        )
-                        < self.shortItemLength
-                    ):
-                        self.notificationShowedNotif = True
+                self.notificationShowedNotif = True
+            else:
+                self.prepareComingUp(self.currentChannel, position)
 
-                # Check if near end of show
-                timedif = (
-                    self.channels[self.currentChannel - 1].getItemDuration(
-                        self.notificationLastShow
-                    )
-                    - self.Player.getTime()
-                )
+        timedif = channel.getItemDuration(position) - self.Player.getTime()
 
-                if (
-                    self.notificationShowedNotif == False
-                    and timedif < NOTIFICATION_TIME_BEFORE_END
-                    and timedif > NOTIFICATION_DISPLAY_TIME
-                ):
-                    # Find next show
-                    nextshow = self.channels[self.currentChannel - 1].fixPlaylistIndex(
-                        self.notificationLastShow + 1
-                    )
+        if self.notificationShowedNotif == False:
+            if timedif > NOTIFICATION_TIME_BEFORE_END:
+                # Check again when it is due, in case of a pause or seek
+                self.startNotificationTimer(timedif - NOTIFICATION_TIME_BEFORE_END)
+                return
 
-                    if self.hideShortItems:
-                        # Find next show >= short item length
-                        while nextshow != self.notificationLastShow:
-                            if (
-                                self.channels[self.currentChannel - 1].getItemDuration(
-                                    nextshow
-                                )
-                                >= self.shortItemLength
-                            ):
-                                break
-                            nextshow = self.channels[
-                                self.currentChannel - 1
-                            ].fixPlaylistIndex(nextshow + 1)
+            if timedif > NOTIFICATION_DISPLAY_TIME:
+                nextshow = self.getNextShow(self.currentChannel, position)
+                comingUp = self.comingUp
 
-                    # Show coming up overlay instead of notification
+                if comingUp is not None and comingUp[:2] == (self.currentChannel, nextshow):
+                    self.showComingUpOverlay(nextshow, comingUp[2])
+                else:
                     self.showComingUpOverlay(nextshow)
-                    self.notificationShowedNotif = True
 
-        self.startNotificationTimer()
+            self.notificationShowedNotif = True
+
+        # Nothing more until the next show starts
+        self.startNotificationTimer(max(timedif + 1, NOTIFICATION_CHECK_TIME))
+
+    def getNextShow(self, channel, position):
+        """The show after the position, skipping short items if they are hidden"""
+        nextshow = self.channels[channel - 1].fixPlaylistIndex(position + 1)
+
+        if self.hideShortItems:
+            # Find next show >= short item length
+            while nextshow != position:
+                if self.channels[channel - 1].getItemDuration(nextshow) >= self.shortItemLength:
+                    break
+
+                nextshow = self.channels[channel - 1].fixPlaylistIndex(nextshow + 1)
+
+        return nextshow
+
+    def prepareComingUp(self, channel, position):
+        """Look up the show after the position in the background"""
+        nextshow = self.getNextShow(channel, position)
+        self.comingUp = None
+        timer = ScheduledTimer(
+            self.scheduler, 0, self.resolveComingUp, [channel, nextshow]
+        )
+        timer.name = "ComingUpPrepare"
+        timer.start()
+
+    def resolveComingUp(self, channel, nextshow):
+        try:
+            self.comingUp = (channel, nextshow, self.getComingUp(channel, nextshow))
+        except:
+            self.log("Unable to look up the next show", xbmc.LOGERROR)
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
 
     def playerTimerAction(self):
         """Monitor player status"""
-        self.playerTimer = threading.Timer(2.0, self.playerTimerAction)
+        self.playerTimer = self.createTimer(2.0, self.playerTimerAction)
 
         if self.Player.isPlaying():
             self.lastPlayTime = int(self.Player.getTime())
-            self.lastPlaylistPosition = xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getposition()
+            self.lastPlaylistPosition = self.playlistWindow.getPosition()
             self.notPlayingCount = 0
         else:
             self.notPlayingCount += 1
@@ -7042,6 +6791,17 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             self.playerTimer.name = "PlayerTimer"
             self.playerTimer.start()
 
+    def onSettingsChanged(self, changed):
+        """Note channels updated in settings2.xml by another box"""
+        if self.isMaster:
+            return
+
+        for name in changed:
+            match = re.match(r"Channel_(\d+)_", name)
+
+            if match:
+                self.sharedChannelChanges.add(int(match.group(1)))
+
     def resetChannelTimes(self):
         """Reset channel access times"""
         for i in range(self.maxChannels):
@@ -7058,13 +6818,11 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
 
         realloc = ADDON.getSetting("SettingsFolder")
         FileAccess.copy(realloc + "/settings2.xml", SETTINGS_LOC + "/settings2.xml")
-        realloc = xbmcvfs.translatePath(os.path.join(realloc, "cache")) + "/"
 
-        for i in range(1000):
-            FileAccess.copy(
-                realloc + "channel_" + str(i) + ".m3u",
-                CHANNELS_LOC + "channel_" + str(i) + ".m3u",
-            )
+        # Read the channels the master published last, without any lock.
+        # Until it has published any, the local cache is left as it is.
+        if self.channelSnapshots.fetch() == None:
+            self.log("No published channels to fetch, keeping the local cache")
 
     def storeFiles(self):
         """Store channel files for sharing"""
@@ -7075,13 +6833,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
 
         realloc = ADDON.getSetting("SettingsFolder")
         FileAccess.copy(SETTINGS_LOC + "/settings2.xml", realloc + "/settings2.xml")
-        realloc = xbmcvfs.translatePath(os.path.join(realloc, "cache")) + "/"
-
-        for i in range(self.maxChannels + 1):
-            FileAccess.copy(
-                CHANNELS_LOC + "channel_" + str(i) + ".m3u",
-                realloc + "channel_" + str(i) + ".m3u",
-            )
+        self.channelSnapshots.publish(CHANNEL_REGISTRY.getChannels())
 
     def runActions(self, action, channel, parameter):
         """Run channel rules"""
@@ -7115,9 +6867,13 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         """Log a message"""
         log("TVOverlay: " + msg, level)
 
+    def createTimer(self, interval, function):
+        """A timer that runs on the overlay's scheduler instead of its own thread"""
+        return ScheduledTimer(self.scheduler, interval, function)
+
     def setProperty(self, key, value):
-        """Set a window property"""
-        xbmcgui.Window(10000).setProperty(key, value)
+        """Set a window property, unchanged values aren't sent again"""
+        self.properties.set(key, value)
 
     def onFocus(self, controlId):
         pass
@@ -7150,7 +6906,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                 self.log("end - Cancelled channel 99 page timer")
             
             # Clear channel 99 visualization property on exit
-            xbmcgui.Window(10000).clearProperty("PTV.Channel99")
+            self.properties.clear("PTV.Channel99")
             self.log("end - Cleared channel 99 visualization property")
 
             
@@ -7209,123 +6965,21 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
             self.setProperty("PTV.FavoriteShow", "false")
             self.setProperty("PTV.ChannelNumber", "")
             
-            # Clear calendar properties
-            self.setProperty("PTV.Calendar.Today.Title", "")
-            self.setProperty("PTV.Calendar.Today.Episode", "")
-            self.setProperty("PTV.Calendar.Today.Status", "")
-            self.setProperty("PTV.Calendar.Today.Poster", "")
-            for i in range(1, 11):
-                self.setProperty("PTV.Calendar.Week.%d" % i, "")
-                self.setProperty("PTV.Calendar.Week.%d.InLibrary" % i, "false")
-            
-            # Clear recently added properties
-            self.setProperty("PTV.Recent.Featured.Title", "")
-            self.setProperty("PTV.Recent.Featured.Subtitle", "")
-            self.setProperty("PTV.Recent.Featured.EpisodeTitle", "")
-            self.setProperty("PTV.Recent.Featured.Poster", "")
-            self.setProperty("PTV.Recent.Featured.DateAdded", "")
-            self.setProperty("PTV.Recent.Featured.Watched", "false")
-            for i in range(1, 6):
-                self.setProperty("PTV.Recent.List.%d" % i, "")
-                self.setProperty("PTV.Recent.List.%d.Watched" % i, "false")
-            
-            # Clear recommendations properties
-            self.setProperty("PTV.Recommendations", "false")
-            self.setProperty("PTV.Recommendations.Featured.Title", "")
-            self.setProperty("PTV.Recommendations.Featured.Subtitle", "")
-            self.setProperty("PTV.Recommendations.Featured.EpisodeTitle", "")
-            self.setProperty("PTV.Recommendations.Featured.Poster", "")
-            self.setProperty("PTV.Recommendations.Featured.Genre", "")
-            for i in range(1, 6):
-                self.setProperty("PTV.Recommendations.Genre.%d" % i, "")
-                self.setProperty("PTV.Recommendations.Genre.%d.Artwork" % i, "")
-            
-            # Clear server stats properties
-            self.setProperty("PTV.ServerStats", "false")
-            self.setProperty("PTV.ServerStats.Name", "")
-            self.setProperty("PTV.ServerStats.Uptime", "")
-            self.setProperty("PTV.ServerStats.CPUTemp", "")
-            self.setProperty("PTV.ServerStats.CPUUsage", "")
-            self.setProperty("PTV.ServerStats.RAMUsage", "")
-            self.setProperty("PTV.ServerStats.LoadAvg", "")
-            self.setProperty("PTV.ServerStats.Array.Total", "")
-            self.setProperty("PTV.ServerStats.Array.Used", "")
-            self.setProperty("PTV.ServerStats.Array.Percent", "")
-            for i in range(1, 6):
-                self.setProperty("PTV.ServerStats.Disk.%d.Name" % i, "")
-                self.setProperty("PTV.ServerStats.Disk.%d.Used" % i, "")
-                self.setProperty("PTV.ServerStats.Disk.%d.Total" % i, "")
-                self.setProperty("PTV.ServerStats.Disk.%d.Percent" % i, "")
-            self.setProperty("PTV.ServerStats.Cache.Total", "")
-            self.setProperty("PTV.ServerStats.Cache.Used", "")
-            self.setProperty("PTV.ServerStats.Cache.Percent", "")
-            self.setProperty("PTV.ServerStats.Cache.Temp", "")
-            
-            # ADD THIS ENTIRE BLOCK - Clear MySQL stats properties:
-            self.setProperty("PTV.MySQLStats", "false")
-            self.setProperty("PTV.MySQLStats.Name", "")
-            self.setProperty("PTV.MySQLStats.Status", "")
-            self.setProperty("PTV.MySQLStats.Uptime", "")
-            self.setProperty("PTV.MySQLStats.CPUUsage", "")
-            self.setProperty("PTV.MySQLStats.MemoryUsage", "")
-            self.setProperty("PTV.MySQLStats.NetworkIO", "")
-            self.setProperty("PTV.MySQLStats.ActiveConnections", "")
-            self.setProperty("PTV.MySQLStats.TotalSize", "")
-            self.setProperty("PTV.MySQLStats.TotalTables", "")
-            for i in range(1, 6):
-                self.setProperty("PTV.MySQLStats.DB.%d.Name" % i, "")
-                self.setProperty("PTV.MySQLStats.DB.%d.Size" % i, "")
-                self.setProperty("PTV.MySQLStats.DB.%d.Tables" % i, "")
-            self.setProperty("PTV.MySQLStats.Movies", "")
-            self.setProperty("PTV.MySQLStats.TVShows", "")
-            self.setProperty("PTV.MySQLStats.Episodes", "")
-            self.setProperty("PTV.MySQLStats.Files", "")
-            self.setProperty("PTV.MySQLStats.HealthStatus", "")
-            self.setProperty("PTV.MySQLStats.HealthColor", "")
-            self.setProperty("PTV.MySQLStats.OrphanedTotal", "")
-            self.setProperty("PTV.MySQLStats.TableIntegrity", "")
-            
-            # ADD THIS ENTIRE BLOCK - Clear Kodi Box stats properties:
-            self.setProperty("PTV.KodiBoxStats", "false")
-            self.setProperty("PTV.KodiBoxStats.Name", "")
-            self.setProperty("PTV.KodiBoxStats.Uptime", "")
-            self.setProperty("PTV.KodiBoxStats.LibreELECVersion", "")
-            self.setProperty("PTV.KodiBoxStats.CPUModel", "")
-            self.setProperty("PTV.KodiBoxStats.CPUTemp", "")
-            self.setProperty("PTV.KodiBoxStats.CPUUsage", "")
-            self.setProperty("PTV.KodiBoxStats.MemoryUsage", "")
-            self.setProperty("PTV.KodiBoxStats.IPAddress", "")
-            self.setProperty("PTV.KodiBoxStats.NetworkInterface", "")
-            self.setProperty("PTV.KodiBoxStats.LinkSpeed", "")
-            self.setProperty("PTV.KodiBoxStats.NetworkIO", "")
-            self.setProperty("PTV.KodiBoxStats.RootUsage", "")
-            self.setProperty("PTV.KodiBoxStats.StorageUsage", "")
-            self.setProperty("PTV.KodiBoxStats.KodiStatus", "")
-            self.setProperty("PTV.KodiBoxStats.KodiCPU", "")
-            self.setProperty("PTV.KodiBoxStats.KodiMemory", "")
-            self.setProperty("PTV.KodiBoxStats.KodiUptime", "")
-            self.setProperty("PTV.KodiBoxStats.LoadAverage", "")
-            for i in range(8):
-                self.setProperty("PTV.KodiBoxStats.Core%d" % i, "")
-            
-            # Clear Wikipedia properties:
-            self.setProperty("PTV.ShowWikipedia", "false")
-            self.setProperty("PTV.Wikipedia.Title", "")
-            self.setProperty("PTV.Wikipedia.Image", "")
-            self.setProperty("PTV.Wikipedia.Text", "")
-            self.setProperty("PTV.Wikipedia.WordCount", "")
-            self.setProperty("PTV.Wikipedia.Categories", "")
-            self.setProperty("PTV.Wikipedia.Date", "")
-            
-            # Clear weather properties
-            self.setProperty("PTV.Weather.Location", "")
-            self.setProperty("PTV.Weather.Temperature", "")
-            self.setProperty("PTV.Weather.Conditions", "")
-            self.setProperty("PTV.Weather.CurrentIcon", "")
-            for i in range(5):
-                self.setProperty("PTV.Weather.Hour%d.Time" % i, "")
-                self.setProperty("PTV.Weather.Hour%d.Temp" % i, "")
-                self.setProperty("PTV.Weather.Hour%d.Icon" % i, "")
+            # Clear the properties of every page, only the ones that have
+            # a value are sent
+            for prefix in (
+                "PTV.Calendar.",
+                "PTV.Recent.",
+                "PTV.Recommendations.",
+                "PTV.ServerStats.",
+                "PTV.MySQLStats.",
+                "PTV.KodiBoxStats.",
+                "PTV.Wikipedia.",
+                "PTV.Weather.",
+            ):
+                self.properties.clearPrefix(prefix)
+
+            self.properties.flush()
             
             self.log("end - Overlay cleanup complete")
         except Exception as e:
@@ -7355,9 +7009,7 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         try:
             if self.Player.isPlaying() and not getattr(self, "browsingLibrary", False):
                 self.lastPlayTime = self.Player.getTime()
-                self.lastPlaylistPosition = xbmc.PlayList(
-                    xbmc.PLAYLIST_MUSIC
-                ).getposition()
+                self.lastPlaylistPosition = self.playlistWindow.getPosition()
                 self.Player.stop()
         except:
             pass
@@ -7420,6 +7072,36 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         except:
             pass
 
+        # Drops whatever is still pending, including the one-shot timers
+        self.dataProviders.save()
+        self.scheduler.shutdown()
+        # Send what the cancelled flush had queued, sets from here on are
+        # sent right away
+        self.properties.flush()
+        self.httpClient.close()
+        rpcStats = JSON_RPC.getStats()
+        self.log(
+            "JSON-RPC: "
+            + str(rpcStats["requests"])
+            + " requests, "
+            + str(rpcStats["calls"])
+            + " calls, "
+            + str(rpcStats["cacheHits"])
+            + " cached, "
+            + str(rpcStats["coalesced"])
+            + " coalesced",
+            xbmc.LOGINFO,
+        )
+        stats = self.scheduler.getStats()
+        self.log(
+            "Scheduler ran "
+            + str(stats["tasks"])
+            + " tasks on "
+            + str(stats["threads"])
+            + " threads",
+            xbmc.LOGINFO,
+        )
+
         # Stop channel thread
         updateDialog.update(7, message="Exiting - Stopping Channel Thread")
         if self.channelThread.is_alive():
@@ -7489,13 +7171,16 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
                                     "Channel_" + str(i + 1) + "_time", str(int(tottime))
                                 )
 
+                # The channel times above are still queued, write them before sharing
+                ADDON_SETTINGS.flush()
                 self.storeFiles()
 
+        ADDON_SETTINGS.flush()
         updateDialog.close()
 
         # Clear the playlist
         try:
-            xbmc.PlayList(xbmc.PLAYLIST_MUSIC).clear()
+            self.playlistWindow.clear()
         except:
             pass
         # Final property cleanup before closing window
@@ -7571,14 +7256,14 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
 
         if self.notificationTimer.is_alive():
             self.notificationTimer.cancel()
-            self.notificationTimer = threading.Timer(
+            self.notificationTimer = self.createTimer(
                 NOTIFICATION_CHECK_TIME, self.notificationAction
             )
 
         if self.sleepTimeValue > 0:
             if self.sleepTimer.is_alive():
                 self.sleepTimer.cancel()
-                self.sleepTimer = threading.Timer(self.sleepTimeValue, self.sleepAction)
+                self.sleepTimer = self.createTimer(self.sleepTimeValue, self.sleepAction)
 
         self.hideInfo()
         self.getControl(103).setVisible(False)
@@ -7692,4 +7377,4 @@ class TVOverlay(xbmcgui.WindowXMLDialog):
         if self.sleepTimer and self.sleepTimer.is_alive():
             self.sleepTimer.cancel()
 
-        self.sleepTimer = threading.Timer(self.sleepTimeValue, self.sleepAction)
\ No newline at end of file
+        self.sleepTimer = self.createTimer(self.sleepTimeValue, self.sleepAction)
\ No newline at end of file
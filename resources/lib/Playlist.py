@@ -16,6 +16,7 @@
 # You should have received a copy of the GNU General Public License
 # along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
 
+import bisect
 import threading
 import time
 import traceback
@@ -38,6 +39,10 @@ class PlaylistItem:
 class Playlist:
     def __init__(self):
         self.itemlist = []
+        # When each item starts, in seconds from the start of the playlist
+        self.startTimes = []
+        # The positions of the items, by title in lower case
+        self.titleIndex = {}
         self.totalDuration = 0
         self.processingSemaphore = threading.BoundedSemaphore()
 
@@ -104,8 +109,66 @@ class Playlist:
         self.processingSemaphore.release()
         return ""
 
+    def getStartTime(self, index):
+        self.processingSemaphore.acquire()
+
+        if index >= 0 and index < len(self.startTimes):
+            start = self.startTimes[index]
+            self.processingSemaphore.release()
+            return start
+
+        self.processingSemaphore.release()
+        return 0
+
+    # The item playing the given number of seconds into the playlist and how
+    # far into the item that is, wrapping around at the end
+    def getPositionAt(self, seconds):
+        self.processingSemaphore.acquire()
+
+        if len(self.itemlist) == 0 or self.totalDuration <= 0:
+            self.processingSemaphore.release()
+            return 0, 0
+
+        seconds %= self.totalDuration
+        index = bisect.bisect_right(self.startTimes, seconds) - 1
+        offset = seconds - self.startTimes[index]
+        self.processingSemaphore.release()
+        return index, offset
+
+    # The first item with the title that is playing the given number of
+    # seconds into the playlist or starts within the next `within` seconds.
+    # Returns the item and how long after then it starts, negative when it
+    # already started, or None.
+    def getNextAiring(self, title, seconds, within):
+        self.processingSemaphore.acquire()
+        positions = self.titleIndex.get(title.lower())
+
+        if not positions or self.totalDuration <= 0:
+            self.processingSemaphore.release()
+            return None
+
+        seconds %= self.totalDuration
+        current = bisect.bisect_right(self.startTimes, seconds) - 1
+        i = bisect.bisect_left(positions, current)
+
+        if i < len(positions):
+            index = positions[i]
+            startsIn = self.startTimes[index] - seconds
+        else:
+            index = positions[0]
+            startsIn = self.startTimes[index] + self.totalDuration - seconds
+
+        self.processingSemaphore.release()
+
+        if startsIn >= within:
+            return None
+
+        return index, startsIn
+
     def clear(self):
         del self.itemlist[:]
+        del self.startTimes[:]
+        self.titleIndex = {}
         self.totalDuration = 0
 
     def log(self, msg, level=xbmc.LOGDEBUG):
@@ -179,7 +242,11 @@ class Playlist:
 
                 realindex += 1
                 tmpitem.filename = uni(lines[realindex].rstrip())
+                self.titleIndex.setdefault(tmpitem.title.lower(), []).append(
+                    len(self.itemlist)
+                )
                 self.itemlist.append(tmpitem)
+                self.startTimes.append(self.totalDuration)
                 self.totalDuration += tmpitem.duration
 
             realindex += 1
@@ -191,17 +258,24 @@ class Playlist:
 
         return True
 
-    def save(self, filename):
+    # Without a count the whole playlist is saved.  With one, count items
+    # from start on, wrapping around at the end.
+    def save(self, filename, start=0, count=None):
         self.log("save " + filename)
         try:
             fle = FileAccess.open(filename, "w")
         except:
             self.log("save Unable to open the smart playlist", xbmc.LOGERROR)
-            return
+            return False
 
         flewrite = uni("#EXTM3U\n")
+        size = self.size()
+
+        if count is None or size == 0:
+            count = size
 
-        for i in range(self.size()):
+        for offset in range(count):
+            i = (start + offset) % size
             tmpstr = str(self.getduration(i)) + ","
             tmpstr += (
                 self.getTitle(i)
@@ -217,3 +291,4 @@ class Playlist:
 
         fle.write(flewrite)
         fle.close()
+        return True
@@ -0,0 +1,264 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import threading
+import traceback
+
+import Globals
+import xbmc
+import xbmcgui
+import xbmcvfs
+from FileAccess import FileAccess
+from Scheduler import ScheduledTimer
+
+# Items put in Kodi's playlist before and after the one tuned to
+WINDOW_BEHIND = 2
+WINDOW_AHEAD = 24
+# More are added when fewer than this many items follow the playing one.
+# That is checked whenever an item starts, and every EXTEND_INTERVAL.
+LOW_WATER = 8
+EXTEND_INTERVAL = 60.0
+
+
+# The part of the current channel that is in Kodi's playlist.  Tuning only
+# hands Kodi a few items around the one to play, written from the channel's
+# playlist, so it doesn't parse the whole channel file first.  While the
+# channel plays the window is extended in the background before Kodi gets
+# to its end, where repeat would take it back to the start of the window.  Kodi's playlist positions are relative to the window, use
+# getPosition() for the position in the channel.  The windows of channels
+# likely to be tuned to next can be written ahead of time with prepare().
+class PlaylistWindow:
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        # Kept in the profile, the cache folder is shared with the slaves
+        self.filename = xbmcvfs.translatePath(
+            os.path.join(Globals.SETTINGS_LOC, "window.m3u")
+        )
+        self.channel = None
+        self.firstIndex = 0
+        self.count = 0
+        self.extendTimer = None
+        # Windows written ahead of time, by channel file
+        self.prepared = {}
+        self.windowLock = threading.RLock()
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("PlaylistWindow: " + msg, level)
+
+    # Put the channel into Kodi's playlist around the position.  Returns the
+    # position to play in Kodi's playlist, None if it couldn't be loaded.
+    def load(self, channel, position):
+        playlist = xbmc.PlayList(xbmc.PLAYLIST_MUSIC)
+        size = channel.Playlist.size()
+        count = WINDOW_BEHIND + 1 + WINDOW_AHEAD
+
+        with self.windowLock:
+            self.cancelExtend()
+            self.channel = None
+            playlist.clear()
+
+            # A short channel is loaded whole, as it always was
+            if size <= count:
+                if playlist.load(channel.fileName) == False:
+                    return None
+
+                self.setWindow(channel, 0, size)
+                return position
+
+            first = channel.fixPlaylistIndex(position - WINDOW_BEHIND)
+            filename = self.takePrepared(channel, first)
+
+            if filename is None:
+                filename = self.filename
+
+                if channel.Playlist.save(filename, first, count) == False:
+                    return None
+
+            loaded = playlist.load(filename)
+
+            if filename != self.filename:
+                FileAccess.delete(filename)
+
+            if loaded == False:
+                return None
+
+            self.setWindow(channel, first, count)
+
+        self.scheduleExtend()
+        return WINDOW_BEHIND
+
+    # Write the windows of the channels, [(channel, position)], so loading
+    # them only hands the file to Kodi.  Windows prepared before for other
+    # channels are dropped.
+    def prepare(self, targets):
+        count = WINDOW_BEHIND + 1 + WINDOW_AHEAD
+
+        with self.windowLock:
+            prepared = {}
+
+            for channel, position in targets:
+                if channel.Playlist.size() <= count:
+                    continue
+
+                first = channel.fixPlaylistIndex(position - WINDOW_BEHIND)
+                stamp = self.getStamp(channel, first)
+                entry = self.prepared.pop(channel.fileName, None)
+
+                if entry is None or entry["stamp"] != stamp:
+                    filename = self.getPreparedFilename(channel)
+
+                    if channel.Playlist.save(filename, first, count) == False:
+                        continue
+
+                    entry = {"stamp": stamp, "filename": filename}
+
+                prepared[channel.fileName] = entry
+
+            for entry in self.prepared.values():
+                FileAccess.delete(entry["filename"])
+
+            self.prepared = prepared
+
+    # The prepared window of the channel if it starts at first, it is used
+    # only once
+    def takePrepared(self, channel, first):
+        entry = self.prepared.pop(channel.fileName, None)
+
+        if entry is not None and entry["stamp"] == self.getStamp(channel, first):
+            return entry["filename"]
+
+        return None
+
+    # Tells a prepared window from one the channel's playlist was rebuilt under
+    def getStamp(self, channel, first):
+        return [
+            first,
+            channel.Playlist.size(),
+            channel.Playlist.totalDuration,
+            channel.getItemFilename(first),
+        ]
+
+    def getPreparedFilename(self, channel):
+        return xbmcvfs.translatePath(
+            os.path.join(
+                Globals.SETTINGS_LOC, "window_" + os.path.basename(channel.fileName)
+            )
+        )
+
+    def setWindow(self, channel, firstIndex, count):
+        self.channel = channel
+        self.firstIndex = firstIndex
+        self.count = count
+
+    def toChannelIndex(self, kodiIndex):
+        with self.windowLock:
+            if self.channel is None or kodiIndex < 0:
+                return kodiIndex
+
+            return self.channel.fixPlaylistIndex(self.firstIndex + kodiIndex)
+
+    # The position of a channel item in Kodi's playlist, None if it isn't in
+    # the window
+    def toKodiIndex(self, channelIndex):
+        with self.windowLock:
+            if self.channel is None:
+                return channelIndex
+
+            index = self.channel.fixPlaylistIndex(channelIndex - self.firstIndex)
+
+            if index < self.count:
+                return index
+
+        return None
+
+    # The position in the channel of what Kodi is playing
+    def getPosition(self):
+        return self.toChannelIndex(xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getposition())
+
+    # Called when Kodi starts an item.  Short items or skipping ahead get
+    # through the window faster than the regular check.
+    def onPlaybackStarted(self):
+        if self.channel is not None:
+            self.scheduleExtend(0)
+
+    def scheduleExtend(self, delay=EXTEND_INTERVAL):
+        with self.windowLock:
+            self.extendTimer = ScheduledTimer(self.scheduler, delay, self.extend)
+            self.extendTimer.name = "PlaylistWindowExtend"
+            self.extendTimer.start()
+
+    def cancelExtend(self):
+        if self.extendTimer is not None:
+            self.extendTimer.cancel()
+            self.extendTimer = None
+
+    # Add the next items once the playing one gets close to the end.  Once
+    # the whole channel is in, Kodi's repeat takes over.
+    def extend(self):
+        with self.windowLock:
+            channel = self.channel
+
+            if channel is None:
+                return
+
+            size = channel.Playlist.size()
+
+            if self.count >= size:
+                return
+
+            playlist = xbmc.PlayList(xbmc.PLAYLIST_MUSIC)
+            position = playlist.getposition()
+
+            if position >= 0 and self.count - 1 - position < LOW_WATER:
+                try:
+                    for i in range(min(WINDOW_AHEAD, size - self.count)):
+                        index = channel.fixPlaylistIndex(self.firstIndex + self.count)
+                        playlist.add(
+                            channel.getItemFilename(index), self.getListItem(channel, index)
+                        )
+                        self.count += 1
+                except:
+                    self.log("Unable to extend the playlist", xbmc.LOGERROR)
+                    self.log(traceback.format_exc(), xbmc.LOGERROR)
+
+                self.log("Extended to " + str(self.count) + " of " + str(size) + " items")
+
+        self.scheduleExtend()
+
+    # The item as Kodi would have read it from the channel file
+    def getListItem(self, channel, index):
+        label = (
+            channel.getItemTitle(index)
+            + "//"
+            + channel.getItemEpisodeTitle(index)
+            + "//"
+            + channel.getItemDescription(index)
+        )
+        item = xbmcgui.ListItem(label)
+        item.setInfo(
+            "music",
+            {"title": label, "duration": channel.getItemDuration(index)},
+        )
+        return item
+
+    def clear(self):
+        with self.windowLock:
+            self.cancelExtend()
+            self.channel = None
+            xbmc.PlayList(xbmc.PLAYLIST_MUSIC).clear()
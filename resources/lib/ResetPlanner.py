@@ -0,0 +1,268 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import traceback
+
+import xbmc
+from FileAccess import FileAccess
+from GlobalRulesHandler import GlobalRulesHandler
+from Globals import *
+
+
+# Decide which channels actually need a new playlist.  Every playlist is
+# recorded with a hash of the definition it was built from (the channel
+# settings and rules, the global rules that apply to it and the channels
+# it interleaves).  Playlists whose definition is unchanged are kept, and
+# the ones that only changed number are moved instead of rebuilt.
+class ResetPlanner:
+    def __init__(self, channelList):
+        self.channelList = channelList
+        self.filename = CHANNELS_LOC + "builds.json"
+        self.builds = None
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        log("ResetPlanner: " + msg, level)
+
+    def getPlaylistName(self, channel):
+        return CHANNELS_LOC + "channel_" + str(channel) + ".m3u"
+
+    def loadBuilds(self):
+        self.builds = {}
+
+        try:
+            fle = FileAccess.open(self.filename, "r")
+            data = json.loads("\n".join(fle.readlines()))
+            fle.close()
+        except:
+            return False
+
+        for channel, definition in data.items():
+            self.builds[int(channel)] = definition
+
+        return True
+
+    def saveBuilds(self):
+        tmpfile = self.filename + ".tmp"
+
+        try:
+            fle = FileAccess.open(tmpfile, "w")
+            fle.write(json.dumps(self.builds, sort_keys=True))
+            fle.close()
+            FileAccess.replace(tmpfile, self.filename)
+        except:
+            self.log("Unable to save the build records", xbmc.LOGERROR)
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
+
+    def getDefinitionHash(self, channel, definitions, globalHandler, path=()):
+        if channel in definitions:
+            return definitions[channel]
+
+        chtype = CHANNEL_REGISTRY.getType(channel)
+
+        if chtype == 9999:
+            return ""
+
+        parts = [
+            CHANNEL_REGISTRY.getHash(channel),
+            globalHandler.getGlobalRulesSignature(channel, chtype),
+        ]
+
+        # Interleaved content ends up in this channel's playlist too
+        for source in self.channelList.getInterleaveSources(channel, globalHandler):
+            if (
+                source in path
+                or (channel, source) in self.channelList.blockedInterleaves
+            ):
+                continue
+
+            parts.append(
+                self.getDefinitionHash(
+                    source, definitions, globalHandler, path + (channel,)
+                )
+            )
+
+        definition = hashlib.md5("|".join(parts).encode("utf-8")).hexdigest()
+        definitions[channel] = definition
+        return definition
+
+    # Remember which definition the playlist of a channel was built from
+    def recordBuild(self, channel):
+        definition = self.getDefinitionHash(channel, {}, GlobalRulesHandler())
+
+        if self.builds is None:
+            self.loadBuilds()
+
+        self.builds[channel] = definition
+        self.saveBuilds()
+        ADDON_SETTINGS.setSetting(
+            "Channel_" + str(channel) + "_buildhash", definition
+        )
+
+    def plan(self, forceReset):
+        self.log("plan")
+        definitions = {}
+        globalHandler = GlobalRulesHandler()
+
+        for channel in CHANNEL_REGISTRY.getChannels():
+            self.getDefinitionHash(channel, definitions, globalHandler)
+
+        with ADDON_SETTINGS.transaction():
+            if self.loadBuilds() == False:
+                self.planWithoutRecords(definitions, forceReset)
+            else:
+                self.planFromRecords(definitions)
+
+        self.saveBuilds()
+
+    # Nothing to compare against yet, so fall back to the old behaviour
+    def planWithoutRecords(self, definitions, forceReset):
+        self.log("No build records")
+
+        for channel, definition in definitions.items():
+            if forceReset:
+                ADDON_SETTINGS.setSetting(
+                    "Channel_" + str(channel) + "_changed", "True"
+                )
+            elif FileAccess.exists(self.getPlaylistName(channel)):
+                self.builds[channel] = definition
+                ADDON_SETTINGS.setSetting(
+                    "Channel_" + str(channel) + "_buildhash", definition
+                )
+
+    def planFromRecords(self, definitions):
+        # Channel state as it was before any of it is moved around
+        stateTimes = {}
+        stateSeeds = {}
+        stateSlots = {}
+
+        for channel in definitions:
+            prefix = "Channel_" + str(channel)
+            stateTimes[channel] = ADDON_SETTINGS.getSetting(prefix + "_time")
+            stateSeeds[channel] = ADDON_SETTINGS.getSetting(prefix + "_seed")
+            stateSlots.setdefault(
+                ADDON_SETTINGS.getSetting(prefix + "_buildhash"), channel
+            )
+
+        for channel in list(self.builds.keys()):
+            if FileAccess.exists(self.getPlaylistName(channel)) == False:
+                del self.builds[channel]
+
+        kept = []
+        moves = []
+        rebuilds = []
+        claimed = set()
+
+        for channel in sorted(definitions.keys()):
+            if self.builds.get(channel) == definitions[channel]:
+                kept.append(channel)
+                continue
+
+            source = None
+
+            for slot, definition in self.builds.items():
+                if (
+                    definition == definitions[channel]
+                    and definitions.get(slot) != definition
+                    and slot not in claimed
+                ):
+                    source = slot
+                    break
+
+            if source is None:
+                rebuilds.append(channel)
+            else:
+                claimed.add(source)
+                moves.append((source, channel))
+
+        done = self.movePlaylists(moves)
+        rebuilds += [move[1] for move in moves if move not in done]
+        moves = done
+
+        for source, channel in moves:
+            definition = definitions[channel]
+            prefix = "Channel_" + str(channel)
+
+            # The state may still be in another slot if the settings were
+            # renumbered without it
+            if ADDON_SETTINGS.getSetting(prefix + "_buildhash") != definition:
+                slot = stateSlots.get(definition)
+                ADDON_SETTINGS.setSetting(
+                    prefix + "_time", stateTimes.get(slot, "0") or "0"
+                )
+                ADDON_SETTINGS.setSetting(prefix + "_seed", stateSeeds.get(slot, ""))
+
+        for channel in kept + [move[1] for move in moves]:
+            ADDON_SETTINGS.setSetting(
+                "Channel_" + str(channel) + "_buildhash", definitions[channel]
+            )
+
+        for channel in rebuilds:
+            self.builds.pop(channel, None)
+            ADDON_SETTINGS.setSetting("Channel_" + str(channel) + "_changed", "True")
+
+        self.log(
+            "Keeping "
+            + str(len(kept))
+            + " channels, moving "
+            + str(len(moves))
+            + ", rebuilding "
+            + str(len(rebuilds)),
+            xbmc.LOGINFO,
+        )
+
+    # Renames go through temporary names first, so playlists that swap
+    # numbers don't overwrite each other.  Returns the moves that worked.
+    def movePlaylists(self, moves):
+        staged = []
+
+        for source, channel in moves:
+            tmpfile = self.getPlaylistName(source) + ".move"
+
+            try:
+                FileAccess.rename(self.getPlaylistName(source), tmpfile)
+                staged.append((source, channel, self.builds.pop(source)))
+            except:
+                self.log(
+                    "Unable to move the playlist of channel " + str(source),
+                    xbmc.LOGERROR,
+                )
+
+        done = []
+
+        for source, channel, definition in staged:
+            tmpfile = self.getPlaylistName(source) + ".move"
+
+            try:
+                FileAccess.replace(tmpfile, self.getPlaylistName(channel))
+                self.builds[channel] = definition
+                done.append((source, channel))
+                self.log(
+                    "Moved the playlist of channel "
+                    + str(source)
+                    + " to channel "
+                    + str(channel)
+                )
+            except:
+                self.log(
+                    "Unable to move the playlist of channel " + str(source),
+                    xbmc.LOGERROR,
+                )
+
+        return done
@@ -455,20 +455,13 @@ class InterleaveChannel(BaseRule):
                 minint = maxint
                 maxint = v
 
-            if (
-                len(channelList.channels) < chan
-                or channelList.channels[chan - 1].isSetup == False
-            ):
-                if channelList.myOverlay.isMaster:
-                    channelList.setupChannel(chan, True, True, False)
-                else:
-                    channelList.setupChannel(chan, True, False, False)
-
-            if channelList.channels[chan - 1].Playlist.size() < 1:
+            source = channelList.getInterleaveSource(curchan, chan)
+
+            if source is None or source.Playlist.size() < 1:
                 self.log("The target channel is empty")
                 return filelist
 
-            realindex = random.randint(minint, maxint)
+            realindex = channelList.buildRandom.randint(minint, maxint)
             startindex = 0
             # Use more memory, but greatly speed up the process by just putting everything into a new list
             newfilelist = []
@@ -483,21 +476,19 @@ class InterleaveChannel(BaseRule):
                     startindex += 1
 
                 newstr = (
-                    str(channelList.channels[chan - 1].getItemDuration(startingep - 1))
+                    str(source.getItemDuration(startingep - 1))
                     + ","
-                    + channelList.channels[chan - 1].getItemTitle(startingep - 1)
-                )
-                newstr += "//" + channelList.channels[chan - 1].getItemEpisodeTitle(
-                    startingep - 1
+                    + source.getItemTitle(startingep - 1)
                 )
+                newstr += "//" + source.getItemEpisodeTitle(startingep - 1)
                 newstr += (
                     "//"
-                    + channelList.channels[chan - 1].getItemDescription(startingep - 1)
+                    + source.getItemDescription(startingep - 1)
                     + "\n"
-                    + channelList.channels[chan - 1].getItemFilename(startingep - 1)
+                    + source.getItemFilename(startingep - 1)
                 )
                 newfilelist.append(newstr)
-                realindex += random.randint(minint, maxint)
+                realindex += channelList.buildRandom.randint(minint, maxint)
                 startingep += 1
 
             while startindex < len(filelist):
@@ -0,0 +1,249 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import heapq
+import itertools
+import threading
+import time
+import traceback
+
+import Globals
+import xbmc
+
+# Callbacks run on a small pool so a slow one (SSH stats, weather lookups)
+# doesn't hold up the others.  Workers are only started when every existing
+# one is busy, and they stay around for the next task.
+MAX_WORKERS = 6
+SHUTDOWN_WAIT = 1.0
+
+NEW = 0
+PENDING = 1
+RUNNING = 2
+DONE = 3
+CANCELLED = 4
+
+
+# Runs every delayed callback of the overlay from one thread.  Due tasks are
+# kept in a heap and handed to the worker pool when they expire, so firing a
+# timer doesn't start a thread.  Tasks are named, and scheduling a task
+# replaces a pending one with the same name.
+class Scheduler:
+    def __init__(self, name="PTVScheduler"):
+        self.name = name
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.workReady = threading.Condition(self.lock)
+        self.finished = threading.Condition(self.lock)
+        self.heap = []
+        self.pending = {}
+        self.ready = collections.deque()
+        self.sequence = itertools.count()
+        self.thread = None
+        self.workers = []
+        self.idleWorkers = 0
+        self.stopping = False
+        self.tasksRun = 0
+        self.threadsStarted = 0
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("Scheduler: " + msg, level)
+
+    def schedule(self, timer):
+        with self.lock:
+            if self.stopping:
+                timer.state = CANCELLED
+                return
+
+            old = self.pending.get(timer.name)
+
+            if old is not None and old is not timer:
+                old.state = CANCELLED
+
+            timer.state = PENDING
+            timer.due = time.monotonic() + timer.interval
+            timer.sequence = next(self.sequence)
+            self.pending[timer.name] = timer
+            heapq.heappush(self.heap, (timer.due, timer.sequence, timer))
+
+            if self.thread is None:
+                self.thread = self.startThread(self.name, self.runLoop)
+
+            self.wakeup.notify()
+            self.finished.notify_all()
+
+    def cancel(self, timer):
+        with self.lock:
+            if timer.state != PENDING:
+                return
+
+            # The heap entry is skipped when it comes up
+            timer.state = CANCELLED
+
+            if self.pending.get(timer.name) is timer:
+                del self.pending[timer.name]
+
+            self.finished.notify_all()
+
+    def cancelName(self, name):
+        with self.lock:
+            timer = self.pending.get(name)
+
+        if timer is not None:
+            self.cancel(timer)
+
+    def join(self, timer, timeout=None):
+        # A callback waiting for a timer on the pool could wait forever
+        if threading.current_thread() in self.workers:
+            return
+
+        with self.lock:
+            self.finished.wait_for(
+                lambda: timer.state not in (PENDING, RUNNING), timeout
+            )
+
+    def isCurrent(self, timer):
+        return self.pending.get(timer.name) is timer and timer.state == PENDING
+
+    def startThread(self, name, target):
+        thread = threading.Thread(name=name, target=target)
+        thread.daemon = True
+        thread.start()
+        self.threadsStarted += 1
+        return thread
+
+    def runLoop(self):
+        with self.lock:
+            while self.stopping == False:
+                now = time.monotonic()
+
+                while len(self.heap) > 0 and self.heap[0][0] <= now:
+                    due, sequence, timer = heapq.heappop(self.heap)
+
+                    # Cancelled, replaced or restarted since it was queued
+                    if sequence != timer.sequence or self.isCurrent(timer) == False:
+                        continue
+
+                    del self.pending[timer.name]
+                    timer.state = RUNNING
+                    self.dispatch(timer)
+
+                if len(self.heap) > 0:
+                    self.wakeup.wait(self.heap[0][0] - now)
+                else:
+                    self.wakeup.wait()
+
+    # Called with the lock held
+    def dispatch(self, timer):
+        self.ready.append(timer)
+
+        if len(self.ready) > self.idleWorkers and len(self.workers) < MAX_WORKERS:
+            name = self.name + "Worker" + str(len(self.workers) + 1)
+            self.workers.append(self.startThread(name, self.runWorker))
+
+        self.workReady.notify()
+
+    def runWorker(self):
+        while True:
+            with self.lock:
+                while len(self.ready) == 0 and self.stopping == False:
+                    self.idleWorkers += 1
+                    self.workReady.wait()
+                    self.idleWorkers -= 1
+
+                if self.stopping:
+                    return
+
+                timer = self.ready.popleft()
+
+            try:
+                timer.function(*timer.args, **timer.kwargs)
+            except:
+                self.log("Task " + timer.name + " failed", xbmc.LOGERROR)
+                self.log(traceback.format_exc(), xbmc.LOGERROR)
+
+            with self.lock:
+                self.tasksRun += 1
+
+                # The callback may have started the same timer again
+                if timer.state == RUNNING:
+                    timer.state = DONE
+
+                self.finished.notify_all()
+
+    def getStats(self):
+        with self.lock:
+            return {
+                "tasks": self.tasksRun,
+                "threads": self.threadsStarted,
+                "pending": len(self.pending),
+            }
+
+    # Drop every pending task and stop the threads.  Callbacks that are
+    # running are left to finish on their own.
+    def shutdown(self):
+        with self.lock:
+            self.stopping = True
+
+            for timer in self.pending.values():
+                timer.state = CANCELLED
+
+            for timer in self.ready:
+                timer.state = CANCELLED
+
+            self.pending.clear()
+            self.heap = []
+            self.ready.clear()
+            self.wakeup.notify_all()
+            self.workReady.notify_all()
+            self.finished.notify_all()
+            thread = self.thread
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(SHUTDOWN_WAIT)
+
+
+# Drop-in for threading.Timer that runs on a Scheduler.  The name, which
+# defaults to the callback's name, is what pending tasks are coalesced by.
+class ScheduledTimer:
+    def __init__(self, scheduler, interval, function, args=None, kwargs=None):
+        self.scheduler = scheduler
+        self.interval = interval
+        self.function = function
+        self.args = args if args is not None else []
+        self.kwargs = kwargs if kwargs is not None else {}
+        self.name = getattr(function, "__name__", "Timer")
+        # Kept for callers written for threading.Timer, the pool is daemonic
+        self.daemon = True
+        self.state = NEW
+        self.due = 0
+        self.sequence = -1
+
+    def start(self):
+        self.scheduler.schedule(self)
+
+    def cancel(self):
+        self.scheduler.cancel(self)
+
+    def is_alive(self):
+        return self.state in (PENDING, RUNNING)
+
+    isAlive = is_alive
+
+    def join(self, timeout=None):
+        self.scheduler.join(self, timeout)
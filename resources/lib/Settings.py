@@ -16,11 +16,16 @@
 # You should have received a copy of the GNU General Public License
 # along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
 
+import contextlib
 import os
+import random
 import re
+import socket
 import sys
+import threading
 import time
 import traceback
+import weakref
 
 import Globals
 import xbmc
@@ -28,36 +33,169 @@ import xbmcaddon
 import xbmcvfs
 from FileAccess import FileAccess, FileLock
 
+# Seconds to gather setSetting calls before writing them out together
+SETTINGS_FLUSH_DELAY = 1.0
+SETTING_LINE = re.compile('setting id="(.*?)"[^\n]*? value="(.*?)"')
+# The generation and writer every write stamps the file with
+SETTINGS_STAMP = re.compile('<settings generation="(\\d+)" writer="(.*?)">')
+
 
 class Settings:
     def __init__(self):
         self.logfile = xbmcvfs.translatePath(
             os.path.join(Globals.SETTINGS_LOC, "settings2.xml")
         )
-        self.currentSettings = []
+        # Insertion ordered, so the file keeps its layout between writes
+        self.currentSettings = {}
         self.alwaysWrite = 1
+        self.isDirty = False
+        self.transactionDepth = 0
+        self.flushTimer = None
+        self.writeSemaphore = threading.BoundedSemaphore()
+        self.timerSemaphore = threading.BoundedSemaphore()
+        # (mtime, size) of settings2.xml when it was last read or written
+        self.fileSignature = None
+        # Bumped whenever the stored values change, and written to the file
+        # with the writer, so a rewrite the signature misses is still seen
+        self.generation = 0
+        self.writer = (
+            socket.gethostname()
+            + "-"
+            + str(os.getpid())
+            + "-"
+            + str(random.randint(1, 60000))
+        )
+        self.fileStamp = None
+        self.subscribers = []
 
     def loadSettings(self):
+        self.refresh(True)
+
+    # Re-read settings2.xml if it changed since it was last read or written.
+    # Returns the set of keys whose values changed.
+    def refresh(self, force=False):
+        # Don't throw away values that haven't reached the file yet
+        self.flush()
+        signature = self.getFileSignature()
+
+        # Within the share's time granularity, a rewrite of the same size
+        # keeps the signature, but not the stamp
+        if (
+            force == False
+            and signature is not None
+            and signature == self.fileSignature
+            and self.readStamp() == self.fileStamp
+        ):
+            return set()
+
         self.log("Loading settings from " + self.logfile)
-        del self.currentSettings[:]
 
-        if FileAccess.exists(self.logfile):
-            try:
-                fle = FileAccess.open(self.logfile, "r")
-                curset = fle.readlines()
-                fle.close()
-            except:
-                self.log("Exception when reading settings: ")
-                self.log(traceback.format_exc(), xbmc.LOGERROR)
+        # A file that is missing for a moment, can't be read or is cut short
+        # says nothing about the settings, so the loaded ones are kept
+        if signature is None or FileAccess.exists(self.logfile) == False:
+            self.log("No settings file, keeping the current settings")
+            return set()
+
+        try:
+            fle = FileAccess.open(self.logfile, "r")
+            content = "\n".join(fle.readlines())
+            fle.close()
+        except:
+            self.log("Exception when reading settings: ")
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
+            return set()
+
+        if "</settings>" not in content:
+            self.log("Incomplete settings file, keeping the current settings")
+            return set()
+
+        newsettings = dict(SETTING_LINE.findall(content))
+        self.fileStamp = self.parseStamp(content)
+
+        if self.fileStamp is not None:
+            self.generation = max(self.generation, int(self.fileStamp[0]))
+
+        changed = set()
+
+        for name, value in newsettings.items():
+            if self.currentSettings.get(name) != value:
+                self.currentSettings[name] = value
+                changed.add(name)
+
+        for name in list(self.currentSettings.keys()):
+            if name not in newsettings:
+                del self.currentSettings[name]
+                changed.add(name)
+
+        self.fileSignature = signature
+
+        if changed:
+            self.generation += 1
+            self.log(str(len(changed)) + " settings changed on disk")
+            self.notifySubscribers(changed)
+
+        return changed
+
+    def parseStamp(self, content):
+        match = SETTINGS_STAMP.search(content)
+
+        if match is None:
+            return None
+
+        return match.groups()
+
+    def readStamp(self):
+        try:
+            fle = FileAccess.open(self.logfile, "r")
+            header = fle.read(256)
+            fle.close()
+        except:
+            return None
+
+        if isinstance(header, bytes):
+            header = header.decode("utf-8", "ignore")
+
+        return self.parseStamp(header)
+
+    def getFileSignature(self):
+        try:
+            st = os.stat(self.logfile)
+            return (st.st_mtime_ns, st.st_size)
+        except:
+            return None
+
+    # Register a callback taking the set of changed setting names.  Only a
+    # weak reference is kept so short-lived objects can subscribe.  With
+    # local False, only changes read from the file are passed on, not the
+    # ones made through setSetting.
+    def subscribe(self, callback, local=True):
+        if hasattr(callback, "__self__"):
+            self.subscribers.append((weakref.WeakMethod(callback), local))
+        else:
+            self.subscribers.append((weakref.ref(callback), local))
+
+    def unsubscribe(self, callback):
+        self.subscribers = [
+            subscriber for subscriber in self.subscribers if subscriber[0]() != callback
+        ]
 
-            for line in curset:
-                name = re.search('setting id="(.*?)"', line)
+    def notifySubscribers(self, changed, local=False):
+        for subscriber in list(self.subscribers):
+            ref, wantsLocal = subscriber
+            callback = ref()
 
-                if name:
-                    val = re.search(' value="(.*?)"', line)
+            if callback is None:
+                self.subscribers.remove(subscriber)
+                continue
 
-                    if val:
-                        self.currentSettings.append([name.group(1), val.group(1)])
+            if local and wantsLocal == False:
+                continue
+
+            try:
+                callback(changed)
+            except:
+                self.log("Exception in settings subscriber", xbmc.LOGERROR)
+                self.log(traceback.format_exc(), xbmc.LOGERROR)
 
     def disableWriteOnSave(self):
         self.alwaysWrite = 0
@@ -67,7 +205,7 @@ class Settings:
 
     def getSetting(self, name, force=False):
         if force:
-            self.loadSettings()
+            self.refresh()
 
         result = self.getSettingNew(name)
 
@@ -77,11 +215,7 @@ class Settings:
         return result
 
     def getSettingNew(self, name):
-        for i in range(len(self.currentSettings)):
-            if self.currentSettings[i][0] == name:
-                return self.currentSettings[i][1]
-
-        return None
+        return self.currentSettings.get(name)
 
     def realGetSetting(self, name):
         try:
@@ -91,38 +225,100 @@ class Settings:
             return ""
 
     def setSetting(self, name, value):
-        found = False
+        if self.currentSettings.get(name) == value:
+            return
 
-        for i in range(len(self.currentSettings)):
-            if self.currentSettings[i][0] == name:
-                self.currentSettings[i][1] = value
-                found = True
-                break
+        self.currentSettings[name] = value
+        self.isDirty = True
+        self.generation += 1
 
-        if found == False:
-            self.currentSettings.append([name, value])
+        if self.alwaysWrite == 1 and self.transactionDepth == 0:
+            self.scheduleFlush()
 
-        if self.alwaysWrite == 1:
-            self.writeSettings()
+        self.notifySubscribers(set([name]), True)
+
+    # Group a batch of setSetting calls into a single write of the file
+    @contextlib.contextmanager
+    def transaction(self):
+        self.transactionDepth += 1
 
-    def writeSettings(self):
         try:
-            fle = FileAccess.open(self.logfile, "w")
-        except:
-            self.log("Unable to open the file for writing")
-            return
+            yield self
+        finally:
+            self.transactionDepth -= 1
+
+            if self.transactionDepth == 0 and self.alwaysWrite == 1:
+                self.flush()
+
+    def scheduleFlush(self):
+        self.timerSemaphore.acquire()
+
+        # A pending flush will pick up this value too
+        if self.flushTimer is None:
+            self.flushTimer = threading.Timer(SETTINGS_FLUSH_DELAY, self.flush)
+            self.flushTimer.name = "SettingsFlush"
+            self.flushTimer.start()
+
+        self.timerSemaphore.release()
+
+    def cancelFlush(self):
+        self.timerSemaphore.acquire()
 
-        flewrite = Globals.uni("<settings>\n")
+        if self.flushTimer is not None:
+            self.flushTimer.cancel()
+            self.flushTimer = None
 
-        for i in range(len(self.currentSettings)):
-            flewrite += (
+        self.timerSemaphore.release()
+
+    # Write out queued changes.  With write on save disabled, nothing is
+    # written until writeSettings is called directly.
+    def flush(self):
+        self.cancelFlush()
+
+        if self.isDirty and self.alwaysWrite == 1:
+            self.writeSettings()
+
+    def writeSettings(self):
+        self.writeSemaphore.acquire()
+        self.isDirty = False
+        stamp = (str(self.generation), self.writer)
+        lines = [
+            Globals.uni(
+                '<settings generation="' + stamp[0] + '" writer="' + stamp[1] + '">\n'
+            )
+        ]
+
+        for name, value in list(self.currentSettings.items()):
+            lines.append(
                 Globals.uni('    <setting id="')
-                + Globals.uni(self.currentSettings[i][0])
+                + Globals.uni(name)
                 + Globals.uni('" value="')
-                + Globals.uni(self.currentSettings[i][1])
+                + Globals.uni(value)
                 + Globals.uni('" />\n')
             )
 
-        flewrite += Globals.uni("</settings>\n")
-        fle.write(flewrite)
-        fle.close()
+        lines.append(Globals.uni("</settings>\n"))
+        # Write a temporary file and swap it in, so readers never see a partial file
+        tmpfile = self.logfile + ".tmp"
+
+        try:
+            fle = FileAccess.open(tmpfile, "w")
+        except:
+            self.log("Unable to open the file for writing")
+            self.isDirty = True
+            self.writeSemaphore.release()
+            return
+
+        try:
+            fle.write("".join(lines))
+            fle.close()
+            FileAccess.replace(tmpfile, self.logfile)
+            # Our own write shouldn't look like an outside change
+            self.fileSignature = self.getFileSignature()
+            self.fileStamp = stamp
+        except:
+            self.log("Unable to write the settings file", xbmc.LOGERROR)
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
+            self.isDirty = True
+
+        self.writeSemaphore.release()
@@ -117,7 +117,7 @@ class SidebarWindow(xbmcgui.WindowXMLDialog):
 
             # Set current show info
             if self.overlayWindow.Player.isPlaying():
-                position = xbmc.PlayList(xbmc.PLAYLIST_MUSIC).getposition()
+                position = self.overlayWindow.playlistWindow.getPosition()
                 showTitle = channel.getItemTitle(position)
                 episode = channel.getItemEpisodeTitle(position)
 
@@ -20,6 +20,8 @@ import os
 import xbmc
 import xbmcaddon
 import xbmcgui
+from ArtworkIndex import pickArt
+from Globals import ARTWORK_INDEX, JSON_RPC
 
 # Constants
 ADDON = xbmcaddon.Addon("script.paragontv")
@@ -157,40 +159,16 @@ class SpeedDialWindow(xbmcgui.WindowXMLDialog):
                 if os.path.exists(artPath):
                     return artPath
 
-        # Try to find in the library using JSON-RPC
+        # Try to find in the library
         try:
-            import json
+            # Priority order for artwork
+            art = pickArt(
+                ARTWORK_INDEX.getShowArt(showName, contains=True),
+                ("landscape", "fanart", "banner"),
+            )
 
-            json_query = {
-                "jsonrpc": "2.0",
-                "method": "VideoLibrary.GetTVShows",
-                "params": {
-                    "filter": {
-                        "field": "title",
-                        "operator": "contains",
-                        "value": showName,
-                    },
-                    "properties": ["art"],
-                },
-                "id": 1,
-            }
-            result = xbmc.executeJSONRPC(json.dumps(json_query))
-            result = json.loads(result)
-
-            if (
-                "result" in result
-                and "tvshows" in result["result"]
-                and result["result"]["tvshows"]
-            ):
-                show = result["result"]["tvshows"][0]
-                if "art" in show:
-                    # Priority order for artwork
-                    if "landscape" in show["art"]:
-                        return show["art"]["landscape"]
-                    elif "fanart" in show["art"]:
-                        return show["art"]["fanart"]
-                    elif "banner" in show["art"]:
-                        return show["art"]["banner"]
+            if art:
+                return art
 
         except Exception as e:
             self.log("Error searching library for show artwork: " + str(e))
@@ -399,8 +377,7 @@ class SpeedDialWindow(xbmcgui.WindowXMLDialog):
                 },
                 "id": 1,
             }
-            result = xbmc.executeJSONRPC(json.dumps(json_query))
-            result = json.loads(result)
+            result = JSON_RPC.request(json_query)
 
             if "result" in result and "tvshows" in result["result"]:
                 for show in result["result"]["tvshows"]:
@@ -0,0 +1,293 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import json
+import threading
+import time
+import traceback
+
+import Globals
+import xbmc
+from Scheduler import ScheduledTimer
+
+# Samples kept per host, at the idle interval that is about an hour of trend
+HISTORY = 12
+# Sampling interval while the host's page is up, and otherwise
+WATCHED_INTERVAL = 30.0
+IDLE_INTERVAL = 300.0
+# A page counts as up for this long after it last read the samples
+WATCH_TIMEOUT = 90.0
+# Changes smaller than this many points are no trend
+TREND_THRESHOLD = 5.0
+
+# Everything the Unraid page shows, gathered by one shell script on the
+# server and printed as one JSON document.  CPU time is sent as counters so
+# the usage can be taken over the time between two samples.
+SERVER_PROBE = r"""
+printf '{"time": %s, "disks": [' "$(date +%s)"
+df -hP 2>/dev/null | awk 'NR > 1 && $6 ~ /^\/mnt\/(disk|cache|user)/ {
+    printf "%s{\"device\": \"%s\", \"size\": \"%s\", \"used\": \"%s\", \"avail\": \"%s\", \"percent\": \"%s\", \"mount\": \"%s\"}", sep, $1, $2, $3, $4, $5, $6
+    sep = ", "
+}'
+printf '], "temps": {'
+sensors 2>/dev/null | awk '
+    /CPU Temp:|Tctl:/ && cpu == "" { cpu = $0 }
+    /Composite:/ && composite == "" { composite = $0 }
+    function celsius(line) { sub(/^[^+]*\+/, "", line); sub(/[^0-9.].*$/, "", line); return line }
+    END {
+        if (cpu != "") { printf "\"cpu\": \"%s\"", celsius(cpu); sep = ", " }
+        if (composite != "") printf "%s\"composite\": \"%s\"", sep, celsius(composite)
+    }'
+printf '}, '
+awk '{ printf "\"uptime\": %s, ", $1 }' /proc/uptime
+awk '{ printf "\"load\": [%s, %s, %s], ", $1, $2, $3 }' /proc/loadavg
+awk '/^cpu / { printf "\"cpu\": {\"busy\": %s, \"idle\": %s}, ", $2 + $3 + $4 + $7 + $8, $5 + $6 }' /proc/stat
+awk '/^MemTotal:/ { total = $2 } /^MemAvailable:/ { available = $2 }
+    END { printf "\"memory\": {\"total\": %s, \"available\": %s}", total, available }' /proc/meminfo
+printf '}\n'
+"""
+
+
+def celsiusToFahrenheit(value):
+    if not value:
+        return ""
+
+    return "%d°F" % int(float(value) * 9 / 5 + 32)
+
+
+def formatUptime(seconds):
+    minutes = int(seconds) // 60
+    days, minutes = divmod(minutes, 1440)
+    hours, minutes = divmod(minutes, 60)
+    uptime = "%d:%02d" % (hours, minutes)
+
+    if days > 0:
+        uptime = "%d day%s, %s" % (days, "s" if days != 1 else "", uptime)
+
+    return uptime
+
+
+def diskUsage(entry):
+    return {
+        "total": entry["size"],
+        "used": entry["used"],
+        "avail": entry["avail"],
+        "percent": entry["percent"].rstrip("%"),
+    }
+
+
+# Turn the output of SERVER_PROBE into the stats of the Unraid page.  The
+# previous stats give the CPU counters the usage is measured from, without
+# them it is the average since boot.
+def parseServerProbe(output, previous=None):
+    probe = json.loads(output)
+    disks = []
+    cache = {}
+    arrayTotal = {}
+
+    for entry in probe.get("disks", []):
+        mount = entry["mount"]
+
+        if mount.startswith("/mnt/disk") and entry["device"] != "tmpfs":
+            device = entry["device"]
+            number = "?"
+
+            # /dev/md1p1 and the like, or a plain /dev/sdb1
+            if "md" in device and "p" in device:
+                number = device.split("md")[1].split("p")[0]
+            elif "sd" in device:
+                number = device.split("sd")[1][0]
+
+            disks.append(dict(diskUsage(entry), name="Disk %s" % number))
+        elif mount.startswith("/mnt/cache"):
+            cache = diskUsage(entry)
+        elif mount == "/mnt/user":
+            arrayTotal = diskUsage(entry)
+
+    counters = probe.get("cpu", {})
+    busy = counters.get("busy", 0)
+    idle = counters.get("idle", 0)
+
+    if previous and previous.get("cpu_counters"):
+        busy -= previous["cpu_counters"]["busy"]
+        idle -= previous["cpu_counters"]["idle"]
+
+    cpuPercent = 100.0 * busy / (busy + idle) if busy + idle > 0 else 0.0
+    memory = probe.get("memory", {})
+    total = memory.get("total", 0)
+    ramPercent = 100.0 * (total - memory.get("available", 0)) / total if total else 0.0
+    temps = probe.get("temps", {})
+
+    return {
+        "disks": disks,
+        "cache": cache,
+        "cache_temp": celsiusToFahrenheit(temps.get("composite")),
+        "array_total": arrayTotal,
+        "cpu_temp": celsiusToFahrenheit(temps.get("cpu")),
+        "cpu_usage": "%.0f%%" % cpuPercent,
+        "ram_usage": "%.0f%%" % ramPercent,
+        "cpu_percent": cpuPercent,
+        "ram_percent": ramPercent,
+        "cpu_counters": counters,
+        "uptime": formatUptime(probe.get("uptime", 0)),
+        "load_avg": ", ".join("%.2f" % value for value in probe.get("load", [])),
+        "server_name": "DIVINITY",
+    }
+
+
+class StatsSource:
+    def __init__(self, name, collect, onSample):
+        self.name = name
+        self.collect = collect
+        self.onSample = onSample
+        self.samples = collections.deque(maxlen=HISTORY)
+        self.watched = 0
+        self.sampled = 0
+        self.isStarted = False
+        self.collecting = False
+        self.timer = None
+
+
+# Samples the stats of the servers shown on Channel 99 in the background.
+# Every host is asked once per sample, with one probe that returns all its
+# numbers.  A host is first sampled when its page is shown, then every
+# WATCHED_INTERVAL seconds while the page is up and every IDLE_INTERVAL
+# seconds after that.  The pages are drawn from the last samples in memory,
+# and the few before them give the trend.
+class StatsCollector:
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.sources = {}
+        self.collectorLock = threading.Lock()
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("StatsCollector: " + msg, level)
+
+    # collect is given the last sample and returns the next, None when the
+    # host couldn't be sampled.  onSample is called after every new sample.
+    def addSource(self, name, collect, onSample=None):
+        with self.collectorLock:
+            self.sources[name] = StatsSource(name, collect, onSample)
+
+    # The page of the source is up, sample it now if the last sample is from
+    # the idle schedule and keep sampling it often
+    def watch(self, name):
+        source = self.sources[name]
+
+        with self.collectorLock:
+            source.watched = time.time()
+
+            if source.collecting or (
+                source.isStarted and time.time() - source.sampled < WATCHED_INTERVAL
+            ):
+                return
+
+            source.isStarted = True
+
+        # Replaces the pending sample on the idle schedule
+        self.scheduleSample(source, 0)
+
+    def scheduleSample(self, source, delay):
+        source.timer = ScheduledTimer(self.scheduler, delay, self.sample, [source])
+        source.timer.name = "StatsCollector" + source.name
+        source.timer.start()
+
+    def sample(self, source):
+        with self.collectorLock:
+            if source.collecting:
+                return
+
+            source.collecting = True
+            previous = source.samples[-1] if len(source.samples) > 0 else None
+
+        start = time.time()
+        value = None
+
+        try:
+            value = source.collect(previous)
+        except:
+            self.log("Unable to sample " + source.name, xbmc.LOGERROR)
+            self.log(traceback.format_exc(), xbmc.LOGERROR)
+
+        with self.collectorLock:
+            source.collecting = False
+            source.sampled = time.time()
+
+            if value:
+                source.samples.append(value)
+
+            if time.time() - source.watched < WATCH_TIMEOUT:
+                interval = WATCHED_INTERVAL
+            else:
+                interval = IDLE_INTERVAL
+
+        self.log(
+            "Sampled "
+            + source.name
+            + " in "
+            + str(round(time.time() - start, 2))
+            + "s"
+            + ("" if value else ", no data")
+        )
+        self.scheduleSample(source, interval)
+
+        if value and source.onSample is not None:
+            try:
+                source.onSample()
+            except:
+                self.log("Unable to update " + source.name, xbmc.LOGERROR)
+                self.log(traceback.format_exc(), xbmc.LOGERROR)
+
+    # The last sample of the source, None until there is one
+    def latest(self, name):
+        with self.collectorLock:
+            samples = self.sources[name].samples
+            return samples[-1] if len(samples) > 0 else None
+
+    def history(self, name):
+        with self.collectorLock:
+            return list(self.sources[name].samples)
+
+    # Whether a number in the samples is going "up" or "down" compared to the
+    # average of the samples before the last, or stays "steady"
+    def trend(self, name, key):
+        values = [
+            sample[key] for sample in self.history(name) if key in sample
+        ]
+
+        if len(values) < 2:
+            return "steady"
+
+        average = sum(values[:-1]) / float(len(values) - 1)
+
+        if values[-1] - average > TREND_THRESHOLD:
+            return "up"
+
+        if average - values[-1] > TREND_THRESHOLD:
+            return "down"
+
+        return "steady"
+
+    def stop(self):
+        with self.collectorLock:
+            sources = list(self.sources.values())
+
+        for source in sources:
+            if source.timer is not None:
+                source.timer.cancel()
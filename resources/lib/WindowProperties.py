@@ -0,0 +1,153 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+
+import Globals
+import xbmc
+import xbmcgui
+from Scheduler import ScheduledTimer
+
+# Changes made within one tick go to Kodi together
+FLUSH_DELAY = 0.02
+REPORT_INTERVAL = 60.0
+
+
+# The properties the overlay sets on a window, home by default.  Setting a
+# property only queues it, and it is only queued when it differs from what
+# the window already has.  The queue is sent once per tick, so a page that
+# redraws everything on every rotation only costs the keys that changed.
+# Properties are assumed to be set through the store alone.
+class PropertyStore:
+    def __init__(self, scheduler, windowId=10000):
+        self.scheduler = scheduler
+        self.window = xbmcgui.Window(windowId)
+        self.sent = {}
+        self.queued = {}
+        self.flushTimer = None
+        self.isReporting = False
+        self.setCount = 0
+        self.skipCount = 0
+        self.storeLock = threading.Lock()
+        # Sends are kept in order with the flushes of other threads
+        self.flushLock = threading.Lock()
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("PropertyStore: " + msg, level)
+
+    # The value the window has, or will have after the next flush
+    def get(self, key):
+        with self.storeLock:
+            if key in self.queued:
+                return self.queued[key]
+
+            if key in self.sent:
+                return self.sent[key]
+
+        return self.window.getProperty(key)
+
+    def set(self, key, value):
+        with self.storeLock:
+            self.setCount += 1
+
+            if key in self.queued:
+                self.skipCount += 1
+            elif self.sent.get(key) == value:
+                self.skipCount += 1
+                return
+
+            self.queued[key] = value
+            flushTimer = None
+            startReport = self.isReporting == False
+            self.isReporting = True
+
+            if self.flushTimer is None:
+                flushTimer = ScheduledTimer(self.scheduler, FLUSH_DELAY, self.flush)
+                flushTimer.name = "PropertyStoreFlush"
+                self.flushTimer = flushTimer
+
+        if startReport:
+            reportTimer = ScheduledTimer(self.scheduler, REPORT_INTERVAL, self.report)
+            reportTimer.name = "PropertyStoreReport"
+            reportTimer.start()
+
+        if flushTimer is not None:
+            flushTimer.start()
+
+            # The scheduler is shutting down, nothing would send the queue
+            if flushTimer.is_alive() == False:
+                self.flush()
+
+    def clear(self, key):
+        self.set(key, "")
+
+    # Empty every property under the prefix that has a value
+    def clearPrefix(self, prefix):
+        with self.storeLock:
+            keys = [
+                key
+                for key, value in list(self.sent.items()) + list(self.queued.items())
+                if key.startswith(prefix) and value != ""
+            ]
+
+        for key in keys:
+            self.set(key, "")
+
+    def flush(self):
+        with self.flushLock:
+            with self.storeLock:
+                queued = self.queued
+                self.queued = {}
+                self.flushTimer = None
+
+            for key, value in queued.items():
+                if self.sent.get(key) == value:
+                    continue
+
+                if value == "":
+                    self.window.clearProperty(key)
+                else:
+                    self.window.setProperty(key, value)
+
+                with self.storeLock:
+                    self.sent[key] = value
+
+    # Log how many sets were saved, once a minute while properties change
+    def report(self):
+        with self.storeLock:
+            setCount = self.setCount
+            skipCount = self.skipCount
+            self.setCount = 0
+            self.skipCount = 0
+            self.isReporting = setCount > 0
+
+        if setCount == 0:
+            return
+
+        self.log(
+            "Sent "
+            + str(setCount - skipCount)
+            + " of "
+            + str(setCount)
+            + " properties in the last minute, "
+            + str(skipCount)
+            + " were unchanged or replaced before sending"
+        )
+        timer = ScheduledTimer(self.scheduler, REPORT_INTERVAL, self.report)
+        timer.name = "PropertyStoreReport"
+        timer.start()
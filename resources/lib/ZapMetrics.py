@@ -0,0 +1,129 @@
+#   Copyright (C) 2025 Aryez
+#
+#
+# This file is part of Paragon TV.
+#
+# Paragon TV is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Paragon TV is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Paragon TV.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import threading
+import time
+
+import Globals
+import xbmc
+
+# The phases of a channel change, in the order they happen
+PHASES = ("stop", "load", "play", "seek")
+# Channel changes the percentiles are taken over
+HISTORY = 200
+# Log the percentiles after this many channel changes
+REPORT_EVERY = 20
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[int(round(fraction * (len(ordered) - 1)))]
+
+
+# The timing of one channel change.  Each mark ends the phase that started
+# at the previous mark.
+class Zap:
+    def __init__(self, metrics, channel):
+        self.metrics = metrics
+        self.channel = channel
+        self.started = time.monotonic()
+        self.lastMark = self.started
+        self.phases = {}
+
+    def mark(self, phase):
+        now = time.monotonic()
+        self.phases[phase] = now - self.lastMark
+        self.lastMark = now
+
+    def finish(self):
+        self.metrics.record(self)
+
+
+# How long channel changes take, per phase.  The last HISTORY changes are
+# kept, and their p50 and p95 go to the log every REPORT_EVERY changes and
+# when the overlay closes.
+class ZapMetrics:
+    def __init__(self):
+        self.zaps = collections.deque(maxlen=HISTORY)
+        self.count = 0
+        self.metricsLock = threading.Lock()
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        Globals.log("ZapMetrics: " + msg, level)
+
+    def start(self, channel):
+        return Zap(self, channel)
+
+    def record(self, zap):
+        timing = dict(zap.phases, total=zap.lastMark - zap.started)
+
+        with self.metricsLock:
+            self.zaps.append(timing)
+            self.count += 1
+            report = self.count % REPORT_EVERY == 0
+
+        self.log(
+            "Channel "
+            + str(zap.channel)
+            + " in "
+            + self.formatTiming(timing)
+        )
+
+        if report:
+            self.logSummary()
+
+    def formatTiming(self, timing):
+        return ", ".join(
+            "%s %dms" % (phase, timing[phase] * 1000)
+            for phase in PHASES + ("total",)
+            if phase in timing
+        )
+
+    # The p50 and p95 of every phase and the total, in seconds
+    def getSummary(self):
+        with self.metricsLock:
+            zaps = list(self.zaps)
+
+        summary = {}
+
+        for phase in PHASES + ("total",):
+            values = [timing[phase] for timing in zaps if phase in timing]
+
+            if len(values) > 0:
+                summary[phase] = (percentile(values, 0.5), percentile(values, 0.95))
+
+        return summary
+
+    def logSummary(self):
+        summary = self.getSummary()
+
+        if len(summary) == 0:
+            return
+
+        self.log(
+            "Last "
+            + str(min(self.count, HISTORY))
+            + " channel changes, p50/p95: "
+            + ", ".join(
+                "%s %d/%dms" % (phase, summary[phase][0] * 1000, summary[phase][1] * 1000)
+                for phase in PHASES + ("total",)
+                if phase in summary
+            ),
+            xbmc.LOGINFO,
+        )
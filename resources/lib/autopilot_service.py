@@ -15,15 +15,108 @@ import shutil
 import subprocess
 from datetime import datetime
 import hashlib
+import json
 import time
 
+import cache_manifest
+import content_store
+import ssh_transport
+
 ADDON_ID = 'script.paragontv'
 REAL_SETTINGS = xbmcaddon.Addon(id=ADDON_ID)
 ADDON_NAME = REAL_SETTINGS.getAddonInfo('name')
 ADDON_PATH = REAL_SETTINGS.getAddonInfo('path')
 
+MASTER_DATA = '/storage/.kodi/userdata/addon_data/script.paragontv'
+MASTER_ADDON = '/storage/.kodi/addons/script.paragontv'
+
+# AutopilotSyncMethod: 0 rsync, 1 ssh, 2 http from the master's snapshot server
+SYNC_HTTP = 2
+
+
+class RemoteCacheSource:
+    """The master's cache folder, read over SSH"""
+
+    def __init__(self, master_ip, sync_method):
+        self.master_ip = master_ip
+        self.sync_method = sync_method
+        self.transport = ssh_transport.get_transport(master_ip)
+        self.remote_cache = MASTER_DATA + '/cache'
+        self.remote_manifest = MASTER_DATA + '/cache_manifest.json'
+        self.remote_script = MASTER_ADDON + '/resources/lib/cache_manifest.py'
+
+    def log(self, msg, level=xbmc.LOGDEBUG):
+        xbmc.log('[PTV Autopilot] {}'.format(msg), level)
+
+    def get_manifest(self):
+        """Have the master update its manifest and return it, in one round trip"""
+        result = self.transport.run(
+            'test -d {0} || exit 3; python3 {1} update {0} {2}'.format(
+                self.remote_cache, self.remote_script, self.remote_manifest))
+
+        if result.returncode == 3:
+            return None
+
+        if result.returncode == 0:
+            try:
+                return json.loads(result.output)
+            except ValueError:
+                pass
+
+        # The master can't run the manifest script, hash everything in one go
+        self.log("Manifest unavailable on master, hashing the cache instead")
+        result = self.transport.run(
+            'cd {} && find . -type f -exec md5sum {{}} +'.format(self.remote_cache))
+
+        if result.returncode != 0:
+            return None
+
+        manifest = cache_manifest.empty_manifest()
+
+        for line in result.output.splitlines():
+            if line:
+                checksum, rel_path = line.split('  ', 1)
+                manifest['files'][rel_path[2:]] = {'hash': checksum}
+
+        return manifest
+
+    def fetch_files(self, paths, dest_dir):
+        """Pull all the given files in a single transfer"""
+        file_list = '\n'.join(paths).encode('utf-8')
+
+        if self.sync_method == 0 and self.check_rsync_available():
+            self.transport.ensure_master()
+            cmd = ['rsync', '-az', '--timeout=30', '--files-from=-',
+                   '-e', self.transport.rsync_shell(),
+                   'root@{}:{}/'.format(self.master_ip, self.remote_cache), dest_dir]
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+            proc.communicate(file_list)
+            return proc.returncode == 0
+
+        proc = self.transport.popen('tar -C {} -czf - -T -'.format(self.remote_cache),
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        proc.stdin.write(file_list)
+        proc.stdin.close()
+
+        try:
+            written = cache_manifest.extract_pack(proc.stdout, dest_dir, paths)
+        finally:
+            proc.stdout.close()
+            proc.wait()
+
+        return proc.returncode == 0 and len(written) == len(paths)
+
+    def check_rsync_available(self):
+        """Check if rsync is available"""
+        try:
+            subprocess.call(['rsync', '--version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            return True
+        except:
+            return False
+
+
 class AutopilotService:
-    def __init__(self):
+    def __init__(self, cache_source=None):
         self.running = True
         self.master_ip = REAL_SETTINGS.getSetting('AutopilotMasterIP')
         self.sync_interval = int(REAL_SETTINGS.getSetting('AutopilotSyncInterval'))
@@ -32,12 +125,21 @@ class AutopilotService:
         self.local_path = xbmcvfs.translatePath('special://profile/addon_data/{}/'.format(ADDON_ID))
         self.local_cache = os.path.join(self.local_path, 'cache/')
         self.local_settings2 = os.path.join(self.local_path, 'settings2.xml')
+        self.local_manifest = os.path.join(self.local_path, 'cache_manifest.json')
+        self.transport = ssh_transport.get_transport(self.master_ip)
+        # Where the master's cache comes from, a local folder can stand in for it
+        self.cache_source = cache_source or RemoteCacheSource(self.master_ip, self.sync_method)
+        self.http_client = None
+
+        if self.sync_method == SYNC_HTTP:
+            port = REAL_SETTINGS.getSetting('SnapshotServerPort') or '8765'
+            self.http_client = content_store.SnapshotClient(
+                'http://{}:{}'.format(self.master_ip, port), self.local_path,
+                REAL_SETTINGS.getSetting('SnapshotServerToken'))
         
         # Track last known state
         self.settings2_checksum = None
-        self.cache_checksums = {}
         self.connected = False
-        self.initial_sync_done = False
         
         self.log("Autopilot Mode initialized - Master: {}".format(self.master_ip))
         self.update_status("Initializing")
@@ -55,10 +157,7 @@ class AutopilotService:
     def test_connection(self):
         """Test SSH connection to master"""
         try:
-            cmd = ['ssh', '-o', 'ConnectTimeout=5', '-o', 'BatchMode=yes', 
-                   'root@{}'.format(self.master_ip), 'echo "connected"']
-            result = subprocess.call(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            return result == 0
+            return self.transport.run('echo "connected"').returncode == 0
         except:
             return False
             
@@ -66,9 +165,8 @@ class AutopilotService:
         """Calculate MD5 checksum of file"""
         try:
             if filepath.startswith('root@'):  # Remote file
-                cmd = ['ssh', 'root@{}'.format(self.master_ip), 
-                       'md5sum {}'.format(filepath.split(':')[1])]
-                output = subprocess.check_output(cmd).strip()
+                result = self.transport.run('md5sum {}'.format(filepath.split(':')[1]))
+                output = result.output.strip() if result.returncode == 0 else None
                 return output.split()[0] if output else None
             else:  # Local file
                 with open(filepath, 'rb') as f:
@@ -79,18 +177,16 @@ class AutopilotService:
     def sync_settings2(self):
         """Sync settings2.xml if changed"""
         try:
-            remote_settings2 = 'root@{}:/storage/.kodi/userdata/addon_data/script.paragontv/settings2.xml'.format(
-                self.master_ip)
-            
-            # Check if remote file exists
-            check_cmd = ['ssh', 'root@{}'.format(self.master_ip), 
-                        'test -f /storage/.kodi/userdata/addon_data/script.paragontv/settings2.xml']
-            if subprocess.call(check_cmd) != 0:
+            remote_settings2 = MASTER_DATA + '/settings2.xml'
+
+            # Check if remote file exists and get its checksum in one go
+            result = self.transport.run('test -f {0} || exit 3; md5sum {0}'.format(remote_settings2))
+
+            if result.returncode == 3:
                 self.log("settings2.xml not found on master")
                 return False
-                
-            # Get remote checksum
-            remote_checksum = self.get_file_checksum(remote_settings2)
+
+            remote_checksum = result.output.split()[0] if result.returncode == 0 and result.output else None
             
             # Compare with local
             if remote_checksum and remote_checksum != self.settings2_checksum:
@@ -102,10 +198,7 @@ class AutopilotService:
                     shutil.copy2(self.local_settings2, backup_path)
                 
                 # Copy from master
-                scp_cmd = ['scp', '-o', 'ConnectTimeout=10',
-                          remote_settings2, self.local_settings2]
-                
-                if subprocess.call(scp_cmd) == 0:
+                if self.transport.fetch_file(remote_settings2, self.local_settings2):
                     self.settings2_checksum = remote_checksum
                     self.log("settings2.xml synced successfully")
                     
@@ -129,123 +222,50 @@ class AutopilotService:
             # Create local cache if needed
             if not os.path.exists(self.local_cache):
                 os.makedirs(self.local_cache)
-                
-            # Check if remote cache exists
-            check_cmd = ['ssh', 'root@{}'.format(self.master_ip), 
-                        'test -d /storage/.kodi/userdata/addon_data/script.paragontv/cache']
-            if subprocess.call(check_cmd) != 0:
+
+            # The master reports what its cache holds, only the differences travel
+            remote_manifest = self.cache_source.get_manifest()
+
+            if remote_manifest is None:
                 self.log("Cache folder not found on master")
                 return True  # Not an error
-                
-            # For initial sync or if no checksums, sync everything
-            if not self.initial_sync_done or not self.cache_checksums:
-                self.log("Performing full cache sync...")
-                
-                if self.sync_method == 0 and self.check_rsync_available():
-                    # Use rsync
-                    rsync_cmd = [
-                        'rsync', '-az', '--delete', '--timeout=30',
-                        'root@{}:/storage/.kodi/userdata/addon_data/script.paragontv/cache/'.format(self.master_ip),
-                        self.local_cache
-                    ]
-                    result = subprocess.call(rsync_cmd)
-                else:
-                    # Use SCP
-                    remote_cache = 'root@{}:/storage/.kodi/userdata/addon_data/script.paragontv/cache/*'.format(
-                        self.master_ip)
-                    scp_cmd = ['scp', '-r', '-o', 'ConnectTimeout=10',
-                              remote_cache, self.local_cache]
-                    result = subprocess.call(scp_cmd)
-                    
-                if result == 0:
-                    self.log("Cache folder synced successfully")
-                    self.initial_sync_done = True
-                    # Update checksums after sync
-                    self.update_cache_checksums()
-                    return True
-                else:
-                    self.log("Failed to sync cache folder", xbmc.LOGERROR)
-                    return False
-                    
-            else:
-                # Check for changes
-                changed_files = self.check_cache_changes()
-                if changed_files:
-                    self.log("Cache files changed: {}".format(len(changed_files)))
-                    for remote_file in changed_files:
-                        local_file = remote_file.replace(
-                            '/storage/.kodi/userdata/addon_data/script.paragontv/cache/',
-                            self.local_cache
-                        )
-                        
-                        # Ensure directory exists
-                        local_dir = os.path.dirname(local_file)
-                        if not os.path.exists(local_dir):
-                            os.makedirs(local_dir)
-                            
-                        # Copy file
-                        scp_cmd = ['scp', '-o', 'ConnectTimeout=10',
-                                  'root@{}:{}'.format(self.master_ip, remote_file),
-                                  local_file]
-                        subprocess.call(scp_cmd)
-                        
-                    # Update checksums
-                    self.update_cache_checksums()
-                    return True
-                else:
-                    self.log("Cache unchanged", xbmc.LOGDEBUG)
-                    return True
-                    
+
+            local_manifest = cache_manifest.load_manifest(self.local_manifest)
+            changed_files, removed_files = cache_manifest.diff_manifests(
+                local_manifest, remote_manifest)
+
+            # Files that went missing locally are fetched again too
+            for rel_path in remote_manifest['files']:
+                if rel_path not in changed_files and not os.path.exists(
+                        os.path.join(self.local_cache, rel_path)):
+                    changed_files.append(rel_path)
+
+            if not changed_files and not removed_files:
+                self.log("Cache unchanged", xbmc.LOGDEBUG)
+                return True
+
+            self.log("Cache files changed: {}, removed: {}".format(
+                len(changed_files), len(removed_files)))
+
+            if changed_files and not self.cache_source.fetch_files(changed_files, self.local_cache):
+                self.log("Failed to sync cache folder", xbmc.LOGERROR)
+                return False
+
+            for rel_path in removed_files:
+                try:
+                    os.remove(os.path.join(self.local_cache, rel_path))
+                except OSError:
+                    pass
+
+            cache_manifest.save_manifest(remote_manifest, self.local_manifest)
+            self.log("Cache folder synced to generation {}".format(
+                remote_manifest['generation']))
+            return True
+
         except Exception as e:
             self.log("Error syncing cache: {}".format(str(e)), xbmc.LOGERROR)
             return False
-            
-    def check_cache_changes(self):
-        """Check which cache files have changed"""
-        changed_files = []
-        try:
-            # Get list of remote cache files with checksums
-            cmd = ['ssh', 'root@{}'.format(self.master_ip),
-                   'find /storage/.kodi/userdata/addon_data/script.paragontv/cache -type f -exec md5sum {} \\;']
-            output = subprocess.check_output(cmd).strip()
-            
-            if output:
-                for line in output.split('\n'):
-                    if line:
-                        checksum, filepath = line.split('  ', 1)
-                        if filepath not in self.cache_checksums or self.cache_checksums[filepath] != checksum:
-                            changed_files.append(filepath)
-                            
-        except Exception as e:
-            self.log("Error checking cache changes: {}".format(str(e)), xbmc.LOGDEBUG)
-            
-        return changed_files
-        
-    def update_cache_checksums(self):
-        """Update stored checksums for cache files"""
-        try:
-            cmd = ['ssh', 'root@{}'.format(self.master_ip),
-                   'find /storage/.kodi/userdata/addon_data/script.paragontv/cache -type f -exec md5sum {} \\;']
-            output = subprocess.check_output(cmd).strip()
-            
-            self.cache_checksums = {}
-            if output:
-                for line in output.split('\n'):
-                    if line:
-                        checksum, filepath = line.split('  ', 1)
-                        self.cache_checksums[filepath] = checksum
-                        
-        except Exception as e:
-            self.log("Error updating cache checksums: {}".format(str(e)), xbmc.LOGDEBUG)
-            
-    def check_rsync_available(self):
-        """Check if rsync is available"""
-        try:
-            subprocess.call(['rsync', '--version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            return True
-        except:
-            return False
-            
+
     def check_force_reset(self):
         """Check if force reset is needed based on settings2.xml"""
         try:
@@ -262,9 +282,33 @@ class AutopilotService:
         except Exception as e:
             self.log("Error checking force reset: {}".format(str(e)), xbmc.LOGDEBUG)
             
+    def sync_http(self):
+        """Fetch the blobs that changed from the master's snapshot server"""
+        result = self.http_client.sync()
+
+        if result is None:
+            self.log("Snapshot server on master not reachable", xbmc.LOGWARNING)
+            return False
+
+        changed_files, removed_files = result
+
+        if changed_files or removed_files:
+            self.log("Snapshot synced, changed: {}, removed: {}".format(
+                len(changed_files), len(removed_files)))
+
+        if content_store.SETTINGS_NAME in changed_files:
+            self.check_force_reset()
+
+        return True
+
     def perform_sync(self):
         """Perform sync operation"""
         try:
+            if self.http_client:
+                self.connected = self.sync_http()
+                self.update_status("Connected" if self.connected else "Connection Failed")
+                return self.connected
+
             # Test connection
             if not self.test_connection():
                 self.connected = False
@@ -348,6 +392,7 @@ class AutopilotService:
     def stop(self):
         """Stop the service"""
         self.running = False
+        ssh_transport.close_all()
         self.update_status("Stopped")
         self.log("Autopilot service stopped", xbmc.LOGINFO)
 
@@ -365,16 +410,13 @@ class AutopilotTester:
         
         if service.test_connection():
             try:
-                # Check for settings2.xml
-                cmd = ['ssh', 'root@{}'.format(self.master_ip),
-                       'test -f /storage/.kodi/userdata/addon_data/script.paragontv/settings2.xml && echo "exists"']
-                result = subprocess.check_output(cmd).strip()
-                
-                if result == "exists":
-                    # Get channel count
-                    cmd = ['ssh', 'root@{}'.format(self.master_ip),
-                           'grep -c "Setting id=\\"Channel_.*_type\\"" /storage/.kodi/userdata/addon_data/script.paragontv/settings2.xml || echo "0"']
-                    channels = subprocess.check_output(cmd).strip()
+                # Check for settings2.xml and get the channel count in one round trip
+                exists, channels = service.transport.run_batch([
+                    'test -f {}/settings2.xml && echo "exists"'.format(MASTER_DATA),
+                    'grep -c "Setting id=\\"Channel_.*_type\\"" {}/settings2.xml || echo "0"'.format(MASTER_DATA)])
+                channels = channels.output.strip()
+
+                if exists.output.strip() == "exists":
                     
                     message = "Connected! Master has {} channels configured".format(channels)
                 else:
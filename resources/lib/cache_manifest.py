@@ -0,0 +1,222 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Paragon TV Cache Manifest
+Keeps a manifest of the cache folder so slaves can tell what changed on the
+master without hashing every file over SSH.
+
+Every file is listed with its size, mtime, MD5 hash and the generation it
+last changed in.  Updating the manifest only hashes files whose size or
+mtime changed since the last update.
+
+Run on the master (slaves do this over SSH):
+    python3 cache_manifest.py update <cache folder> <manifest file>
+prints the updated manifest.
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tarfile
+
+
+def empty_manifest():
+    return {"generation": 0, "files": {}}
+
+
+def load_manifest(manifest_path):
+    """Load a manifest, or an empty one if there is none yet"""
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+
+        if "files" in manifest and "generation" in manifest:
+            return manifest
+    except:
+        pass
+
+    return empty_manifest()
+
+
+def save_manifest(manifest, manifest_path):
+    """Write the manifest atomically"""
+    tmp_path = manifest_path + ".tmp"
+
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, sort_keys=True)
+
+    os.replace(tmp_path, manifest_path)
+
+
+def file_hash(path):
+    md5 = hashlib.md5()
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            md5.update(chunk)
+
+    return md5.hexdigest()
+
+
+def scan_files(cache_dir):
+    """List the cache files as paths relative to the cache folder"""
+    for root, dirs, files in os.walk(cache_dir):
+        dirs.sort()
+
+        for name in sorted(files):
+            if name.endswith(".tmp"):
+                continue
+
+            full_path = os.path.join(root, name)
+            yield os.path.relpath(full_path, cache_dir).replace(os.sep, "/"), full_path
+
+
+def update_manifest(cache_dir, manifest_path):
+    """Bring the manifest up to date with the cache folder and return it"""
+    manifest = load_manifest(manifest_path)
+    old_files = manifest["files"]
+    generation = manifest["generation"] + 1
+    files = {}
+    changed = False
+
+    for rel_path, full_path in scan_files(cache_dir):
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            continue
+
+        entry = old_files.get(rel_path)
+
+        if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+            files[rel_path] = entry
+            continue
+
+        checksum = file_hash(full_path)
+
+        if entry and entry["hash"] == checksum:
+            # Touched but not changed
+            entry = dict(entry, size=st.st_size, mtime=st.st_mtime)
+        else:
+            entry = {
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+                "hash": checksum,
+                "generation": generation,
+            }
+            changed = True
+
+        files[rel_path] = entry
+
+    if set(old_files) - set(files):
+        changed = True
+
+    if changed:
+        manifest["generation"] = generation
+
+    if files != old_files or not os.path.exists(manifest_path):
+        manifest["files"] = files
+        save_manifest(manifest, manifest_path)
+
+    return manifest
+
+
+def diff_manifests(local, remote):
+    """Return the files to fetch and the files to remove to go from local to remote"""
+    local_files = local["files"]
+    changed = [
+        rel_path
+        for rel_path, entry in sorted(remote["files"].items())
+        if local_files.get(rel_path, {}).get("hash") != entry["hash"]
+    ]
+    removed = [
+        rel_path for rel_path in sorted(local_files) if rel_path not in remote["files"]
+    ]
+    return changed, removed
+
+
+def write_pack(cache_dir, paths, fileobj):
+    """Write the given cache files to fileobj as one compressed tar stream"""
+    tar = tarfile.open(fileobj=fileobj, mode="w|gz")
+
+    for rel_path in paths:
+        full_path = os.path.join(cache_dir, rel_path)
+
+        if os.path.isfile(full_path):
+            tar.add(full_path, arcname=rel_path, recursive=False)
+
+    tar.close()
+
+
+def extract_pack(fileobj, cache_dir, paths):
+    """
+    Unpack a tar stream of cache files into cache_dir.  Only the requested
+    paths are accepted, and each file replaces the old one in one rename.
+    Returns the paths that were written.
+    """
+    wanted = set(paths)
+    written = []
+    tar = tarfile.open(fileobj=fileobj, mode="r|*")
+
+    for member in tar:
+        rel_path = member.name
+
+        if rel_path.startswith("./"):
+            rel_path = rel_path[2:]
+
+        if not member.isfile() or rel_path not in wanted:
+            continue
+
+        target = os.path.join(cache_dir, *rel_path.split("/"))
+        target_dir = os.path.dirname(target)
+
+        if not os.path.exists(target_dir):
+            os.makedirs(target_dir)
+
+        tmp_path = target + ".tmp"
+        source = tar.extractfile(member)
+
+        with open(tmp_path, "wb") as f:
+            shutil.copyfileobj(source, f)
+
+        os.replace(tmp_path, target)
+        written.append(rel_path)
+
+    tar.close()
+    return written
+
+
+class LocalCacheSource:
+    """
+    A master cache in a local folder.  Behaves like the SSH source in the
+    autopilot service, so a sync can be run against a plain directory.
+    """
+
+    def __init__(self, cache_dir, manifest_path):
+        self.cache_dir = cache_dir
+        self.manifest_path = manifest_path
+
+    def get_manifest(self):
+        if not os.path.isdir(self.cache_dir):
+            return None
+
+        return update_manifest(self.cache_dir, self.manifest_path)
+
+    def fetch_files(self, paths, dest_dir):
+        stream = io.BytesIO()
+        write_pack(self.cache_dir, paths, stream)
+        stream.seek(0)
+        return len(extract_pack(stream, dest_dir, paths)) == len(paths)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "update":
+        manifest = update_manifest(sys.argv[2], sys.argv[3])
+        sys.stdout.write(json.dumps(manifest, sort_keys=True))
+    else:
+        sys.stderr.write(
+            "usage: cache_manifest.py update <cache folder> <manifest file>\n"
+        )
+        sys.exit(2)
@@ -0,0 +1,550 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Paragon TV Content Store
+Content addressed distribution of the master's cache and settings2.xml over
+plain HTTP.
+
+The master keeps every file it shares as a blob named after its MD5 hash,
+plus one manifest per generation mapping the file names to blobs.  A blob
+is written once and shared by every generation that contains it, so a
+regeneration that changes 5 channels adds 5 blobs.  A small HTTP server
+hands out the current manifest and the blobs:
+
+    GET /manifest.json      the current manifest, with an ETag per generation
+    GET /blobs/<hash>       one blob, immutable, with Range support
+
+Slaves ask for the manifest with If-None-Match, then download only the
+blobs they don't have, resuming partial downloads with Range requests.
+Every request has to carry the token shared by the master and its slaves
+in the X-PTV-Token header, anything else gets a 403.
+
+The module doesn't need Kodi, a master and a slave can both be run against
+local folders, with the token in PTV_SNAPSHOT_TOKEN:
+    python3 content_store.py serve <addon data> <store> <address> <port>
+    python3 content_store.py fetch <url> <addon data>
+"""
+
+import hmac
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+import cache_manifest
+
+# Generations whose manifests are kept, older blobs are removed once no
+# kept manifest refers to them
+STORE_KEEP = 3
+HTTP_TIMEOUT = 10
+CHUNK_SIZE = 65536
+
+SETTINGS_NAME = "settings2.xml"
+TOKEN_HEADER = "X-PTV-Token"
+BLOB_NAME = re.compile(r"^[0-9a-f]{32}$")
+
+
+def write_json(data, path):
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, sort_keys=True)
+
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+class ContentStore:
+    """Blobs by hash plus the manifest of every kept generation"""
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.blobs_dir = os.path.join(store_dir, "blobs")
+        self.manifests_dir = os.path.join(store_dir, "manifests")
+        self.current_path = os.path.join(store_dir, "current.json")
+        self.lock = threading.Lock()
+
+        for path in (self.blobs_dir, self.manifests_dir):
+            if not os.path.isdir(path):
+                os.makedirs(path)
+
+    def blob_path(self, checksum):
+        return os.path.join(self.blobs_dir, checksum)
+
+    def current_manifest(self):
+        return read_json(self.current_path)
+
+    def publish(self, base_dir, files):
+        """
+        Publish the given files (relative to base_dir, with their hash and
+        size) as a new generation.  Only blobs the store doesn't have yet are
+        copied.  Returns the current manifest, a new one only if something
+        changed.
+        """
+        with self.lock:
+            current = self.current_manifest()
+
+            if current is not None and current["files"] == files:
+                return current
+
+            copied = 0
+
+            for rel_path, entry in files.items():
+                target = self.blob_path(entry["hash"])
+
+                if os.path.exists(target):
+                    continue
+
+                tmp_path = target + ".tmp"
+                shutil.copyfile(os.path.join(base_dir, *rel_path.split("/")), tmp_path)
+
+                # The file may have changed since it was hashed
+                if cache_manifest.file_hash(tmp_path) != entry["hash"]:
+                    os.remove(tmp_path)
+                    raise IOError("{} changed while publishing".format(rel_path))
+
+                os.replace(tmp_path, target)
+                copied += 1
+
+            generation = (current or {}).get("generation", 0) + 1
+            manifest = {"generation": generation, "files": files, "copied": copied}
+            write_json(manifest, os.path.join(self.manifests_dir, "{}.json".format(generation)))
+            write_json(manifest, self.current_path)
+            self.prune(generation)
+            return manifest
+
+    def prune(self, generation):
+        referenced = set()
+
+        for name in os.listdir(self.manifests_dir):
+            try:
+                gen = int(name.split(".")[0])
+            except ValueError:
+                continue
+
+            path = os.path.join(self.manifests_dir, name)
+
+            if gen <= generation - STORE_KEEP:
+                os.remove(path)
+                continue
+
+            manifest = read_json(path)
+
+            if manifest is not None:
+                referenced.update(entry["hash"] for entry in manifest["files"].values())
+
+        for name in os.listdir(self.blobs_dir):
+            if name not in referenced:
+                os.remove(os.path.join(self.blobs_dir, name))
+
+
+class SnapshotPublisher:
+    """Keeps the store in step with the master's cache folder and settings2.xml"""
+
+    def __init__(self, addon_data, store):
+        self.addon_data = addon_data
+        self.store = store
+        self.cache_dir = os.path.join(addon_data, "cache")
+        self.manifest_path = os.path.join(addon_data, "cache_manifest.json")
+        self.settings_path = os.path.join(addon_data, SETTINGS_NAME)
+        self.settings_entry = None
+
+    def get_settings_entry(self):
+        try:
+            st = os.stat(self.settings_path)
+        except OSError:
+            return None
+
+        entry = self.settings_entry
+
+        if entry is None or entry["size"] != st.st_size or entry["mtime"] != st.st_mtime:
+            entry = {
+                "hash": cache_manifest.file_hash(self.settings_path),
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+            }
+            self.settings_entry = entry
+
+        return entry
+
+    def publish(self):
+        """Publish a new generation if anything changed, returns the current manifest"""
+        files = {}
+
+        if os.path.isdir(self.cache_dir):
+            manifest = cache_manifest.update_manifest(self.cache_dir, self.manifest_path)
+
+            for rel_path, entry in manifest["files"].items():
+                files["cache/" + rel_path] = {"hash": entry["hash"], "size": entry["size"]}
+
+        entry = self.get_settings_entry()
+
+        if entry is not None:
+            files[SETTINGS_NAME] = {"hash": entry["hash"], "size": entry["size"]}
+
+        return self.store.publish(self.addon_data, files)
+
+
+class SnapshotRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        self.server.log_function(format % args)
+
+    def do_HEAD(self):
+        self.handle_request(False)
+
+    def do_GET(self):
+        self.handle_request(True)
+
+    def authorized(self):
+        token = self.headers.get(TOKEN_HEADER) or ""
+        return hmac.compare_digest(token.encode("utf-8"), self.server.token.encode("utf-8"))
+
+    def handle_request(self, send_body):
+        store = self.server.store
+        path = self.path.split("?")[0]
+
+        if not self.authorized():
+            self.send_error(403)
+            return
+
+        if path == "/manifest.json":
+            manifest = store.current_manifest()
+
+            if manifest is None:
+                self.send_error(404)
+                return
+
+            body = json.dumps(manifest, sort_keys=True).encode("utf-8")
+            etag = '"gen-{}"'.format(manifest["generation"])
+            self.send_content(body, etag, "application/json", "no-cache", send_body)
+        elif path.startswith("/blobs/") and BLOB_NAME.match(path[7:]):
+            checksum = path[7:]
+
+            try:
+                with open(store.blob_path(checksum), "rb") as f:
+                    body = f.read()
+            except (IOError, OSError):
+                self.send_error(404)
+                return
+
+            self.send_content(body, '"{}"'.format(checksum), "application/octet-stream",
+                              "public, max-age=31536000, immutable", send_body)
+        else:
+            self.send_error(404)
+
+    def send_content(self, body, etag, content_type, cache_control, send_body):
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        status = 200
+        start = 0
+        end = len(body) - 1
+        content_range = None
+        requested = self.headers.get("Range")
+
+        if requested is not None:
+            match = re.match(r"^bytes=(\d+)-(\d*)$", requested.strip())
+
+            if match is None or int(match.group(1)) >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", "bytes */{}".format(len(body)))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            start = int(match.group(1))
+
+            if match.group(2):
+                end = min(end, int(match.group(2)))
+
+            status = 206
+            content_range = "bytes {}-{}/{}".format(start, end, len(body))
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", etag)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Cache-Control", cache_control)
+
+        if content_range is not None:
+            self.send_header("Content-Range", content_range)
+
+        self.end_headers()
+
+        if send_body:
+            self.wfile.write(body[start:end + 1])
+
+
+class SnapshotServer:
+    """
+    The tiny HTTP server that hands out the store, in a background thread.
+    Only listens on the given address and only answers requests carrying
+    the token.
+    """
+
+    def __init__(self, store, host, port, token, log_function=None):
+        if not token:
+            raise ValueError("the snapshot server needs a token")
+
+        self.httpd = ThreadingHTTPServer((host, port), SnapshotRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.store = store
+        self.httpd.token = token
+        self.httpd.log_function = log_function or (lambda msg: None)
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="PTV-SnapshotServer")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+        if self.thread is not None:
+            self.thread.join(5)
+
+
+class SnapshotClient:
+    """
+    Mirrors the master's published files into a local folder.  Keeps the
+    manifest it last applied, so it knows which files it already has.
+    """
+
+    def __init__(self, base_url, dest_dir, token, state_path=None, timeout=HTTP_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.dest_dir = dest_dir
+        self.state_path = state_path or os.path.join(dest_dir, "snapshot_state.json")
+        self.partial_dir = os.path.join(dest_dir, ".blobs")
+        self.timeout = timeout
+        self.state = read_json(self.state_path) or {"etag": None, "files": {}}
+
+    def local_path(self, rel_path):
+        return os.path.join(self.dest_dir, *rel_path.split("/"))
+
+    def request(self, path):
+        return Request(self.base_url + path, headers={TOKEN_HEADER: self.token})
+
+    def get_manifest(self):
+        """
+        The master's manifest and its ETag.  The local manifest if it didn't
+        change, None if the master can't be reached.
+        """
+        request = self.request("/manifest.json")
+
+        if self.state["etag"]:
+            request.add_header("If-None-Match", self.state["etag"])
+
+        try:
+            response = urlopen(request, timeout=self.timeout)
+        except HTTPError as e:
+            if e.code == 304:
+                return {"files": self.state["files"]}, self.state["etag"]
+
+            return None, None
+        except (URLError, IOError, OSError):
+            return None, None
+
+        with response:
+            try:
+                manifest = json.loads(response.read().decode("utf-8"))
+            except ValueError:
+                return None, None
+
+            return manifest, response.headers.get("ETag")
+
+    def stage_local(self, checksum, source):
+        """Use a file that is already here instead of downloading its blob"""
+        if not os.path.isdir(self.partial_dir):
+            os.makedirs(self.partial_dir)
+
+        shutil.copyfile(source, os.path.join(self.partial_dir, checksum + ".part"))
+
+    def fetch_blob(self, checksum, size, part_path, offset):
+        """Download a blob into part_path from offset on"""
+        if offset > 0 and offset >= size:
+            return
+
+        request = self.request("/blobs/" + checksum)
+
+        if offset > 0:
+            request.add_header("Range", "bytes={}-".format(offset))
+
+        try:
+            response = urlopen(request, timeout=self.timeout)
+        except HTTPError as e:
+            if e.code == 416:
+                return
+
+            raise
+
+        with response:
+            # A server that ignored the range sends the whole blob
+            mode = "ab" if offset > 0 and response.status == 206 else "wb"
+
+            with open(part_path, mode) as f:
+                shutil.copyfileobj(response, f, CHUNK_SIZE)
+
+    def download_blob(self, checksum, size):
+        """
+        Download a blob into the partial folder, resuming what is there.  A
+        partial download or staged local copy that doesn't verify is thrown
+        away and the whole blob downloaded again.
+        """
+        if not os.path.isdir(self.partial_dir):
+            os.makedirs(self.partial_dir)
+
+        part_path = os.path.join(self.partial_dir, checksum + ".part")
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+        if offset > 0:
+            self.fetch_blob(checksum, size, part_path, offset)
+
+            if cache_manifest.file_hash(part_path) == checksum:
+                return part_path
+
+            os.remove(part_path)
+
+        self.fetch_blob(checksum, size, part_path, 0)
+
+        if cache_manifest.file_hash(part_path) != checksum:
+            os.remove(part_path)
+            raise IOError("blob {} failed verification".format(checksum))
+
+        return part_path
+
+    def install(self, source, rel_path):
+        target = self.local_path(rel_path)
+        target_dir = os.path.dirname(target)
+
+        if not os.path.isdir(target_dir):
+            os.makedirs(target_dir)
+
+        tmp_path = target + ".tmp"
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+
+    def sync(self):
+        """
+        Bring the local folder up to date.  Returns the changed and removed
+        paths, or None if the master couldn't be reached or a download failed.
+        """
+        manifest, etag = self.get_manifest()
+
+        if manifest is None:
+            return None
+
+        local_files = self.state["files"]
+        remote_files = manifest["files"]
+        # Blobs needed, with every path that gets them
+        needed = {}
+        # Blobs already here under some path
+        present = {}
+
+        for rel_path, entry in local_files.items():
+            if os.path.exists(self.local_path(rel_path)):
+                present.setdefault(entry["hash"], rel_path)
+
+        for rel_path, entry in sorted(remote_files.items()):
+            local = local_files.get(rel_path)
+
+            if local is None or local["hash"] != entry["hash"] or not os.path.exists(
+                    self.local_path(rel_path)):
+                needed.setdefault(entry["hash"], (entry["size"], []))[1].append(rel_path)
+
+        changed = []
+
+        try:
+            # Stage every blob first, a local file may be the source of one
+            # blob and the target of another when channels swap
+            sources = {}
+
+            for checksum, (size, rel_paths) in sorted(needed.items()):
+                if checksum in present:
+                    self.stage_local(checksum, self.local_path(present[checksum]))
+
+                sources[checksum] = self.download_blob(checksum, size)
+
+            for checksum, (size, rel_paths) in sorted(needed.items()):
+                for rel_path in rel_paths:
+                    self.install(sources[checksum], rel_path)
+                    changed.append(rel_path)
+
+                os.remove(sources[checksum])
+        except (HTTPError, URLError, IOError, OSError):
+            return None
+
+        removed = [rel_path for rel_path in sorted(local_files) if rel_path not in remote_files]
+
+        for rel_path in removed:
+            try:
+                os.remove(self.local_path(rel_path))
+            except OSError:
+                pass
+
+        self.state = {"etag": etag, "files": remote_files}
+        write_json(self.state, self.state_path)
+        return sorted(changed), removed
+
+
+def serve(addon_data, store_dir, host, port, token, interval=15):
+    store = ContentStore(store_dir)
+    publisher = SnapshotPublisher(addon_data, store)
+    server = SnapshotServer(store, host, port, token, log_function=sys.stderr.write)
+    server.start()
+
+    try:
+        while True:
+            manifest = publisher.publish()
+            sys.stderr.write("generation {}\n".format(manifest["generation"]))
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    token = os.environ.get("PTV_SNAPSHOT_TOKEN", "")
+
+    if len(sys.argv) == 6 and sys.argv[1] == "serve":
+        serve(sys.argv[2], sys.argv[3], sys.argv[4], int(sys.argv[5]), token)
+    elif len(sys.argv) == 4 and sys.argv[1] == "fetch":
+        result = SnapshotClient(sys.argv[2], sys.argv[3], token).sync()
+
+        if result is None:
+            sys.stderr.write("sync failed\n")
+            sys.exit(1)
+
+        sys.stdout.write("changed {}, removed {}\n".format(len(result[0]), len(result[1])))
+    else:
+        sys.stderr.write(
+            "usage: content_store.py serve <addon data> <store> <address> <port>\n"
+            "       content_store.py fetch <url> <addon data>\n"
+        )
+        sys.exit(2)
@@ -2,20 +2,30 @@
 # -*- coding: utf-8 -*-
 """
 Paragon TV Push to Slaves - Standalone script for pushing after rebuild
-Modified to delete existing settings2.xml and cache folder before copying
+Pushes settings2.xml and the changed cache files to every slave at once
 """
 
+import json
 import os
 import sys
+import shlex
 import subprocess
+import threading
+import time
 import xbmc
 import xbmcaddon
 import xbmcgui
 import xbmcvfs
 
+import cache_manifest
+import ssh_transport
+
 ADDON_ID = 'script.paragontv'
 ADDON = xbmcaddon.Addon(ADDON_ID)
 
+REMOTE_BASE = '/storage/.kodi/userdata/addon_data/script.paragontv'
+MANIFEST_NAME = 'cache_manifest.json'
+
 def log(msg, level=xbmc.LOGDEBUG):
     xbmc.log("[PTV Push to Slaves] " + str(msg), level)
 
@@ -23,127 +33,177 @@ def notify(msg, title="PTV Push"):
     icon = ADDON.getAddonInfo('icon')
     xbmc.executebuiltin("Notification({}, {}, 5000, {})".format(title, msg, icon))
 
+def get_slave_manifest(slave_ip):
+    """Fetch the manifest of what the slave has, None if it can't be reached"""
+    result = ssh_transport.get_transport(slave_ip).run(
+        'cat {}/{} 2>/dev/null; exit 0'.format(REMOTE_BASE, MANIFEST_NAME))
+
+    if result.returncode != 0:
+        return None
+
+    try:
+        manifest = json.loads(result.output)
+
+        if 'files' in manifest:
+            return manifest
+    except ValueError:
+        pass
+
+    # Nothing pushed yet, or an unreadable manifest: send everything
+    return cache_manifest.empty_manifest()
+
+def build_install_script(removed_files, full_push):
+    """
+    Shell script run on the slave.  The new cache is assembled next to the
+    old one from a copy plus the pushed files, and only swapped in once it
+    is complete.  A full push starts from an empty cache instead.
+    """
+    removals = ''.join(
+        ' && rm -f {}'.format(shlex.quote('.push/cache/' + rel_path)) for rel_path in removed_files)
+
+    if full_push:
+        prepare = 'mkdir .push/cache'
+    else:
+        prepare = 'if [ -d cache ]; then cp -a cache .push/cache; else mkdir .push/cache; fi'
+
+    return (
+        'cd {base} && rm -rf .push && mkdir .push'
+        ' && {prepare}'
+        ' && tar -C .push -xzf -{removals}'
+        ' && rm -rf cache.old && if [ -d cache ]; then mv cache cache.old; fi'
+        ' && mv .push/cache cache'
+        ' && mv .push/settings2.xml settings2.xml'
+        ' && mv .push/{manifest} {manifest}'
+        ' && rm -rf cache.old .push'
+    ).format(base=REMOTE_BASE, prepare=prepare, removals=removals, manifest=MANIFEST_NAME)
+
+def push_to_slave(slave_ip, addon_data, manifest):
+    """Bring one slave up to date, returns its timing report"""
+    report = {'ok': False, 'changed': 0, 'removed': 0,
+              'manifest_time': 0.0, 'transfer_time': 0.0, 'total_time': 0.0}
+    start = time.time()
+
+    try:
+        log("Pushing to slave: {}".format(slave_ip))
+        slave_manifest = get_slave_manifest(slave_ip)
+        report['manifest_time'] = time.time() - start
+
+        if slave_manifest is None:
+            log("Cannot connect to slave {}".format(slave_ip), xbmc.LOGWARNING)
+            report['error'] = 'unreachable'
+            return report
+
+        changed_files, removed_files = cache_manifest.diff_manifests(slave_manifest, manifest)
+        report['changed'] = len(changed_files)
+        report['removed'] = len(removed_files)
+        paths = ['settings2.xml', MANIFEST_NAME] + ['cache/' + rel_path for rel_path in changed_files]
+
+        transfer_start = time.time()
+        proc = ssh_transport.get_transport(slave_ip).popen(
+            build_install_script(removed_files, not slave_manifest['files']),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        # A slave that goes away mid-push just ends the stream early
+        try:
+            cache_manifest.write_pack(addon_data, paths, proc.stdin)
+        except (IOError, OSError):
+            pass
+
+        output, error = proc.communicate()
+        report['transfer_time'] = time.time() - transfer_start
+
+        if proc.returncode == 0:
+            report['ok'] = True
+            log("Successfully pushed to {}".format(slave_ip))
+        else:
+            report['error'] = error.decode('utf-8', 'ignore').strip()
+            log("Failed to push to {}: {}".format(slave_ip, report['error']), xbmc.LOGERROR)
+
+    except Exception as e:
+        report['error'] = str(e)
+        log("Error pushing to {}: {}".format(slave_ip, str(e)), xbmc.LOGERROR)
+    finally:
+        report['total_time'] = time.time() - start
+
+    return report
+
+def push_all(slave_ips, addon_data):
+    """Push to every slave in parallel and return a report per slave"""
+    manifest = cache_manifest.update_manifest(
+        os.path.join(addon_data, 'cache'), os.path.join(addon_data, MANIFEST_NAME))
+    reports = {}
+
+    def worker(slave_ip):
+        reports[slave_ip] = push_to_slave(slave_ip, addon_data, manifest)
+
+    threads = [threading.Thread(target=worker, args=(slave_ip,), name="PTV-Push-" + slave_ip)
+               for slave_ip in slave_ips]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    for slave_ip in slave_ips:
+        report = reports[slave_ip]
+        log("{}: {} - {} changed, {} removed, manifest {:.1f}s, transfer {:.1f}s, total {:.1f}s".format(
+            slave_ip, 'ok' if report['ok'] else report.get('error', 'failed'),
+            report['changed'], report['removed'], report['manifest_time'],
+            report['transfer_time'], report['total_time']), xbmc.LOGINFO)
+
+    return reports
+
 def push_to_slaves():
     """Push settings and cache to configured slave systems"""
     log("Starting push to slave systems")
-    
+
     # Check if master push is enabled
     if ADDON.getSetting("EnableMasterPush") != "true":
         log("Master push disabled")
         return False
-        
+
     # Get slave IPs from settings
     slave_ips = []
     for i in range(1, 6):  # Support up to 5 slaves
         slave_ip = ADDON.getSetting("SlaveIP{}".format(i))
         if slave_ip:
             slave_ips.append(slave_ip)
-    
+
     if not slave_ips:
         log("No slave systems configured")
         notify("No slaves configured")
         return False
-        
+
     # Source paths
     addon_data = xbmcvfs.translatePath('special://profile/addon_data/{}/'.format(ADDON_ID))
     settings2_path = os.path.join(addon_data, 'settings2.xml')
     cache_path = os.path.join(addon_data, 'cache/')
-    
+
     # Check if files exist
     if not os.path.exists(settings2_path):
         log("settings2.xml not found", xbmc.LOGERROR)
         notify("settings2.xml not found", "Error")
         return False
-        
+
     if not os.path.exists(cache_path):
         log("cache folder not found", xbmc.LOGERROR)
         notify("cache folder not found", "Error")
         return False
-        
+
     notify("Pushing to {} slave(s)".format(len(slave_ips)))
-    success_count = 0
-    
-    for slave_ip in slave_ips:
-        try:
-            log("Pushing to slave: {}".format(slave_ip))
-            
-            # Test connection first
-            test_cmd = ['ssh', '-o', 'ConnectTimeout=5', '-o', 'BatchMode=yes', 
-                       'root@{}'.format(slave_ip), 'echo "connected"']
-            result = subprocess.call(test_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            if result != 0:
-                log("Cannot connect to slave {}".format(slave_ip), xbmc.LOGWARNING)
-                continue
-            
-            # Define remote paths
-            remote_base = '/storage/.kodi/userdata/addon_data/script.paragontv'
-            remote_settings = '{}/settings2.xml'.format(remote_base)
-            remote_cache = '{}/cache'.format(remote_base)
-            
-            # Delete existing settings2.xml if it exists
-            log("Deleting existing settings2.xml on {}".format(slave_ip))
-            delete_settings_cmd = ['ssh', 'root@{}'.format(slave_ip), 
-                                  'rm -f {}'.format(remote_settings)]
-            subprocess.call(delete_settings_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            # Delete existing cache folder if it exists
-            log("Deleting existing cache folder on {}".format(slave_ip))
-            delete_cache_cmd = ['ssh', 'root@{}'.format(slave_ip), 
-                               'rm -rf {}'.format(remote_cache)]
-            subprocess.call(delete_cache_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                
-            # Create target directory structure
-            log("Creating fresh directory structure on {}".format(slave_ip))
-            mkdir_cmd = ['ssh', 'root@{}'.format(slave_ip), 
-                        'mkdir -p {}/cache'.format(remote_base)]
-            subprocess.call(mkdir_cmd)
-            
-            # Push settings2.xml
-            log("Pushing settings2.xml to {}".format(slave_ip))
-            scp_cmd = ['scp', '-o', 'ConnectTimeout=10', settings2_path,
-                      'root@{}:{}/'.format(slave_ip, remote_base)]
-            result = subprocess.call(scp_cmd)
-            
-            if result != 0:
-                log("Failed to push settings2.xml to {}".format(slave_ip), xbmc.LOGERROR)
-                continue
-                
-            # Push cache folder
-            log("Pushing cache folder to {}".format(slave_ip))
-            
-            # Check if rsync is available
-            rsync_check = subprocess.call(['which', 'rsync'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            if rsync_check == 0:
-                # Use rsync (the --delete flag is now redundant since we deleted everything, but keeping it doesn't hurt)
-                rsync_cmd = ['rsync', '-az', '--delete', cache_path,
-                           'root@{}:{}/'.format(slave_ip, remote_base)]
-                result = subprocess.call(rsync_cmd)
-            else:
-                # Use scp as fallback
-                scp_cmd = ['scp', '-r', '-o', 'ConnectTimeout=10', cache_path,
-                          'root@{}:{}/'.format(slave_ip, remote_base)]
-                result = subprocess.call(scp_cmd)
-                
-            if result == 0:
-                log("Successfully pushed to {}".format(slave_ip))
-                success_count += 1
-            else:
-                log("Failed to push cache to {}".format(slave_ip), xbmc.LOGERROR)
-                
-        except Exception as e:
-            log("Error pushing to {}: {}".format(slave_ip, str(e)), xbmc.LOGERROR)
-            
+    reports = push_all(slave_ips, addon_data)
+    success_count = len([report for report in reports.values() if report['ok']])
+
     log("Push completed. {} of {} slaves updated".format(success_count, len(slave_ips)))
-    
+
     if success_count > 0:
         notify("Updated {} slave(s)".format(success_count), "Push Complete")
     else:
         notify("Failed to update slaves", "Push Failed")
-        
+
     return success_count > 0
 
 # Main execution
 if __name__ == "__main__":
-    push_to_slaves()
\ No newline at end of file
+    push_to_slaves()
@@ -0,0 +1,329 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Paragon TV SSH Transport
+One place for every remote command the addon runs over SSH.
+
+A transport is kept per host.  The first command starts a persistent master
+connection (ControlMaster/ControlPersist) and every command after that runs
+over it, so only the first one pays for the handshake.  Several commands can
+also be sent as one batch, which needs a single round trip.  Timeouts and
+retries are the same for every caller.
+
+Windows OpenSSH can't multiplex, there every command connects on its own.
+"""
+
+import collections
+import hashlib
+import os
+import platform
+import shlex
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+
+CONNECT_TIMEOUT = 10
+COMMAND_TIMEOUT = 60
+# Idle time before a master connection closes itself
+CONTROL_PERSIST = 300
+# A master found running is trusted this long before it is checked again
+MASTER_CHECK_INTERVAL = 60
+RETRIES = 1
+RETRY_DELAY = 2
+
+# ssh exits with 255 when the connection itself failed
+SSH_ERROR = 255
+TIMED_OUT = -1
+
+# For boxes whose host keys aren't managed
+UNTRUSTED_HOST_OPTIONS = ("StrictHostKeyChecking=no", "UserKnownHostsFile=/dev/null")
+
+SSHResult = collections.namedtuple("SSHResult", "returncode output error")
+
+TRANSPORTS = {}
+TRANSPORTS_LOCK = threading.Lock()
+
+
+def find_ssh_executable():
+    """The ssh client to run"""
+    if platform.system() != "Windows":
+        return "ssh"
+
+    for path in (
+        "C:\\Windows\\System32\\OpenSSH\\ssh.exe",
+        "C:\\Program Files\\Git\\usr\\bin\\ssh.exe",
+    ):
+        if os.path.exists(path):
+            return path
+
+    # Try PATH
+    return "ssh.exe"
+
+
+def get_transport(host, user="root", key=None, options=()):
+    """The shared transport for a host, created on first use"""
+    name = (host, user, key, tuple(options))
+
+    with TRANSPORTS_LOCK:
+        transport = TRANSPORTS.get(name)
+
+        if transport is None:
+            transport = SSHTransport(host, user, key, options)
+            TRANSPORTS[name] = transport
+
+        return transport
+
+
+def close_all():
+    """Stop every master connection this process started"""
+    with TRANSPORTS_LOCK:
+        transports = list(TRANSPORTS.values())
+        TRANSPORTS.clear()
+
+    for transport in transports:
+        transport.close()
+
+
+def decode(data):
+    if isinstance(data, bytes):
+        return data.decode("utf-8", "ignore")
+
+    return data or ""
+
+
+class SSHTransport:
+    def __init__(self, host, user="root", key=None, options=()):
+        self.host = host
+        self.user = user
+        self.key = key
+        self.options = list(options)
+        self.executable = find_ssh_executable()
+        self.multiplex = platform.system() != "Windows"
+        self.master_lock = threading.Lock()
+        self.master_checked = 0
+        # Unix sockets only allow short paths, so keep it in the temp folder.
+        # Transports with another key or options (port included) get their
+        # own master.
+        settings = hashlib.sha1(repr((key, self.options)).encode("utf-8")).hexdigest()
+        self.control_path = os.path.join(
+            tempfile.gettempdir(), "ptv-ssh-{}@{}-{}".format(user, host, settings[:8])
+        )
+
+    def target(self):
+        return "{}@{}".format(self.user, self.host)
+
+    def base_args(self):
+        args = [
+            self.executable,
+            "-o", "BatchMode=yes",
+            "-o", "ConnectTimeout={}".format(CONNECT_TIMEOUT),
+            "-o", "ServerAliveInterval=15",
+            "-o", "ServerAliveCountMax=2",
+            "-o", "LogLevel=ERROR",
+        ]
+
+        if self.key:
+            args += ["-i", self.key]
+
+        for option in self.options:
+            args += ["-o", option]
+
+        if self.multiplex:
+            args += ["-o", "ControlPath=" + self.control_path]
+
+        return args
+
+    def command_args(self, command):
+        """Full ssh command line for running command on the host"""
+        args = self.base_args()
+
+        if self.multiplex:
+            # Falls back to a direct connection if there is no master
+            args += ["-o", "ControlMaster=auto"]
+
+        return args + [self.target(), command]
+
+    def rsync_shell(self):
+        """The remote shell for rsync -e, so rsync shares the connection too"""
+        return " ".join(shlex.quote(arg) for arg in self.base_args())
+
+    def master_alive(self):
+        """
+        Whether a master answers on the socket.  A socket left behind by a
+        master that died would otherwise make every command connect on its
+        own.
+        """
+        if not os.path.exists(self.control_path):
+            return False
+
+        if time.time() - self.master_checked < MASTER_CHECK_INTERVAL:
+            return True
+
+        try:
+            alive = subprocess.call(
+                self.base_args() + ["-O", "check", self.target()],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=CONNECT_TIMEOUT,
+            ) == 0
+        except (OSError, subprocess.TimeoutExpired):
+            alive = False
+
+        if alive:
+            self.master_checked = time.time()
+            return True
+
+        try:
+            os.remove(self.control_path)
+        except OSError:
+            pass
+
+        return False
+
+    def ensure_master(self):
+        """Start the persistent master connection if it isn't running"""
+        if not self.multiplex:
+            return
+
+        with self.master_lock:
+            if self.master_alive():
+                return
+
+            # -f only returns once the connection is up, and with nothing
+            # attached to the pipes it can't keep a caller waiting
+            args = self.base_args() + [
+                "-o", "ControlMaster=yes",
+                "-o", "ControlPersist={}".format(CONTROL_PERSIST),
+                "-N", "-f", self.target(),
+            ]
+
+            try:
+                subprocess.call(
+                    args,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    timeout=CONNECT_TIMEOUT + 5,
+                )
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+
+    def popen(self, command, **kwargs):
+        """Start command on the host for callers that stream its input or output"""
+        self.ensure_master()
+        return subprocess.Popen(self.command_args(command), **kwargs)
+
+    def run(self, command, input_data=None, timeout=COMMAND_TIMEOUT, retries=RETRIES,
+            text=True):
+        """
+        Run one command and return an SSHResult with its output, decoded
+        unless text is False.  Only connection failures are retried, a
+        failing command is not.
+        """
+        for attempt in range(retries + 1):
+            if attempt > 0:
+                time.sleep(RETRY_DELAY)
+
+            result = self.run_once(command, input_data, timeout, text)
+
+            if result.returncode not in (SSH_ERROR, TIMED_OUT):
+                break
+
+        return result
+
+    def run_once(self, command, input_data, timeout, text):
+        try:
+            proc = self.popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except OSError as e:
+            return SSHResult(SSH_ERROR, "", str(e))
+
+        if isinstance(input_data, str):
+            input_data = input_data.encode("utf-8")
+
+        try:
+            output, error = proc.communicate(input_data, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            return SSHResult(TIMED_OUT, "", "timed out after {}s".format(timeout))
+
+        if text:
+            output = decode(output)
+
+        return SSHResult(proc.returncode, output, decode(error))
+
+    def run_batch(self, commands, timeout=COMMAND_TIMEOUT, retries=RETRIES):
+        """
+        Run several commands in one round trip.  Returns an SSHResult per
+        command, or None if the host couldn't be reached.  Stderr of the whole
+        batch goes with the last command.
+        """
+        marker = "__PTV_{}".format(uuid.uuid4().hex[:12])
+        script = "; ".join(
+            '( {} ); printf "\\n{}_{}:%s\\n" $?'.format(command, marker, index)
+            for index, command in enumerate(commands)
+        )
+        result = self.run(script, timeout=timeout, retries=retries)
+
+        if result.returncode in (SSH_ERROR, TIMED_OUT):
+            return None
+
+        results = []
+        rest = result.output
+
+        for index in range(len(commands)):
+            tag = "\n{}_{}:".format(marker, index)
+            position = rest.find(tag)
+
+            if position < 0:
+                # The batch was cut short
+                results.append(SSHResult(SSH_ERROR, "", result.error))
+                continue
+
+            output = rest[:position]
+            status, _, rest = rest[position + len(tag):].partition("\n")
+
+            try:
+                returncode = int(status)
+            except ValueError:
+                returncode = SSH_ERROR
+
+            results.append(SSHResult(returncode, output, ""))
+
+        if results:
+            results[-1] = results[-1]._replace(error=result.error)
+
+        return results
+
+    def fetch_file(self, remote_path, local_path, timeout=COMMAND_TIMEOUT):
+        """Copy a file from the host, replacing the local one in one rename"""
+        result = self.run("cat " + shlex.quote(remote_path), timeout=timeout, text=False)
+
+        if result.returncode != 0:
+            return False
+
+        tmp_path = local_path + ".tmp"
+
+        with open(tmp_path, "wb") as f:
+            f.write(result.output)
+
+        os.replace(tmp_path, local_path)
+        return True
+
+    def close(self):
+        self.master_checked = 0
+
+        if self.multiplex and os.path.exists(self.control_path):
+            subprocess.call(
+                self.base_args() + ["-O", "exit", self.target()],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
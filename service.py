@@ -24,6 +24,7 @@ import time
 import xbmc
 import xbmcaddon
 import xbmcgui
+import xbmcvfs
 
 # Plugin Info
 ADDON_ID = "script.paragontv"
@@ -124,6 +125,10 @@ class Service(object):
         self.autostart_complete = False
         self.settingsMonitor = SettingsMonitor()
         self.autopilot_thread = None
+        self.snapshot_server = None
+        self.snapshot_thread = None
+        self.snapshot_stopped = None
+        self.snapshot_config = None
 
         # Run migration before anything else
         migrate_legacy_maintenance_schedules()
@@ -148,6 +153,7 @@ class Service(object):
         # Then start all services
         self.startTimers()
         self.startAutopilot()
+        self.startSnapshotServer()
 
     def autostart(self):
         """Handle Paragon TV autostart"""
@@ -302,6 +308,83 @@ class Service(object):
         except Exception as e:
             log("Error stopping Autopilot: {}".format(str(e)), xbmc.LOGERROR)
 
+    def startSnapshotServer(self):
+        """Serve the cache to slaves over HTTP if enabled"""
+        try:
+            if REAL_SETTINGS.getSetting("EnableSnapshotServer") != "true":
+                return
+
+            if REAL_SETTINGS.getSetting("AutopilotEnabled") == "true":
+                log("Autopilot Mode enabled - not serving the cache")
+                return
+
+            lib_path = os.path.join(ADDON_PATH, "resources", "lib")
+            if lib_path not in sys.path:
+                sys.path.append(lib_path)
+
+            import content_store
+
+            host, port, token = self.getSnapshotConfig()
+            if not token:
+                log("No cache server token set - not serving the cache", xbmc.LOGWARNING)
+                return
+
+            if not host:
+                log("No LAN address for the cache server - not serving the cache", xbmc.LOGWARNING)
+                return
+
+            addon_data = xbmcvfs.translatePath(REAL_SETTINGS.getAddonInfo("profile"))
+            store = content_store.ContentStore(os.path.join(addon_data, "snapshot_store"))
+            self.snapshot_server = content_store.SnapshotServer(store, host, port, token)
+            self.snapshot_server.start()
+            self.snapshot_config = (host, port, token)
+
+            self.snapshot_stopped = threading.Event()
+            self.snapshot_thread = threading.Thread(
+                target=self.publishSnapshots,
+                args=(content_store.SnapshotPublisher(addon_data, store), self.snapshot_stopped),
+                name="PTV-SnapshotPublisher"
+            )
+            self.snapshot_thread.daemon = True
+            self.snapshot_thread.start()
+
+            log("Serving the cache on {}:{}".format(host, port), xbmc.LOGINFO)
+
+        except Exception as e:
+            log("Failed to start the snapshot server: {}".format(str(e)), xbmc.LOGERROR)
+
+    def getSnapshotConfig(self):
+        """The address, port and token to serve the cache with"""
+        # The LAN address Kodi uses unless one is given
+        host = REAL_SETTINGS.getSetting("SnapshotServerAddress") or xbmc.getIPAddress()
+        port = int(REAL_SETTINGS.getSetting("SnapshotServerPort") or 8765)
+        return host, port, REAL_SETTINGS.getSetting("SnapshotServerToken")
+
+    def publishSnapshots(self, publisher, stopped):
+        """Publish a new generation whenever the cache or settings2.xml change"""
+        monitor = xbmc.Monitor()
+
+        while not self.stop and not stopped.is_set():
+            try:
+                publisher.publish()
+            except Exception as e:
+                log("Error publishing the cache: {}".format(str(e)), xbmc.LOGERROR)
+
+            if monitor.waitForAbort(15):
+                break
+
+    def stopSnapshotServer(self):
+        """Stop serving the cache"""
+        try:
+            if self.snapshot_server:
+                log("Stopping the snapshot server")
+                server = self.snapshot_server
+                self.snapshot_server = None
+                self.snapshot_stopped.set()
+                server.stop()
+        except Exception as e:
+            log("Error stopping the snapshot server: {}".format(str(e)), xbmc.LOGERROR)
+
     def onScreensaverActivated(self):
         log("Screensaver activated")
 
@@ -319,6 +402,7 @@ class Service(object):
             if current_autopilot:
                 # Autopilot was just enabled
                 log("Autopilot Mode enabled - starting service")
+                self.stopSnapshotServer()
                 self.startAutopilot()
                 
                 # Stop local timers if running
@@ -335,12 +419,25 @@ class Service(object):
                 # Restart local timers
                 log("Restarting local timer services")
                 self.startTimers()
+                self.startSnapshotServer()
+
+        # Check if the snapshot server setting changed
+        snapshot_enabled = REAL_SETTINGS.getSetting("EnableSnapshotServer") == "true"
+        if snapshot_enabled and not self.snapshot_server:
+            self.startSnapshotServer()
+        elif not snapshot_enabled and self.snapshot_server:
+            self.stopSnapshotServer()
+        elif self.snapshot_server and self.getSnapshotConfig() != self.snapshot_config:
+            log("Snapshot server settings changed - restarting it")
+            self.stopSnapshotServer()
+            self.startSnapshotServer()
 
     def doStop(self):
         self.stop = True
 
         # Stop autopilot if running
         self.stopAutopilot()
+        self.stopSnapshotServer()
 
         # Stop all timer services
         try:
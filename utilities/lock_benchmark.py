@@ -0,0 +1,252 @@
+#!/usr/bin/python
+#   File Lock Benchmark for Paragon TV
+#
+# Measures the FileLock backends under contention.  A few worker processes
+# keep taking and releasing the same lock, and one more process just holds
+# a lock to show what keeping it alive costs.  For every backend it prints
+# the acquire latency and the file operations per minute.
+#
+# Run it from the command line, pointing --dir at the folder to test (the
+# local cache, or a mounted share to compare with channel sharing):
+#
+#   python lock_benchmark.py --dir /storage/.kodi/temp/lockbench --seconds 30
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+LIB_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "resources", "lib"
+)
+
+# Counts file operations in the current process
+IO_COUNT = [0]
+
+
+def counted(func):
+    def wrapper(*args, **kwargs):
+        IO_COUNT[0] += 1
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def install_modules(lock_dir):
+    """
+    FileAccess needs the Kodi modules and Globals.  Outside Kodi, provide
+    just enough of them on top of the local filesystem.
+    """
+    xbmc = types.ModuleType("xbmc")
+    xbmc.LOGDEBUG = 0
+    xbmc.LOGINFO = 1
+    xbmc.LOGWARNING = 2
+    xbmc.LOGERROR = 4
+    xbmc.log = lambda msg, level=0: None
+
+    class File:
+        def __init__(self, filename, mode="r"):
+            IO_COUNT[0] += 1
+            self.handle = open(filename, "w" if "w" in mode else "r")
+
+        def read(self, size=-1):
+            return self.handle.read(size)
+
+        def write(self, data):
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+
+            return self.handle.write(data)
+
+        def close(self):
+            self.handle.close()
+
+    def mkdir(path):
+        try:
+            os.mkdir(path)
+            return True
+        except OSError:
+            return False
+
+    xbmcvfs = types.ModuleType("xbmcvfs")
+    xbmcvfs.File = File
+    xbmcvfs.translatePath = lambda path: path
+    xbmcvfs.exists = counted(os.path.exists)
+    xbmcvfs.mkdir = counted(mkdir)
+    xbmcvfs.rename = counted(lambda path, newpath: os.rename(path, newpath) or True)
+    xbmcvfs.delete = counted(lambda path: os.remove(path) or True)
+
+    globals_module = types.ModuleType("Globals")
+    globals_module.LOCK_LOC = lock_dir
+    globals_module.CHANNEL_SHARING = False
+    globals_module.log = lambda msg, level=0: None
+
+    sys.modules["xbmc"] = xbmc
+    sys.modules["xbmcvfs"] = xbmcvfs
+    sys.modules["Globals"] = globals_module
+    sys.path.insert(0, LIB_PATH)
+
+    import FileAccess
+
+    # The lock backends also go to the OS directly
+    for name in ("open", "rename", "replace", "remove"):
+        setattr(FileAccess.os, name, counted(getattr(os, name)))
+
+    if FileAccess.fcntl != None:
+        FileAccess.fcntl.flock = counted(FileAccess.fcntl.flock)
+
+    return FileAccess
+
+
+def make_lock(backend, lock_dir):
+    FileAccess = install_modules(lock_dir)
+
+    if backend == "rename":
+        return FileAccess.FileLock()
+    elif backend == "fcntl":
+        return FileAccess.FcntlFileLock()
+
+    return FileAccess.LeaseFileLock()
+
+
+def contend(backend, lock_dir, seconds, results):
+    lock = make_lock(backend, lock_dir)
+    latencies = []
+    failures = 0
+    IO_COUNT[0] = 0
+    end = time.time() + seconds
+
+    while time.time() < end:
+        start = time.time()
+
+        if lock.lockFile("BenchLock", True):
+            latencies.append(time.time() - start)
+            time.sleep(0.01)
+            lock.unlockFile("BenchLock")
+        else:
+            failures += 1
+
+        time.sleep(random.uniform(0, 0.02))
+
+    lock.close()
+    results.put(("contend", latencies, failures, IO_COUNT[0]))
+
+
+def hold(backend, lock_dir, seconds, results):
+    lock = make_lock(backend, lock_dir)
+    lock.lockFile("HoldLock", False)
+    IO_COUNT[0] = 0
+    time.sleep(seconds)
+    count = IO_COUNT[0]
+    lock.close()
+    results.put(("hold", [], 0, count))
+
+
+def percentile(values, pct):
+    if len(values) == 0:
+        return 0.0
+
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+def run_backend(backend, base_dir, workers, seconds):
+    lock_dir = os.path.join(base_dir, backend) + "/"
+
+    if os.path.exists(lock_dir):
+        shutil.rmtree(lock_dir)
+
+    os.makedirs(lock_dir)
+
+    # Start the rename backend from its steady state, not from a missing
+    # lock file that it first waits 20 seconds for
+    if backend == "rename":
+        open(os.path.join(lock_dir, "FileLock.dat"), "w").close()
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=contend, args=(backend, lock_dir, seconds, results)
+        )
+        for i in range(workers)
+    ]
+    processes.append(
+        multiprocessing.Process(target=hold, args=(backend, lock_dir, seconds, results))
+    )
+
+    for process in processes:
+        process.start()
+
+    latencies = []
+    failures = 0
+    contend_io = 0
+    hold_io = 0
+
+    for process in processes:
+        kind, values, failed, count = results.get()
+        latencies += values
+        failures += failed
+
+        if kind == "contend":
+            contend_io += count
+        else:
+            hold_io = count
+
+    for process in processes:
+        process.join()
+
+    minutes = seconds / 60.0
+    print(
+        "{0:8} {1:9d} {2:8d} {3:9.1f} {4:9.1f} {5:9.1f} {6:12.0f} {7:10.0f}".format(
+            backend,
+            len(latencies),
+            failures,
+            percentile(latencies, 50) * 1000,
+            percentile(latencies, 95) * 1000,
+            percentile(latencies, 100) * 1000,
+            contend_io / minutes,
+            hold_io / minutes,
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FileLock backends")
+    parser.add_argument("--dir", help="folder to put the locks in")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument(
+        "--backends", default="rename,fcntl,lease", help="comma separated list"
+    )
+    args = parser.parse_args()
+    base_dir = args.dir or tempfile.mkdtemp(prefix="ptvlocks")
+
+    print(
+        "{0} workers for {1} seconds in {2}".format(
+            args.workers, args.seconds, base_dir
+        )
+    )
+    print(
+        "{0:8} {1:>9} {2:>8} {3:>9} {4:>9} {5:>9} {6:>12} {7:>10}".format(
+            "backend",
+            "acquired",
+            "failed",
+            "p50 ms",
+            "p95 ms",
+            "max ms",
+            "io/min busy",
+            "io/min idle",
+        )
+    )
+
+    for backend in args.backends.split(","):
+        run_backend(backend.strip(), base_dir, args.workers, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -54,6 +54,13 @@ except ImportError:
 
 import os
 import subprocess
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "resources", "lib")
+)
+
+import ssh_transport
 
 
 def run_remote_channel_rename():
@@ -72,26 +79,16 @@ def run_remote_channel_rename():
             "PTV Remote Channel Rename: Starting remote operation", level=xbmc.LOGINFO
         )
 
-        # Make sure the script is executable on the remote system
-        chmod_cmd = [
-            "ssh",
-            remote_user + "@" + remote_ip,
-            "chmod +x " + remote_script_path,
-        ]
-        xbmc.log(
-            "PTV Remote Channel Rename: Setting execute permissions", level=xbmc.LOGINFO
-        )
-        subprocess.call(chmod_cmd)
+        transport = ssh_transport.get_transport(remote_ip, remote_user)
 
         progress.update(30, "Connected. Running remote script...")
 
-        # Run the script on the remote system
-        ssh_cmd = ["ssh", remote_user + "@" + remote_ip, "python " + remote_script_path]
+        # Make sure the script is executable and run it, in one session
         xbmc.log(
             "PTV Remote Channel Rename: Executing remote script", level=xbmc.LOGINFO
         )
-        process = subprocess.Popen(
-            ssh_cmd,
+        process = transport.popen(
+            "chmod +x " + remote_script_path + "; python " + remote_script_path,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             universal_newlines=True,